@@ -0,0 +1,16 @@
+"""
+Celery application for ExamOnlineAPI.
+
+Configuration is read from Django settings using the ``CELERY_`` prefix.
+Tasks are discovered from the ``tasks.py`` module of each installed app.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ExamOnlineAPI.settings')
+
+app = Celery('ExamOnlineAPI')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -14,6 +14,7 @@ from pathlib import Path
 import environ
 import sys
 import os
+import tempfile
 from datetime import timedelta
 
 
@@ -160,10 +161,115 @@ if "test" in sys.argv:
     }
 
 
+# CACHE Settings
+# Answer keys used for grading and pre-rendered exam papers. Local memory by
+# default. Both are keyed by version tokens kept in the database
+# (admin_api.CacheVersion), so every process sees a paper change at once
+# whatever the backend; point ANSWER_KEY_CACHE_BACKEND or
+# EXAM_PAPER_CACHE_BACKEND at Redis or Memcached only to load each entry once
+# instead of once per process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'answer_keys': {
+        'BACKEND': env('ANSWER_KEY_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('ANSWER_KEY_CACHE_LOCATION', default='answer-keys'),
+        'TIMEOUT': env.int('ANSWER_KEY_CACHE_TTL', default=900),
+        # The local-memory backend evicts least recently used entries past this size.
+        'OPTIONS': {'MAX_ENTRIES': env.int('ANSWER_KEY_CACHE_MAX_ENTRIES', default=1000)},
+    },
+    # Pre-rendered student question lists. Snapshots are replaced when a
+    # question of the paper changes, so they do not need to expire.
+    'exam_papers': {
+        'BACKEND': env('EXAM_PAPER_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('EXAM_PAPER_CACHE_LOCATION', default='exam-papers'),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': env.int('EXAM_PAPER_CACHE_MAX_ENTRIES', default=500)},
+    },
+    # Each signed-in student's shuffled copy of a paper snapshot, keyed by the
+    # snapshot's content hash. There is one per student and paper, so they
+    # expire and are kept apart from the shared snapshots they are made from.
+    'student_papers': {
+        'BACKEND': env('STUDENT_PAPER_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('STUDENT_PAPER_CACHE_LOCATION', default='student-papers'),
+        'TIMEOUT': env.int('STUDENT_PAPER_CACHE_TTL', default=3 * 60 * 60),
+        'OPTIONS': {'MAX_ENTRIES': env.int('STUDENT_PAPER_CACHE_MAX_ENTRIES', default=5000)},
+    },
+    # Questions parsed from uploaded PDFs, keyed by content hash and parser
+    # version, so identical re-uploads skip extraction. Least recently used
+    # documents are evicted past MAX_ENTRIES.
+    'parsed_uploads': {
+        'BACKEND': env('PARSED_UPLOAD_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('PARSED_UPLOAD_CACHE_LOCATION', default='parsed-uploads'),
+        'TIMEOUT': env.int('PARSED_UPLOAD_CACHE_TTL', default=7 * 24 * 60 * 60),
+        'OPTIONS': {'MAX_ENTRIES': env.int('PARSED_UPLOAD_CACHE_MAX_ENTRIES', default=100)},
+    },
+}
+
+
 # CELERY Settings
 CELERY_BROKER_URL = env('CELERY_BROKER_URL')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+# Run tasks inline instead of sending them to the broker (tests / local dev).
+CELERY_TASK_ALWAYS_EAGER = env.bool('CELERY_TASK_ALWAYS_EAGER', default=False)
+CELERY_TASK_EAGER_PROPAGATES = True
+# Periodic tasks, run by `celery -A ExamOnlineAPI beat`.
+CELERY_BEAT_SCHEDULE = {
+    'purge-staging-batches': {
+        'task': 'admin_api.tasks.purge_staging_batches',
+        'schedule': env.int('STAGING_PURGE_INTERVAL', default=60 * 60),
+    },
+    'purge-upload-sessions': {
+        'task': 'admin_api.tasks.purge_upload_sessions',
+        'schedule': env.int('UPLOAD_SESSION_PURGE_INTERVAL', default=60 * 60),
+    },
+}
+
+
+# PDF ingestion Settings
+# Uploads are processed by a Celery task when PDF_INGEST_ASYNC is on, or when
+# the client sends async=true with the upload.
+PDF_INGEST_ASYNC = env.bool('PDF_INGEST_ASYNC', default=False)
+# Where uploaded PDFs wait for the worker; must be shared with the workers.
+PDF_INGEST_DIR = env('PDF_INGEST_DIR', default=tempfile.gettempdir())
+# Text extraction backend: 'pdfplumber', 'pdfminer' or 'pypdfium2' (fastest).
+# An upload can override it with the 'backend' form field.
+PDF_EXTRACT_BACKEND = env('PDF_EXTRACT_BACKEND', default='pdfplumber')
+# Page text extraction is spread over this many processes (1 = serial) for
+# PDFs with at least PDF_PARALLEL_MIN_PAGES pages. Celery prefork workers
+# extract serially; run them with --pool threads or solo to use this.
+PDF_EXTRACT_WORKERS = env.int('PDF_EXTRACT_WORKERS', default=1)
+PDF_PARALLEL_MIN_PAGES = env.int('PDF_PARALLEL_MIN_PAGES', default=50)
+# Processes extracting the PDFs of a batch in the ingest_batch command, one PDF
+# each at a time. admin-api/batch-ingest/ queues a Celery task per PDF instead.
+BATCH_INGEST_WORKERS = env.int('BATCH_INGEST_WORKERS', default=os.cpu_count() or 1)
+# Rows per INSERT when saving uploaded or confirmed questions.
+QUESTION_BULK_BATCH_SIZE = env.int('QUESTION_BULK_BATCH_SIZE', default=500)
+# Default and largest page size of the admin question listing (?page_size=).
+QUESTION_PAGE_SIZE = env.int('QUESTION_PAGE_SIZE', default=100)
+QUESTION_MAX_PAGE_SIZE = env.int('QUESTION_MAX_PAGE_SIZE', default=1000)
+# Rows fetched per database round trip by the streaming question export.
+QUESTION_EXPORT_CHUNK_SIZE = env.int('QUESTION_EXPORT_CHUNK_SIZE', default=2000)
+# Seconds a batch of uploaded questions waits for review before it is purged.
+STAGING_BATCH_TTL = env.int('STAGING_BATCH_TTL', default=24 * 60 * 60)
+# Chunked uploads (admin-api/uploads/): largest chunk per PUT, largest
+# file, and seconds an unfinished upload is kept after its last chunk.
+UPLOAD_CHUNK_MAX_SIZE = env.int('UPLOAD_CHUNK_MAX_SIZE', default=16 * 1024 * 1024)
+UPLOAD_SESSION_MAX_SIZE = env.int('UPLOAD_SESSION_MAX_SIZE', default=2 * 1024 * 1024 * 1024)
+UPLOAD_SESSION_TTL = env.int('UPLOAD_SESSION_TTL', default=24 * 60 * 60)
+
+
+# Submission Settings
+# Submissions are written in groups: whichever request finds no write in
+# progress writes everything queued, up to SUBMISSION_BATCH_SIZE submissions,
+# after waiting up to SUBMISSION_FLUSH_INTERVAL seconds for more to arrive.
+# Every request still returns only after its own rows are committed. Only the
+# threads of one process are grouped, so run the web workers with several
+# threads (gunicorn --threads); a single-threaded worker stops waiting.
+SUBMISSION_BATCH_SIZE = env.int('SUBMISSION_BATCH_SIZE', default=500)
+SUBMISSION_FLUSH_INTERVAL = env.float('SUBMISSION_FLUSH_INTERVAL', default=0.005)
 
 
 # Custom User Auth Settings
@@ -0,0 +1,329 @@
+"""
+Batch ingestion of many PDFs at once, from a ZIP archive or a directory.
+
+Each PDF is tagged with its paper by a CSV manifest, ``manifest.csv`` at the
+root of the archive or directory unless another one is given::
+
+    file,course_id,exam_type,backend
+    2023/math.pdf,2023_june_math,waec,
+    2023/english.pdf,2023_june_english,waec,pypdfium2
+
+``file`` is the PDF's path relative to that root; ``backend`` is optional.
+PDFs missing from the manifest, or with blank cells, take the defaults given
+with the batch.
+
+Text extraction, the slow part, runs across a pool of
+``BATCH_INGEST_WORKERS`` processes, one PDF per task. PDFs inside an archive
+on disk are read by the workers straight from the archive; only the content
+hash, page fingerprints and page texts come back. As soon as they arrive the
+main process saves the PDF with ``ingest_document``, under its path in the
+batch, as a single upload would be saved, so saving overlaps with the
+extraction of the remaining files. A PDF ingested before is updated in place.
+Every file gets a summary, and a file that fails is reported without stopping
+the rest.
+"""
+import os
+import csv
+import time
+import logging
+import zipfile
+from dataclasses import dataclass
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from .models import IngestJob
+from .documents import DocumentError, ingest_document
+from .pdf_extraction import BACKENDS, can_start_processes, extract_document, is_path
+
+
+logger = logging.getLogger(__name__)
+
+
+MANIFEST_NAME = 'manifest.csv'
+MANIFEST_FIELDS = ['file', 'course_id', 'exam_type']
+TAGS = ['course_id', 'exam_type', 'backend']
+
+
+class BatchIngestError(ValueError):
+    pass
+
+
+@dataclass
+class BatchItem:
+    # Path of the PDF relative to the root of the batch, as reported.
+    file: str
+    # What extract_document reads: a path, the PDF's bytes, or its member name in ``archive``.
+    source: object
+    course_id: str = None
+    exam_type: str = None
+    backend: str = None
+    archive: str = None
+    # Set when the file cannot be ingested; it is then reported without being extracted.
+    error: str = None
+
+
+def read_manifest(lines):
+    """
+    Parse a manifest from an iterable of CSV lines into ``{file: tags}``.
+
+    Raises BatchIngestError if a column is missing or a file is listed twice.
+    """
+    reader = csv.DictReader(lines)
+    try:
+        missing = [field for field in MANIFEST_FIELDS if field not in (reader.fieldnames or [])]
+        if missing:
+            raise BatchIngestError(f"The manifest has no {', '.join(missing)} column")
+
+        manifest = {}
+        for row in reader:
+            file_name = _normalize_name(row.get('file') or '')
+            if not file_name:
+                continue
+            if file_name in manifest:
+                raise BatchIngestError(f'{file_name} is listed more than once in the manifest')
+            manifest[file_name] = {tag: (row.get(tag) or '').strip() or None for tag in TAGS}
+    except csv.Error as e:
+        raise BatchIngestError(f'Invalid manifest: {str(e)}')
+    return manifest
+
+
+def items_from_directory(directory, manifest=None, **defaults):
+    """
+    Return a BatchItem for every PDF under ``directory``.
+
+    ``manifest`` is as returned by ``read_manifest``; by default the
+    directory's own ``manifest.csv`` is read, if there is one. ``defaults``
+    holds the ``course_id``, ``exam_type`` and ``backend`` of untagged files.
+    """
+    if not os.path.isdir(directory):
+        raise BatchIngestError(f'{directory} is not a directory')
+    if manifest is None:
+        manifest = _read_manifest_file(os.path.join(directory, MANIFEST_NAME))
+
+    files = {}
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in names:
+            if name.lower().endswith('.pdf'):
+                path = os.path.join(root, name)
+                files[_normalize_name(os.path.relpath(path, directory))] = path
+    return _tag_items(files, manifest, defaults)
+
+
+def items_from_zip(archive, manifest=None, **defaults):
+    """
+    Return a BatchItem for every PDF in the ZIP ``archive``, a path or a file object.
+
+    Workers read the PDFs of an archive on disk themselves; those of an
+    archive in memory are read here and sent to them. ``manifest`` and
+    ``defaults`` are as for ``items_from_directory``.
+    """
+    try:
+        with zipfile.ZipFile(archive) as zip_file:
+            members = {
+                _normalize_name(info.filename): info.filename
+                for info in zip_file.infolist()
+                if not info.is_dir() and info.filename.lower().endswith('.pdf')
+                and not info.filename.startswith('__MACOSX/')
+            }
+            if manifest is None and MANIFEST_NAME in zip_file.NameToInfo:
+                with zip_file.open(MANIFEST_NAME) as f:
+                    manifest = _read_manifest_text(f.read())
+
+            items = _tag_items(members, manifest or {}, defaults)
+            for item in items:
+                if item.error:
+                    continue
+                if is_path(archive):
+                    item.archive = archive
+                else:
+                    item.source = zip_file.read(item.source)
+    except zipfile.BadZipFile as e:
+        raise BatchIngestError(f'Invalid ZIP file: {str(e)}')
+    return items
+
+
+def ingest_batch(items, workers=None, on_file=None):
+    """
+    Extract every BatchItem and save it as a document; return one summary per item.
+
+    Files are extracted across ``workers`` processes (``BATCH_INGEST_WORKERS``
+    by default) and saved in the order they finish. Falls back to extracting
+    in-process in a daemonic process or if the pool cannot be started, and
+    re-extracts a file in-process if its worker dies. ``on_file`` is called
+    with each summary as it is ready. Summaries are returned in the order of
+    ``items``.
+    """
+    workers = workers or settings.BATCH_INGEST_WORKERS
+    summaries = [None] * len(items)
+
+    def finish(index, summary):
+        summaries[index] = summary
+        if on_file:
+            on_file(summary)
+
+    pending = []
+    for index, item in enumerate(items):
+        if item.error:
+            finish(index, _summary(item, status=IngestJob.STATUS_FAILED, errors=[item.error]))
+        else:
+            # Workers and ingest_document must agree on the backend, which is part of the page fingerprints.
+            item.backend = item.backend or settings.PDF_EXTRACT_BACKEND
+            pending.append(index)
+
+    executor = None
+    if workers > 1 and len(pending) > 1 and can_start_processes():
+        try:
+            executor = ProcessPoolExecutor(max_workers=min(workers, len(pending)))
+            futures = {
+                executor.submit(extract_document, items[index].source, items[index].backend, items[index].archive): index
+                for index in pending
+            }
+        except (AssertionError, OSError, BrokenProcessPool) as e:
+            # e.g. the process or file descriptor limit is reached.
+            logger.warning(f"Parallel batch ingestion unavailable, falling back to serial: {str(e)}")
+            if executor:
+                executor.shutdown(cancel_futures=True)
+            executor = None
+
+    if executor is None:
+        for index in pending:
+            finish(index, _ingest_item(items[index], _extract))
+        return summaries
+
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            finish(index, _ingest_item(items[index], partial(_extraction_result, future)))
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return summaries
+
+
+def batch_totals(summaries):
+    """
+    Add up the summaries of a batch.
+    """
+    return {
+        'files': len(summaries),
+        'files_failed': sum(1 for summary in summaries if summary['status'] == IngestJob.STATUS_FAILED),
+        'questions_created': sum(summary['questions_created'] for summary in summaries),
+        'questions_updated': sum(summary['questions_updated'] for summary in summaries),
+        'questions_deleted': sum(summary['questions_deleted'] for summary in summaries),
+        'duplicates_skipped': sum(summary['duplicates_skipped'] for summary in summaries),
+        'pages': sum(summary['pages'] or 0 for summary in summaries),
+    }
+
+
+def _extract(item):
+    return extract_document(item.source, item.backend, item.archive)
+
+
+def _extraction_result(future, item):
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        logger.warning(f"Batch ingestion worker died, extracting {item.file} in-process")
+        return _extract(item)
+
+
+def _ingest_item(item, extract):
+    try:
+        extracted = extract(item)
+    except Exception as e:
+        logger.error(f"Error extracting data from {item.file}: {str(e)}")
+        return _summary(item, status=IngestJob.STATUS_FAILED, errors=[f'Error extracting data from PDF: {str(e)}'])
+
+    started = time.perf_counter()
+    try:
+        result = ingest_document(None, item.file, item.course_id, item.exam_type, backend=item.backend, extracted=extracted)
+    except DocumentError as e:
+        logger.warning(f"{item.file} not ingested: {str(e)}")
+        return _summary(
+            item, status=IngestJob.STATUS_FAILED, errors=[str(e)], pages=len(extracted.pages),
+            seconds=extracted.seconds + time.perf_counter() - started,
+        )
+    except Exception as e:
+        logger.error(f"Error saving questions from {item.file}: {str(e)}")
+        return _summary(
+            item, status=IngestJob.STATUS_FAILED, errors=[f'An error occurred: {str(e)}'], pages=len(extracted.pages),
+            seconds=extracted.seconds + time.perf_counter() - started,
+        )
+
+    return _summary(
+        item,
+        status=IngestJob.STATUS_SUCCEEDED,
+        questions_found=len(result.document.questions),
+        questions_created=len(result.created),
+        questions_updated=len(result.updated),
+        questions_deleted=len(result.deleted),
+        # Questions already in the bank, whether from this document or another.
+        duplicates_skipped=len(result.skipped) + result.unchanged,
+        errors=result.errors,
+        pages=result.pages_total,
+        seconds=extracted.seconds + time.perf_counter() - started,
+    )
+
+
+def _summary(
+    item, status, errors, questions_found=0, questions_created=0, questions_updated=0, questions_deleted=0,
+    duplicates_skipped=0, pages=None, seconds=0.0,
+):
+    return {
+        'file': item.file,
+        'course_id': item.course_id,
+        'exam_type': item.exam_type,
+        'status': status,
+        'questions_found': questions_found,
+        'questions_created': questions_created,
+        'questions_updated': questions_updated,
+        'questions_deleted': questions_deleted,
+        'duplicates_skipped': duplicates_skipped,
+        'errors': errors,
+        'pages': pages,
+        'seconds': round(seconds, 3),
+    }
+
+
+def _tag_items(files, manifest, defaults):
+    """
+    Pair ``{file: source}`` with the manifest. Files the manifest lists but the batch lacks are failed items.
+    """
+    items = []
+    for file_name in sorted(files):
+        tags = {tag: (manifest.get(file_name) or {}).get(tag) or defaults.get(tag) for tag in TAGS}
+        item = BatchItem(file=file_name, source=files[file_name], **tags)
+        if not item.course_id or not item.exam_type:
+            item.error = 'No course_id and exam_type given for this file'
+        elif item.backend and item.backend not in BACKENDS:
+            item.error = f"Invalid backend. Choose one of: {', '.join(BACKENDS)}"
+        items.append(item)
+
+    for file_name in sorted(set(manifest) - set(files)):
+        items.append(BatchItem(
+            file=file_name, source=None, course_id=manifest[file_name]['course_id'],
+            exam_type=manifest[file_name]['exam_type'], error='File listed in the manifest was not found',
+        ))
+    return items
+
+
+def _read_manifest_file(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return read_manifest(f)
+
+
+def _read_manifest_text(data):
+    try:
+        return read_manifest(data.decode('utf-8-sig').splitlines())
+    except UnicodeDecodeError as e:
+        raise BatchIngestError(f'Invalid manifest: {str(e)}')
+
+
+def _normalize_name(name):
+    name = name.strip().replace('\\', '/')
+    while name.startswith('./'):
+        name = name[2:]
+    return name
@@ -0,0 +1,301 @@
+"""
+Per-paper caches used by the student API.
+
+For every (course_id, exam_type) paper three things are cached:
+
+* the answer key used for grading, in the ``answer_keys`` cache, so a warm
+  submission is graded after reading only the paper's version token;
+* a snapshot of the question list, rendered once to gzip-compressed JSON in the
+  ``exam_papers`` cache, so it can be served as-is to every student;
+* the paper's question ids grouped by difficulty, kept in process memory under
+  the paper's version token, for drawing random exams.
+
+All three are stored under their paper's version token, which the Question
+signals in ``signals.py`` and ``invalidate_paper`` (after bulk inserts)
+replace, along with the version token of the whole question bank. The tokens
+are CacheVersion rows, replaced in the same transaction as the question
+change, so every web and Celery process sees a change at once whatever cache
+backend it uses. The snapshot's content hash and the bank token are the
+validators (ETag / Last-Modified) for conditional GETs of the two listings.
+"""
+import gzip
+import json
+import uuid
+import hashlib
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import datetime
+from urllib.parse import quote
+from django.core.cache import caches
+from django.db import connections
+from django.utils import timezone
+from .models import CacheVersion, Question
+
+
+ANSWER_KEY_CACHE = 'answer_keys'
+EXAM_PAPER_CACHE = 'exam_papers'
+STUDENT_PAPER_CACHE = 'student_papers'
+HITS_KEY = 'answer-key:stats:hits'
+MISSES_KEY = 'answer-key:stats:misses'
+BANK_VERSION_KEY = 'question-bank-version'
+# Version token of a paper that has not changed since CacheVersion rows were first kept.
+INITIAL_VERSION = 'initial'
+
+# Question pools held per process; stale versions simply age out.
+QUESTION_POOL_CACHE_SIZE = 256
+
+
+def answer_key_cache():
+    return caches[ANSWER_KEY_CACHE]
+
+
+def answer_key_cache_key(course_id, exam_type, version):
+    return f'answer-key:{quote(str(course_id))}:{quote(str(exam_type))}:{version}'
+
+
+def get_answer_key(course_id, exam_type):
+    """
+    Return ``{question_id: correct_option}`` for the paper, loading it on a cache miss.
+    """
+    return get_grading_key(course_id, exam_type)[0]
+
+
+def get_grading_key(course_id, exam_type):
+    """
+    Return the paper's answer key and ``{question_id: option_labels}``.
+
+    ``option_labels`` are the sorted labels of dict options (None for list
+    options), which is all that is needed to undo a per-student option shuffle.
+    Keys are stored under the paper's version token, so a correction made in
+    any process is graded against at once.
+    """
+    cache = answer_key_cache()
+    key = answer_key_cache_key(course_id, exam_type, paper_version(course_id, exam_type))
+
+    grading_key = cache.get(key)
+    if grading_key is not None:
+        _increment(HITS_KEY)
+        return grading_key
+
+    _increment(MISSES_KEY)
+    answer_key, option_labels = {}, {}
+    rows = Question.objects.filter(course_id=course_id, exam_type=exam_type).values_list(
+        'id', 'correct_option', 'options',
+    )
+    for question_id, correct_option, options in rows:
+        answer_key[question_id] = correct_option
+        option_labels[question_id] = tuple(sorted(options)) if isinstance(options, dict) else None
+
+    grading_key = (answer_key, option_labels)
+    cache.set(key, grading_key)
+    return grading_key
+
+
+def invalidate_paper(course_id, exam_type):
+    """
+    Drop everything cached for a paper after one of its questions changed.
+    """
+    # The paper's answer key, snapshot and pool, and the bank's listing validators.
+    _replace_versions(paper_version_key(course_id, exam_type), BANK_VERSION_KEY)
+
+
+@dataclass(frozen=True)
+class PaperSnapshot:
+    """
+    A paper's student-facing question list, pre-rendered as gzip-compressed JSON.
+
+    ``etag`` is a hash of the JSON, so every worker derives the same one.
+    """
+    version: str
+    question_count: int
+    gzipped_json: bytes
+    etag: str
+    last_modified: datetime | None
+
+    @property
+    def json(self):
+        return gzip.decompress(self.gzipped_json)
+
+
+def exam_paper_cache():
+    return caches[EXAM_PAPER_CACHE]
+
+
+def student_paper_cache():
+    return caches[STUDENT_PAPER_CACHE]
+
+
+def paper_version_key(course_id, exam_type):
+    return f'paper-version:{quote(str(course_id))}:{quote(str(exam_type))}'
+
+
+def paper_version(course_id, exam_type):
+    """
+    Return the paper's current version token.
+
+    The token is random rather than a counter, so a token can never come back
+    and make an old snapshot current again.
+    """
+    return _version_entry(paper_version_key(course_id, exam_type))[0]
+
+
+def bank_version():
+    """
+    Return ``(token, changed_at)`` for the whole question bank.
+
+    Any question change replaces the token; ``changed_at`` is when that
+    happened, or when the token was first issued.
+    """
+    return _version_entry(BANK_VERSION_KEY, issued_at=timezone.now())
+
+
+def get_paper_snapshot(course_id, exam_type):
+    """
+    Return the paper's PaperSnapshot, rendering and storing it on a cache miss.
+
+    Snapshots are stored under the paper's version token; a rebuild that races
+    with an invalidation stores its result under the old token, where it is
+    never read.
+    """
+    cache = exam_paper_cache()
+    version, changed_at = _version_entry(paper_version_key(course_id, exam_type))
+    key = f'paper-snapshot:{quote(str(course_id))}:{quote(str(exam_type))}:{version}'
+
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_paper_snapshot(course_id, exam_type, version, changed_at)
+        cache.set(key, snapshot)
+    return snapshot
+
+
+def build_paper_snapshot(course_id, exam_type, version, changed_at=None):
+    """
+    Render the paper's questions. ``last_modified`` is the newest ``updated_at``,
+    or ``changed_at`` if later, since a deleted question leaves no timestamp behind.
+    """
+    questions = list(
+        Question.objects.filter(course_id=course_id, exam_type=exam_type)
+        .order_by('id')
+        .values('id', 'text', 'options', 'updated_at')
+    )
+    timestamps = [question.pop('updated_at') for question in questions]
+    if changed_at:
+        timestamps.append(changed_at)
+
+    # Same output as DRF's JSONRenderer defaults: compact separators, raw unicode.
+    body = json.dumps(questions, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return PaperSnapshot(
+        version=version,
+        question_count=len(questions),
+        gzipped_json=gzip.compress(body, mtime=0),
+        etag=hashlib.sha256(body).hexdigest()[:32],
+        last_modified=max(timestamps, default=None),
+    )
+
+
+@dataclass(frozen=True)
+class QuestionPool:
+    """
+    A paper's question ids, sorted by (difficulty, id).
+
+    ``strata`` maps each difficulty to its ``(start, stop)`` slice of ``ids``.
+    """
+    version: str
+    ids: array
+    strata: dict
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def get_question_pool(course_id, exam_type):
+    """
+    Return the paper's QuestionPool, loading it once per process and version.
+
+    The pool is not stored in the shared cache: unpickling it on every request
+    would cost time proportional to the pool rather than the draw.
+    """
+    return _load_question_pool(str(course_id), str(exam_type), paper_version(course_id, exam_type))
+
+
+@lru_cache(maxsize=QUESTION_POOL_CACHE_SIZE)
+def _load_question_pool(course_id, exam_type, version):
+    ids, strata = array('q'), {}
+    rows = (
+        Question.objects.filter(course_id=course_id, exam_type=exam_type)
+        .order_by('difficulty', 'id')
+        .values_list('id', 'difficulty')
+    )
+    for question_id, difficulty in rows:
+        start = strata.get(difficulty, (len(ids),))[0]
+        ids.append(question_id)
+        strata[difficulty] = (start, len(ids))
+    return QuestionPool(version=version, ids=ids, strata=strata)
+
+
+def invalidate_paper_snapshot(course_id, exam_type):
+    _replace_versions(paper_version_key(course_id, exam_type))
+
+
+def invalidate_bank_version():
+    _replace_versions(BANK_VERSION_KEY)
+
+
+def _version_entry(key, issued_at=None):
+    # Read from the database, so all processes agree. Paper keys come from
+    # request parameters, so reading one never writes: a paper that has not
+    # changed has the initial token. Given ``issued_at``, a missing token is
+    # issued and stored instead.
+    entry = CacheVersion.objects.filter(key=key).values_list('token', 'changed_at').first()
+    if entry is None and issued_at is not None:
+        CacheVersion.objects.bulk_create(
+            [CacheVersion(key=key, token=uuid.uuid4().hex, changed_at=issued_at)], ignore_conflicts=True,
+        )
+        entry = CacheVersion.objects.filter(key=key).values_list('token', 'changed_at').first()
+    return entry or (INITIAL_VERSION, None)
+
+
+def _replace_versions(*keys):
+    # One upsert for all the keys where the database has one, in the caller's transaction.
+    changed_at = timezone.now()
+    versions = [CacheVersion(key=key, token=uuid.uuid4().hex, changed_at=changed_at) for key in keys]
+    features = connections[CacheVersion.objects.db].features
+    if not features.supports_update_conflicts:
+        for version in versions:
+            CacheVersion.objects.update_or_create(
+                key=version.key, defaults={'token': version.token, 'changed_at': changed_at},
+            )
+        return
+    # MySQL and MariaDB upsert on any unique key and reject a named one.
+    unique_fields = ['key'] if features.supports_update_conflicts_with_target else None
+    CacheVersion.objects.bulk_create(
+        versions, update_conflicts=True, unique_fields=unique_fields, update_fields=['token', 'changed_at'],
+    )
+
+
+def answer_key_cache_stats():
+    cache = answer_key_cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / lookups if lookups else None,
+    }
+
+
+def reset_answer_key_cache_stats():
+    answer_key_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+def _increment(key):
+    # Counters live in the cache itself so workers sharing a cache backend share them.
+    cache = answer_key_cache()
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); start counting again.
+        cache.set(key, 1, timeout=None)
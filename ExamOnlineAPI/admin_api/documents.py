@@ -0,0 +1,666 @@
+"""
+Incremental re-ingestion of revised PDFs.
+
+Every PDF saved to the question bank is recorded as an IngestedDocument, keyed
+by its paper (course_id, exam_type) and file name. The document keeps a
+fingerprint of every page, the extracted text of its pages (DocumentPage) and
+the page span and content fingerprint of every question parsed from it.
+
+A page's fingerprint hashes what the page draws as stored in the PDF, so it is
+computed without extracting any text (``iter_page_fingerprints``). When the
+document is uploaded again, its fingerprints are lined up with the stored
+ones and:
+
+* only new or changed pages are extracted, unless some ingested document
+  already has the text of a page with the same fingerprint;
+* only the stretches of pages around them, widened until no question crosses
+  their edges, are parsed again, from the texts in the database;
+* the questions parsed there are diffed with the ones stored for the same
+  stretch. Unchanged questions are not touched, changed ones are updated in
+  place, so they keep their ids and answers, removed ones are deleted and new
+  ones created.
+
+The rest of the document is not read again, so re-ingesting a revision costs
+about as much as what changed in it. Pages are parsed as they are read, and
+their texts are stored a batch at a time and let go, so a first upload of a
+long document does not hold all its pages at once either.
+"""
+import json
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from functools import partial
+from difflib import SequenceMatcher
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import DocumentPage, IngestedDocument, Question, question_text_hash
+from .cache import invalidate_paper
+from .pdf_extraction import iter_page_fingerprints, iter_selected_pages
+from .utils import PARSER_VERSION, QuestionParser, iter_page_texts
+
+
+logger = logging.getLogger(__name__)
+
+
+# Question fields set from a parsed question.
+PARSED_FIELDS = ['text', 'text_hash', 'options', 'correct_option']
+# Page texts stored, or read from other documents, at a time.
+PAGE_BATCH_SIZE = 50
+
+
+class DocumentError(ValueError):
+    pass
+
+
+class DocumentConflict(DocumentError):
+    pass
+
+
+class ExtractionError(Exception):
+    pass
+
+
+@dataclass
+class IngestResult:
+    document: IngestedDocument
+    # Question texts.
+    created: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    deleted: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    unchanged: int = 0
+    pages_total: int = 0
+    pages_extracted: int = 0
+    pages_parsed: int = 0
+
+
+def ingest_document(source, file_name, course_id, exam_type, backend=None, content_hash='', on_page=None, extracted=None):
+    """
+    Save the questions of the PDF ``source`` as the document ``file_name`` of a paper.
+
+    The first upload of a document is extracted and saved whole; later uploads
+    under the same paper and file name only process what changed. ``on_page``,
+    if given, is called as ``on_page(pages_ready, pages_total)`` as pages are
+    extracted. ``extracted`` is an ExtractedDocument of the PDF read beforehand,
+    as by a batch worker; its fingerprints and texts are used and ``source`` is
+    not read. Returns an IngestResult. Raises ExtractionError if the PDF cannot
+    be read, DocumentError if it has no questions (nothing is saved then) and
+    DocumentConflict if the document was ingested or deleted at the same time.
+    """
+    if not course_id or not exam_type:
+        raise DocumentError('course_id and exam_type are required')
+    backend = backend or settings.PDF_EXTRACT_BACKEND
+    if extracted is not None:
+        content_hash = content_hash or extracted.content_hash
+    document = IngestedDocument.objects.filter(course_id=course_id, exam_type=exam_type, file_name=file_name).first()
+
+    if (
+        document is not None and content_hash and document.content_hash == content_hash
+        and document.backend == backend and document.parser_version == PARSER_VERSION
+    ):
+        if on_page:
+            on_page(len(document.pages), len(document.pages))
+        return IngestResult(document, unchanged=len(document.questions), pages_total=len(document.pages))
+
+    try:
+        digests = extracted.page_digests if extracted is not None else iter_page_fingerprints(source)
+        fingerprints = [_page_fingerprint(digest, backend) for digest in digests]
+    except Exception as e:
+        raise ExtractionError(str(e)) from e
+    if not fingerprints:
+        raise DocumentError('No questions found in PDF')
+
+    revision = Revision(
+        document.pages if document else [],
+        document.questions if document else [],
+        fingerprints,
+        reparse_all=document is None or document.parser_version != PARSER_VERSION,
+    )
+    first_ingestion = document is None
+    if first_ingestion:
+        # Page texts are stored as they are parsed, which needs the document's row.
+        document = _start_document(file_name, course_id, exam_type, backend)
+    texts = PageTexts(
+        source, fingerprints, backend, partial(_store_pages, document), on_page,
+        pages=extracted.pages if extracted is not None else None, stored={page[0] for page in revision.old_pages},
+    )
+    try:
+        windows = revision.parse(texts)
+        diff = QuestionDiff(revision, windows)
+        if not diff.entries:
+            raise DocumentError('No questions found in PDF')
+
+        result = IngestResult(
+            document, unchanged=diff.unchanged, pages_total=len(fingerprints), pages_extracted=texts.extracted,
+            pages_parsed=sum(last - first + 1 for (first, last), results in windows),
+        )
+        with transaction.atomic():
+            locked = IngestedDocument.objects.select_for_update().filter(pk=document.pk).first()
+            if locked is None:
+                raise DocumentConflict(f'{file_name} was deleted while it was being re-ingested; upload it again')
+            if locked.updated_at != document.updated_at:
+                raise DocumentConflict(f'{file_name} was re-ingested by another upload at the same time; upload it again')
+
+            diff.save(course_id, exam_type, result)
+            DocumentPage.objects.filter(document=document).exclude(fingerprint__in=set(fingerprints)).delete()
+            document.pages = revision.new_pages()
+            document.questions = diff.entries
+            document.backend = backend
+            document.parser_version = PARSER_VERSION
+            document.content_hash = content_hash or ''
+            document.save()
+    except BaseException:
+        if first_ingestion:
+            # Nothing is kept of a failed first ingestion, unless another upload has finished the document since.
+            IngestedDocument.objects.filter(pk=document.pk, updated_at=document.updated_at).delete()
+        raise
+
+    if result.created or result.updated or result.deleted:
+        # Bulk writes send no signals, so drop the paper's caches here.
+        invalidate_paper(course_id, exam_type)
+    logger.info(
+        f"Ingested {file_name}: {texts.extracted} of {len(fingerprints)} pages extracted, "
+        f"{len(result.created)} questions created, {len(result.updated)} updated, {len(result.deleted)} deleted"
+    )
+    return result
+
+
+def extract_pages(source, page_numbers, pages_total, on_page=None, backend=None):
+    """
+    Yield ``(page_number, text)`` for the given pages; all of them are read with ``iter_page_texts``.
+    """
+    if len(page_numbers) == pages_total:
+        yield from enumerate(iter_page_texts(source, on_page=on_page, backend=backend), start=1)
+    else:
+        yield from iter_selected_pages(source, page_numbers, on_page=on_page, backend=backend)
+
+
+class PageTexts:
+    """
+    Texts of the pages of an uploaded PDF, read in page order as they are parsed.
+
+    A page's text is taken from any DocumentPage with the page's fingerprint
+    and extracted from the PDF otherwise, or taken from ``pages`` if the
+    texts of all pages were extracted beforehand. The texts of pages whose
+    fingerprint is not in ``stored`` are handed to ``store``
+    ``PAGE_BATCH_SIZE`` at a time and then let go, so however long the
+    document, only about that many pages are held at once.
+    """
+
+    def __init__(self, source, fingerprints, backend, store, on_page=None, pages=None, stored=()):
+        self.source = source
+        self.fingerprints = fingerprints
+        self.backend = backend
+        self.store = store
+        self.on_page = on_page
+        self.pages = pages
+        self.stored = set(stored)
+        self.unstored = []
+        self.extracted = 0
+
+    def __getitem__(self, page_number):
+        return list(self.iter_range(page_number, page_number))[0][1]
+
+    def iter_range(self, first, last):
+        """
+        Yield ``(page_number, text)`` for pages ``first`` to ``last``, extracting the missing ones in one pass.
+        """
+        page_numbers = range(first, last + 1)
+        known = set(
+            DocumentPage.objects.filter(
+                fingerprint__in={self.fingerprints[page_number - 1] for page_number in page_numbers},
+            ).values_list('fingerprint', flat=True)
+        )
+        missing = [page_number for page_number in page_numbers if self.fingerprints[page_number - 1] not in known]
+        extracted = self.extract(missing)
+
+        for start in range(first, last + 1, PAGE_BATCH_SIZE):
+            batch = range(start, min(start + PAGE_BATCH_SIZE, last + 1))
+            wanted = {self.fingerprints[page_number - 1] for page_number in batch} & known
+            found = dict(DocumentPage.objects.filter(fingerprint__in=wanted).values_list('fingerprint', 'text')) if wanted else {}
+            for page_number in batch:
+                fingerprint = self.fingerprints[page_number - 1]
+                if fingerprint not in known:
+                    text = self._next_extracted(extracted, page_number)
+                elif fingerprint in found:
+                    text = found[fingerprint]
+                else:
+                    raise DocumentConflict(f'The stored text of page {page_number} was deleted meanwhile; upload it again')
+                self._keep(fingerprint, text)
+                yield page_number, text
+        self.flush()
+
+    def extract(self, page_numbers):
+        if not page_numbers:
+            return iter(())
+        pages_total = len(self.fingerprints)
+        report = None
+        if self.on_page:
+            def report(pages_done, pages_selected):
+                self.on_page(pages_total - len(page_numbers) + pages_done, pages_total)
+
+        try:
+            if self.pages is not None:
+                return ((page_number, self.pages[page_number - 1]) for page_number in page_numbers)
+            return iter(extract_pages(self.source, page_numbers, pages_total, on_page=report, backend=self.backend))
+        except Exception as e:
+            raise ExtractionError(str(e)) from e
+
+    def flush(self):
+        if self.unstored:
+            self.store(self.unstored)
+            self.unstored = []
+
+    def _next_extracted(self, extracted, page_number):
+        try:
+            number, text = next(extracted, (None, None))
+        except Exception as e:
+            raise ExtractionError(str(e)) from e
+        if number != page_number:
+            raise ExtractionError(f'Page {page_number} could not be read')
+        self.extracted += 1
+        return text
+
+    def _keep(self, fingerprint, text):
+        if fingerprint in self.stored:
+            return
+        self.stored.add(fingerprint)
+        self.unstored.append((fingerprint, text))
+        if len(self.unstored) >= PAGE_BATCH_SIZE:
+            self.flush()
+
+
+class Revision:
+    """
+    A new version of a document, lined up page by page with the stored one.
+
+    Pages are numbered from 1. ``parse`` parses again the stretches of pages
+    (windows) of the new version whose questions cannot be taken over.
+    """
+
+    def __init__(self, old_pages, old_questions, fingerprints, reparse_all=False):
+        self.old_pages = old_pages
+        self.old_questions = old_questions
+        self.fingerprints = fingerprints
+        self.count = len(fingerprints)
+        self.reparse_all = reparse_all
+        # Old page number -> new page number of unchanged pages, and back.
+        self.moved = {}
+        self.moved_from = {}
+        # Old page number -> (first, last) new pages in place of a changed page.
+        self.replaced = {}
+        # New pages that were added or changed, or border on removed ones.
+        self.dirty = set()
+        # Whether a question is open at the end of each parsed page.
+        self.question_open = {}
+        self._align()
+        # (first, last, touched) of every stored question in the new numbering;
+        # touched questions had a page changed, removed or inserted.
+        self.spans = [self._span(first, last) for first, last, *rest in old_questions]
+
+    def _align(self):
+        matcher = SequenceMatcher(None, [page[0] for page in self.old_pages], self.fingerprints, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                for offset in range(i2 - i1):
+                    self.moved[i1 + offset + 1] = j1 + offset + 1
+                    self.moved_from[j1 + offset + 1] = i1 + offset + 1
+                continue
+            if j2 > j1:
+                first, last = j1 + 1, j2
+            else:
+                # Pages removed: the pages on either side of the gap.
+                first, last = max(j1, 1), min(j1 + 1, self.count)
+            self.dirty.update(range(first, last + 1))
+            for old_page in range(i1 + 1, i2 + 1):
+                self.replaced[old_page] = (first, last)
+
+    def _span(self, first, last):
+        pages = range(first, last + 1)
+        if all(page in self.moved for page in pages) and self.moved[last] - self.moved[first] == last - first:
+            return self.moved[first], self.moved[last], False
+        new_first = self.moved.get(first) or self.replaced.get(first, (1, self.count))[0]
+        new_last = self.moved.get(last) or self.replaced.get(last, (1, self.count))[1]
+        return min(new_first, new_last), max(new_first, new_last), True
+
+    def question_open_after(self, page_number):
+        if page_number in self.question_open:
+            return self.question_open[page_number]
+        old_page = self.moved_from.get(page_number)
+        return True if old_page is None else bool(self.old_pages[old_page - 1][1])
+
+    def questions_in(self, first, last):
+        """
+        Return the range of indexes of the stored questions on pages ``first`` to ``last``.
+        """
+        indexes = [index for index, (low, high, touched) in enumerate(self.spans) if low <= last and high >= first]
+        return range(indexes[0], indexes[-1] + 1) if indexes else range(0)
+
+    def windows(self):
+        if self.reparse_all:
+            return [(1, self.count)]
+        windows = [(page, page) for page in self.dirty]
+        windows += [(low, high) for low, high, touched in self.spans if touched]
+        return self._expand(windows)
+
+    def _expand(self, windows):
+        # Widen the windows until no stored question crosses their edges and
+        # no question is open where they start, merging those that meet.
+        while True:
+            merged = []
+            for first, last in sorted(windows):
+                if merged and first <= merged[-1][1] + 1:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+                else:
+                    merged.append((first, last))
+
+            grown = []
+            for first, last in merged:
+                for index in self.questions_in(first, last):
+                    first, last = min(first, self.spans[index][0]), max(last, self.spans[index][1])
+                while first > 1 and self.question_open_after(first - 1):
+                    first -= 1
+                grown.append((first, last))
+
+            if grown == merged:
+                return merged
+            windows = grown
+
+    def parse(self, texts):
+        """
+        Parse the windows; return ``[((first, last), [(first_page, last_page, question), ...]), ...]`` in order.
+        """
+        parsed = []
+        windows = self.windows()
+        while windows:
+            first, last = windows.pop(0)
+            if parsed and first <= parsed[-1][0][1] + 1:
+                (first, previous_last), results = parsed.pop()
+                last = max(last, previous_last)
+
+            results, question_open = self._parse_window(first, last, texts)
+            if question_open and last < self.count:
+                # A question runs on past the window: take in the next page.
+                windows = self._expand([(first, last + 1)] + windows)
+                continue
+            parsed.append(((first, last), results))
+        return parsed
+
+    def _parse_window(self, first, last, texts):
+        parser = QuestionParser()
+        if first > 1:
+            # Text is fed page after page, so a page's last line runs into the next page.
+            parser.feed(self._unfinished_line(first, texts))
+
+        results, open_since = [], None
+        for page_number, text in texts.iter_range(first, last):
+            was_open = parser.question_open
+            questions = parser.feed(text)
+            if page_number == self.count:
+                questions += parser.close()
+            for index, question in enumerate(questions):
+                started = open_since if index == 0 and was_open and open_since else page_number
+                results.append((started, page_number, question))
+
+            if not parser.question_open:
+                open_since = None
+            elif questions or not was_open:
+                open_since = page_number
+            self.question_open[page_number] = parser.question_open
+        return results, parser.question_open
+
+    def _unfinished_line(self, first, texts):
+        parts = []
+        for page_number in range(first - 1, 0, -1):
+            text = texts[page_number]
+            newline = text.rfind('\n')
+            if newline != -1:
+                parts.append(text[newline + 1:])
+                break
+            parts.append(text)
+        return ''.join(reversed(parts))
+
+    def new_pages(self):
+        return [
+            [fingerprint, self.question_open_after(page_number)]
+            for page_number, fingerprint in enumerate(self.fingerprints, start=1)
+        ]
+
+
+class QuestionDiff:
+    """
+    The question changes between the stored and the new version of a document.
+
+    ``entries`` is the document's new question list; ``save`` writes the
+    changes and fills in the ids of the questions it creates.
+    """
+
+    def __init__(self, revision, windows):
+        self.entries = []
+        self.to_update, self.to_create, deleted = [], [], []
+        kept = 0
+
+        position = 0
+        for (first, last), results in windows:
+            inside = revision.questions_in(first, last)
+            if inside:
+                before = inside.start
+            else:
+                before = position
+                while before < len(revision.spans) and revision.spans[before][1] < first:
+                    before += 1
+            self.entries.extend(self._moved(revision, index) for index in range(position, before))
+            kept += before - position
+            position = inside.stop if inside else before
+
+            old = [revision.old_questions[index] for index in inside]
+            new = [(started, ended, question, _question_fingerprint(question)) for started, ended, question in results]
+            matcher = SequenceMatcher(None, [entry[2] for entry in old], [item[3] for item in new], autojunk=False)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                for offset in range(max(i2 - i1, j2 - j1)):
+                    old_entry = old[i1 + offset] if i1 + offset < i2 else None
+                    if j1 + offset >= j2:
+                        deleted.append(old_entry)
+                        continue
+                    started, ended, question, fingerprint = new[j1 + offset]
+                    entry = [started, ended, fingerprint, old_entry[3] if old_entry else None]
+                    self.entries.append(entry)
+                    if tag == 'equal':
+                        kept += 1
+                    elif entry[3]:
+                        self.to_update.append((entry, question, old_entry))
+                    else:
+                        self.to_create.append((entry, question))
+        self.entries.extend(self._moved(revision, index) for index in range(position, len(revision.spans)))
+        kept += len(revision.spans) - position
+
+        # A question that moved to another window keeps its row.
+        deleted_by_fingerprint = {}
+        for old_entry in deleted:
+            deleted_by_fingerprint.setdefault(old_entry[2], []).append(old_entry)
+        to_create, self.to_create = self.to_create, []
+        for entry, question in to_create:
+            moved = deleted_by_fingerprint.get(entry[2])
+            if moved:
+                entry[3] = moved.pop()[3]
+                kept += 1
+            else:
+                self.to_create.append((entry, question))
+        self.to_delete = [old_entry[3] for old_entries in deleted_by_fingerprint.values() for old_entry in old_entries if old_entry[3]]
+        self.unchanged = kept
+
+    @staticmethod
+    def _moved(revision, index):
+        first, last, fingerprint, question_id = revision.old_questions[index]
+        low, high, touched = revision.spans[index]
+        return [low, high, fingerprint, question_id]
+
+    def save(self, course_id, exam_type, result):
+        # Deletions first, so an updated or new question may take a removed one's text.
+        if self.to_delete:
+            texts = dict(Question.objects.filter(pk__in=self.to_delete).values_list('pk', 'text'))
+            Question.objects.filter(pk__in=self.to_delete).delete()
+            result.deleted.extend(texts.values())
+        self._update(exam_type, result)
+        self._create(course_id, exam_type, result)
+
+    def _update(self, exam_type, result):
+        """
+        Update changed questions in place. Those deleted from the bank meanwhile are created again.
+        """
+        if not self.to_update:
+            return
+        existing = Question.objects.in_bulk([entry[3] for entry, question_data, old_entry in self.to_update])
+        now = timezone.now()
+        updates = {}
+        for entry, question_data, old_entry in self.to_update:
+            question = existing.get(entry[3])
+            if question is None:
+                entry[3] = None
+                self.to_create.append((entry, question_data))
+                continue
+            try:
+                for name, value in _parsed_fields(question_data).items():
+                    setattr(question, name, value)
+                question.updated_at = now
+                question.clean_fields()
+            except Exception as e:
+                _keep_old(entry, old_entry, question_data, e, result)
+                continue
+            if question.text_hash in updates:
+                _keep_old(entry, old_entry, question_data, 'Question already exists', result)
+                continue
+            updates[question.text_hash] = (entry, question, old_entry, question_data)
+
+        # A new text that another question of the exam_type already has cannot be saved.
+        taken = Question.objects.filter(exam_type=exam_type, text_hash__in=list(updates)).exclude(
+            pk__in=[question.pk for entry, question, old_entry, question_data in updates.values()],
+        ).values_list('text_hash', flat=True)
+        for text_hash in set(taken):
+            entry, question, old_entry, question_data = updates.pop(text_hash)
+            _keep_old(entry, old_entry, question_data, 'Question already exists', result)
+
+        updated = [question for entry, question, old_entry, question_data in updates.values()]
+        try:
+            with transaction.atomic():
+                Question.objects.bulk_update(updated, PARSED_FIELDS + ['updated_at'])
+        except IntegrityError:
+            # e.g. two questions swapped texts; save them one by one.
+            updated = []
+            for entry, question, old_entry, question_data in updates.values():
+                try:
+                    with transaction.atomic():
+                        question.save(update_fields=PARSED_FIELDS + ['updated_at'])
+                    updated.append(question)
+                except IntegrityError as e:
+                    _keep_old(entry, old_entry, question_data, e, result)
+        result.updated.extend(question.text for question in updated)
+
+    def _create(self, course_id, exam_type, result):
+        """
+        Create new questions, skipping those whose normalized text already exists for the exam_type.
+        """
+        new_questions = []
+        for entry, question_data in self.to_create:
+            try:
+                question = Question(course_id=course_id, exam_type=exam_type, **_parsed_fields(question_data))
+                question.clean_fields()
+            except Exception as e:
+                text = question_data.get('text') if isinstance(question_data, dict) else None
+                logger.error(f"Error saving question: {text}. Error: {str(e)}")
+                result.errors.append({'text': text, 'error': str(e)})
+                continue
+            new_questions.append((entry, question))
+
+        existing_hashes = set(
+            Question.objects.filter(
+                exam_type=exam_type, text_hash__in={question.text_hash for entry, question in new_questions},
+            ).values_list('text_hash', flat=True)
+        )
+        to_create = []
+        for entry, question in new_questions:
+            if question.text_hash in existing_hashes:
+                logger.info(f"Question already exists: {question.text}")
+                result.skipped.append(question.text)
+                continue
+            existing_hashes.add(question.text_hash)
+            to_create.append((entry, question))
+
+        try:
+            with transaction.atomic():
+                Question.objects.bulk_create([question for entry, question in to_create], batch_size=settings.QUESTION_BULK_BATCH_SIZE)
+            created = to_create
+        except IntegrityError:
+            # Another upload saved some of them meanwhile; skip only those.
+            created = []
+            for entry, question in to_create:
+                try:
+                    with transaction.atomic():
+                        question.save()
+                    created.append((entry, question))
+                except IntegrityError:
+                    result.skipped.append(question.text)
+
+        for entry, question in created:
+            entry[3] = question.pk
+        result.created.extend(question.text for entry, question in created)
+
+
+def _parsed_fields(question_data):
+    return {
+        'text': question_data['text'],
+        'text_hash': question_text_hash(question_data['text']),
+        'options': question_data['options'],
+        'correct_option': question_data['correct_option'],
+    }
+
+
+def _keep_old(entry, old_entry, question_data, error, result):
+    # The stored question stays as it was; keeping its old fingerprint makes the next upload try again.
+    logger.error(f"Error updating question: {question_data.get('text')}. Error: {str(error)}")
+    result.errors.append({'text': question_data.get('text'), 'error': str(error)})
+    entry[2] = old_entry[2]
+
+
+def _start_document(file_name, course_id, exam_type, backend):
+    """
+    Create the row of a document ingested for the first time; its pages and questions are filled in at the end.
+    """
+    try:
+        with transaction.atomic():
+            return IngestedDocument.objects.create(
+                file_name=file_name, course_id=course_id, exam_type=exam_type, backend=backend,
+                parser_version=PARSER_VERSION, content_hash='',
+            )
+    except IntegrityError:
+        raise DocumentConflict(f'{file_name} was ingested by another upload at the same time; upload it again')
+
+
+def _store_pages(document, pages):
+    """
+    Store ``(fingerprint, text)`` pages of a document.
+
+    Pages are stored as soon as they are parsed, before the document is
+    saved; rows of pages the document does not end up with are dropped by
+    its next successful ingestion.
+    """
+    try:
+        DocumentPage.objects.bulk_create(
+            [DocumentPage(document=document, fingerprint=fingerprint, text=text) for fingerprint, text in pages],
+            ignore_conflicts=True,
+        )
+    except IntegrityError:
+        raise DocumentConflict(f'{document.file_name} was deleted while it was being ingested; upload it again')
+
+
+def _page_fingerprint(digest, backend):
+    # Backends extract different text from the same page.
+    return hashlib.sha256(f'{backend}:{digest}'.encode()).hexdigest()
+
+
+def _question_fingerprint(question):
+    return hashlib.sha256(
+        json.dumps([question['text'], question['options'], question['correct_option']], sort_keys=True).encode()
+    ).hexdigest()
@@ -0,0 +1,100 @@
+import csv
+import json
+from django.conf import settings
+from .models import Question
+
+
+EXPORT_FIELDS = ['id', 'text', 'options', 'correct_option', 'course_id', 'exam_type']
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'json': ('application/json', 'json'),
+}
+
+# Rows are grouped into chunks of roughly this many characters before being written out.
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+
+class Echo:
+    """File-like object whose write() hands back what it was given, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(course_id=None, exam_type=None):
+    questions = Question.objects.order_by('id')
+    if course_id:
+        questions = questions.filter(course_id=course_id)
+    if exam_type:
+        questions = questions.filter(exam_type=exam_type)
+    return questions.values_list(*EXPORT_FIELDS)
+
+
+def iter_export(export_format, course_id=None, exam_type=None, chunk_size=None, on_row=None):
+    """
+    Yield the question bank as ``ndjson``, ``csv`` or a ``json`` array, in text chunks.
+
+    Rows are read with ``QuerySet.iterator(chunk_size=...)`` (``QUESTION_EXPORT_CHUNK_SIZE``
+    by default), so memory use stays bounded whatever the size of the bank.
+    ``on_row``, if given, is called once per exported row.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}'. Choose one of: {', '.join(EXPORT_FORMATS)}")
+
+    rows = export_queryset(course_id, exam_type).iterator(chunk_size=chunk_size or settings.QUESTION_EXPORT_CHUNK_SIZE)
+    lines = ROW_WRITERS[export_format](rows, on_row)
+    return buffered(lines)
+
+
+def _iter_ndjson(rows, on_row):
+    for row in rows:
+        if on_row:
+            on_row()
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + '\n'
+
+
+def _iter_json(rows, on_row):
+    yield '['
+    separator = ''
+    for row in rows:
+        if on_row:
+            on_row()
+        yield separator + json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False)
+        separator = ','
+    yield ']\n'
+
+
+def _iter_csv(rows, on_row):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    options_index = EXPORT_FIELDS.index('options')
+    for row in rows:
+        if on_row:
+            on_row()
+        row = list(row)
+        row[options_index] = json.dumps(row[options_index], ensure_ascii=False)
+        yield writer.writerow(row)
+
+
+ROW_WRITERS = {
+    'ndjson': _iter_ndjson,
+    'csv': _iter_csv,
+    'json': _iter_json,
+}
+
+
+def buffered(lines):
+    """
+    Join an iterable of text lines into chunks of about ``EXPORT_BUFFER_SIZE`` characters.
+    """
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
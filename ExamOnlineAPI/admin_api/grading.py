@@ -0,0 +1,143 @@
+"""
+Bulk grading of offline answer sheets.
+
+A sheet is a CSV with one row per student: the first column is the student id
+and every other column is headed by a question id, e.g.::
+
+    student_id,101,102,103
+    s-0001,A,C,B
+    s-0002,B,C,
+
+The whole sheet is loaded into a NumPy array and compared with the answer key
+in one vectorized operation. Blank cells count as wrong answers.
+"""
+import csv
+from dataclasses import dataclass
+import numpy as np
+from .export import Echo, buffered
+
+
+STUDENT_REPORT_FIELDS = ['student_id', 'score', 'total', 'percent']
+QUESTION_REPORT_FIELDS = ['question_id', 'correct', 'answered', 'percent_correct']
+
+REPORTS = ('students', 'questions')
+
+
+class AnswerSheetError(ValueError):
+    pass
+
+
+@dataclass
+class AnswerSheet:
+    student_ids: list
+    question_ids: list
+    # (students x questions) array of chosen options.
+    answers: np.ndarray
+
+
+@dataclass
+class GradedSheet:
+    sheet: AnswerSheet
+    # Correct answers per student, and per question.
+    scores: np.ndarray
+    correct_counts: np.ndarray
+    # Non-blank answers per question.
+    answered_counts: np.ndarray
+
+    @property
+    def total(self):
+        return len(self.sheet.question_ids)
+
+
+def read_answer_sheet(lines):
+    """
+    Parse an answer sheet from an iterable of CSV lines.
+
+    Raises AnswerSheetError if the header or a row is malformed.
+    """
+    reader = csv.reader(lines)
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise AnswerSheetError('The answer sheet is empty')
+    except csv.Error as e:
+        raise AnswerSheetError(f'Invalid CSV: {str(e)}')
+
+    try:
+        question_ids = [int(value) for value in header[1:]]
+    except ValueError:
+        raise AnswerSheetError('Every column after the first must be headed by a question id')
+    if not question_ids:
+        raise AnswerSheetError('The answer sheet has no question columns')
+    if len(set(question_ids)) != len(question_ids):
+        raise AnswerSheetError('A question id appears in more than one column')
+
+    width = len(header)
+    student_ids, rows = [], []
+    try:
+        for line_number, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            if len(row) > width:
+                raise AnswerSheetError(f'Row {line_number} has more cells than the header')
+            student_ids.append(row[0])
+            rows.append(row[1:] + [''] * (width - len(row)))
+    except csv.Error as e:
+        raise AnswerSheetError(f'Invalid CSV: {str(e)}')
+
+    answers = np.array(rows, dtype=str).reshape(len(rows), len(question_ids))
+    return AnswerSheet(student_ids=student_ids, question_ids=question_ids, answers=np.char.strip(answers))
+
+
+def grade_answer_sheet(sheet, answer_key):
+    """
+    Grade every answer of ``sheet`` against ``answer_key`` (``{question_id: correct_option}``).
+
+    Raises AnswerSheetError if the sheet has questions the key does not know.
+    """
+    unknown = [question_id for question_id in sheet.question_ids if question_id not in answer_key]
+    if unknown:
+        raise AnswerSheetError(f"Questions not in this paper: {', '.join(map(str, unknown))}")
+
+    key = np.array([str(answer_key[question_id]) for question_id in sheet.question_ids], dtype=str)
+    correct = sheet.answers == key
+    return GradedSheet(
+        sheet=sheet,
+        scores=correct.sum(axis=1),
+        correct_counts=correct.sum(axis=0),
+        answered_counts=(sheet.answers != '').sum(axis=0),
+    )
+
+
+def iter_report(graded, report='students'):
+    """
+    Yield the per-student or per-question results as CSV text chunks.
+    """
+    if report not in REPORTS:
+        raise ValueError(f"Unknown report '{report}'. Choose one of: {', '.join(REPORTS)}")
+    lines = _iter_student_rows(graded) if report == 'students' else _iter_question_rows(graded)
+    return buffered(lines)
+
+
+def _iter_student_rows(graded):
+    writer = csv.writer(Echo())
+    yield writer.writerow(STUDENT_REPORT_FIELDS)
+    total = graded.total
+    percents = np.round(graded.scores * 100 / total, 2)
+    for student_id, score, percent in zip(graded.sheet.student_ids, graded.scores.tolist(), percents.tolist()):
+        yield writer.writerow([student_id, score, total, percent])
+
+
+def _iter_question_rows(graded):
+    writer = csv.writer(Echo())
+    yield writer.writerow(QUESTION_REPORT_FIELDS)
+    students = len(graded.sheet.student_ids)
+    percents = np.round(graded.correct_counts * 100 / students, 2) if students else [None] * graded.total
+    rows = zip(
+        graded.sheet.question_ids,
+        graded.correct_counts.tolist(),
+        graded.answered_counts.tolist(),
+        percents.tolist() if students else percents,
+    )
+    for row in rows:
+        yield writer.writerow(row)
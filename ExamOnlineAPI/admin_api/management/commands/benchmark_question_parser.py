@@ -0,0 +1,101 @@
+import re
+import time
+from django.core.management.base import BaseCommand
+from admin_api.utils import iter_questions, parse_text_to_questions
+
+
+# The regex parser the state machine replaced, kept here as the baseline.
+REGEX_QUESTION_PATTERN = re.compile(r"Question (\d+)\n(.*?)Options(.*?)The correct answer is (\w+)\.", re.DOTALL)
+REGEX_OPTION_PATTERN = re.compile(r"([A-D])\) ([^A-D]+)")
+
+QUESTION_TEMPLATE = (
+    "Question {n}\n"
+    "Choose the option that best completes the sentence.\n"
+    "Sentence number {n} is _____ long.\n"
+    "Options\n"
+    "A) {a}\n"
+    "B) {b}\n"
+    "C) {c}\n"
+    "D) {d}\n"
+    "The correct answer is B.\n"
+)
+
+INPUTS = {
+    'clean': 'Well-formed questions with lower-case options.',
+    'capitals': 'Options with capital letters, which the regex cuts short.',
+    'unanswered': 'No answer lines (e.g. the key is printed separately); every header makes the regex scan to the end.',
+}
+
+
+def regex_parse(text):
+    questions = []
+    for match in REGEX_QUESTION_PATTERN.finditer(text):
+        question_number, question_text, options_text, correct_option = match.groups()
+        questions.append({
+            'text': question_text.strip(),
+            'options': {label: option.strip() for label, option in REGEX_OPTION_PATTERN.findall(options_text)},
+            'correct_option': correct_option,
+        })
+    return questions
+
+
+def make_document(kind, count):
+    """
+    Return the text of a synthetic paper and the questions it should parse to.
+    """
+    chunks, expected = [], []
+    for n in range(1, count + 1):
+        if kind == 'capitals':
+            options = {'A': f'Accra {n}', 'B': f'Bamako and Dakar {n}', 'C': f'Conakry {n}', 'D': 'Dar es Salaam'}
+        else:
+            options = {'A': f'quite {n}', 'B': f'very {n}', 'C': 'not', 'D': 'never'}
+        question = QUESTION_TEMPLATE.format(n=n, **{label.lower(): text for label, text in options.items()})
+        if kind == 'unanswered':
+            chunks.append(question.replace('The correct answer is B.\n', ''))
+            continue
+        chunks.append(question)
+        expected.append({
+            'text': f'Choose the option that best completes the sentence.\nSentence number {n} is _____ long.',
+            'options': options,
+            'correct_option': 'B',
+        })
+    return ''.join(chunks), expected
+
+
+class Command(BaseCommand):
+    help = 'Time the question parser against the regex parser it replaced, on synthetic papers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=10000)
+        parser.add_argument('--inputs', nargs='+', choices=list(INPUTS), default=list(INPUTS))
+        parser.add_argument(
+            '--regex-limit', type=int, default=400,
+            help='Skip the regex on unanswered inputs with more questions than this; its time there grows with the cube of the size.',
+        )
+
+    def handle(self, *args, **options):
+        for kind in options['inputs']:
+            text, expected = make_document(kind, options['questions'])
+            self.stdout.write(f"{kind}: {options['questions']:,} questions, {len(text) / 1e6:.1f} MB. {INPUTS[kind]}")
+
+            started = time.perf_counter()
+            parsed = parse_text_to_questions(text)
+            self.report('state machine', time.perf_counter() - started, parsed, expected)
+
+            lines = text.splitlines(keepends=True)
+            started = time.perf_counter()
+            parsed = list(iter_questions(lines))
+            self.report('state machine, by line', time.perf_counter() - started, parsed, expected)
+
+            if kind == 'unanswered' and options['questions'] > options['regex_limit']:
+                self.stdout.write(f"  {'regex':<24}skipped, more than --regex-limit={options['regex_limit']} questions")
+                continue
+            started = time.perf_counter()
+            parsed = regex_parse(text)
+            self.report('regex', time.perf_counter() - started, parsed, expected)
+
+    def report(self, name, elapsed, parsed, expected):
+        correct = sum(1 for question, reference in zip(parsed, expected) if question == reference)
+        self.stdout.write(
+            f'  {name:<24}{elapsed:7.3f}s  {len(parsed):,} questions, {correct:,} of {len(expected):,} parsed correctly'
+        )
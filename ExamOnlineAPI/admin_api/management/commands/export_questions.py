@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from admin_api.export import EXPORT_FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = 'Stream the question bank to a file or stdout as NDJSON, CSV or a JSON array.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='export_format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--course-id', help='Only export questions of this course.')
+        parser.add_argument('--exam-type', help='Only export questions of this exam type.')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched from the database per round trip.')
+        parser.add_argument('--output', '-o', help='File to write to (default: stdout).')
+
+    def handle(self, *args, **options):
+        rows = 0
+
+        def count_row():
+            nonlocal rows
+            rows += 1
+
+        chunks = iter_export(
+            options['export_format'],
+            course_id=options['course_id'],
+            exam_type=options['exam_type'],
+            chunk_size=options['chunk_size'],
+            on_row=count_row,
+        )
+
+        started = time.perf_counter()
+        if options['output']:
+            try:
+                with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                    for chunk in chunks:
+                        f.write(chunk)
+            except OSError as e:
+                raise CommandError(f'Error writing export: {str(e)}')
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+        elapsed = time.perf_counter() - started
+
+        rate = rows / elapsed if elapsed else 0
+        self.stderr.write(f'Exported {rows} questions in {elapsed:.2f}s ({rate:,.0f} rows/s)')
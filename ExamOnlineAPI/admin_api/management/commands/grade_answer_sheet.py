@@ -0,0 +1,57 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from admin_api.cache import get_answer_key
+from admin_api.grading import AnswerSheetError, grade_answer_sheet, iter_report, read_answer_sheet
+
+
+class Command(BaseCommand):
+    help = 'Grade a CSV answer sheet (student_id, then one column per question id) against a paper.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('sheet', help="CSV answer sheet, or '-' for stdin.")
+        parser.add_argument('--course-id', required=True)
+        parser.add_argument('--exam-type', required=True)
+        parser.add_argument('--output', '-o', help='File for per-student scores (default: stdout).')
+        parser.add_argument('--questions-output', help='File for per-question correctness rates.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        answer_key = get_answer_key(options['course_id'], options['exam_type'])
+        if not answer_key:
+            raise CommandError(f"No questions found for {options['course_id']} and {options['exam_type']}")
+
+        try:
+            if options['sheet'] == '-':
+                sheet = read_answer_sheet(sys.stdin)
+            else:
+                with open(options['sheet'], encoding='utf-8-sig', newline='') as f:
+                    sheet = read_answer_sheet(f)
+            graded = grade_answer_sheet(sheet, answer_key)
+        except (AnswerSheetError, OSError) as e:
+            raise CommandError(f'Error grading answer sheet: {str(e)}')
+        graded_at = time.perf_counter()
+
+        self.write_report(graded, 'students', options['output'])
+        if options['questions_output']:
+            self.write_report(graded, 'questions', options['questions_output'])
+
+        answers = sheet.answers.size
+        elapsed = time.perf_counter() - started
+        self.stderr.write(
+            f'Graded {len(sheet.student_ids)} students x {len(sheet.question_ids)} questions '
+            f'({answers:,} answers) in {elapsed:.2f}s, {graded_at - started:.2f}s to read and grade'
+        )
+
+    def write_report(self, graded, report, path):
+        chunks = iter_report(graded, report)
+        if not path:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        try:
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        except OSError as e:
+            raise CommandError(f'Error writing {report} report: {str(e)}')
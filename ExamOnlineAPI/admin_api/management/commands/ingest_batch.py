@@ -0,0 +1,64 @@
+import json
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from admin_api.batch_ingest import BatchIngestError, batch_totals, ingest_batch, items_from_directory, items_from_zip, read_manifest
+from admin_api.pdf_extraction import BACKENDS
+
+
+class Command(BaseCommand):
+    help = 'Ingest every PDF in a ZIP file or directory, tagged with course_id/exam_type by a manifest.csv.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='ZIP file or directory of PDFs.')
+        parser.add_argument('--manifest', help='CSV manifest (file,course_id,exam_type[,backend]); default: manifest.csv in the batch.')
+        parser.add_argument('--workers', type=int, help='Extraction processes (default: BATCH_INGEST_WORKERS).')
+        parser.add_argument('--course-id', help='course_id of files the manifest does not tag.')
+        parser.add_argument('--exam-type', help='exam_type of files the manifest does not tag.')
+        parser.add_argument('--backend', choices=list(BACKENDS), default=settings.PDF_EXTRACT_BACKEND)
+        parser.add_argument('--json', action='store_true', help='Print the summaries as JSON.')
+
+    def handle(self, *args, **options):
+        defaults = {'course_id': options['course_id'], 'exam_type': options['exam_type'], 'backend': options['backend']}
+        try:
+            manifest = None
+            if options['manifest']:
+                with open(options['manifest'], encoding='utf-8-sig', newline='') as f:
+                    manifest = read_manifest(f)
+            if options['path'].lower().endswith('.zip'):
+                items = items_from_zip(options['path'], manifest, **defaults)
+            else:
+                items = items_from_directory(options['path'], manifest, **defaults)
+        except (BatchIngestError, OSError, UnicodeDecodeError) as e:
+            raise CommandError(f'Error reading batch: {str(e)}')
+        if not items:
+            raise CommandError(f"No PDF files found in {options['path']}")
+
+        workers = options['workers'] or settings.BATCH_INGEST_WORKERS
+        started = time.perf_counter()
+        summaries = ingest_batch(items, workers=workers, on_file=None if options['json'] else self.write_summary)
+        elapsed = time.perf_counter() - started
+
+        totals = batch_totals(summaries)
+        if options['json']:
+            self.stdout.write(json.dumps({**totals, 'seconds': round(elapsed, 3), 'results': summaries}, indent=2))
+        self.stderr.write(
+            f"Ingested {totals['files'] - totals['files_failed']} of {totals['files']} files ({totals['pages']:,} pages) "
+            f"with {workers} workers in {elapsed:.2f}s: {totals['questions_created']:,} questions created, "
+            f"{totals['questions_updated']:,} updated, {totals['questions_deleted']:,} deleted, "
+            f"{totals['duplicates_skipped']:,} duplicates skipped"
+        )
+
+    def write_summary(self, summary):
+        line = (
+            f"{summary['status']:<10}{summary['file']}  {summary['course_id']}/{summary['exam_type']}  "
+            f"{summary['questions_created']} created, {summary['questions_updated']} updated, "
+            f"{summary['questions_deleted']} deleted, {summary['duplicates_skipped']} duplicates, "
+            f"{len(summary['errors'])} errors, {summary['seconds']:.2f}s"
+        )
+        self.stdout.write(line)
+        for error in summary['errors']:
+            if isinstance(error, dict):
+                # A question that could not be saved.
+                error = f"{error['text']}: {error['error']}"
+            self.stdout.write(f'          {error}')
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:43
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_path', models.CharField(max_length=1024)),
+                ('course_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('exam_type', models.CharField(blank=True, max_length=20, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('pages_total', models.PositiveIntegerField(default=0)),
+                ('pages_parsed', models.PositiveIntegerField(default=0)),
+                ('questions_created', models.PositiveIntegerField(default=0)),
+                ('duplicates_skipped', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0002_ingestjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestjob',
+            name='backend',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:49
+
+import hashlib
+import unicodedata
+from django.db import IntegrityError, migrations, models
+
+
+BATCH_SIZE = 2000
+# Duplicate ids listed in the error when the backfill finds any.
+MAX_LISTED = 50
+
+
+def question_text_hash(text):
+    # Frozen copy of admin_api.models.question_text_hash at the time of this migration.
+    text = unicodedata.normalize('NFC', text or '').replace('\u200b', '')
+    return hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+
+def backfill_text_hash(apps, schema_editor):
+    """
+    Hash existing questions so the (text_hash, exam_type) unique constraint can be added.
+
+    Questions of an exam_type whose texts only differ in whitespace get the same
+    hash. They are not deleted here, since submissions and answer sheets may
+    refer to their ids: the migration stops and lists them, to be merged or
+    edited by hand before migrating again.
+    """
+    Question = apps.get_model('admin_api', 'Question')
+    first_ids = {}
+    duplicates = []
+    last_id = 0
+
+    while True:
+        batch = list(Question.objects.filter(id__gt=last_id).order_by('id').only('id', 'text', 'exam_type')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        for question in batch:
+            question.text_hash = question_text_hash(question.text)
+            key = (question.text_hash, question.exam_type)
+            if key in first_ids:
+                duplicates.append((question.id, first_ids[key]))
+            else:
+                first_ids[key] = question.id
+        Question.objects.bulk_update(batch, ['text_hash'])
+
+    if duplicates:
+        listed = ', '.join(f'{duplicate_id} (same as {original_id})' for duplicate_id, original_id in duplicates[:MAX_LISTED])
+        if len(duplicates) > MAX_LISTED:
+            listed += f' and {len(duplicates) - MAX_LISTED} more'
+        raise IntegrityError(
+            f'{len(duplicates)} questions repeat the text of an older question of the same exam_type: {listed}. '
+            'Delete or edit them, then run the migration again.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0003_ingestjob_backend'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='text_hash',
+            field=models.CharField(default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_text_hash, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='question',
+            constraint=models.UniqueConstraint(fields=('text_hash', 'exam_type'), name='unique_question_text_hash_exam_type'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0004_question_text_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['course_id', 'exam_type'], name='question_course_exam_idx'),
+        ),
+    ]
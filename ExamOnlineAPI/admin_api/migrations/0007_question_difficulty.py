@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0006_question_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='difficulty',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
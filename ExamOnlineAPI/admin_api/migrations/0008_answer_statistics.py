@@ -0,0 +1,77 @@
+# Generated by Django 5.1.4 on 2026-10-18 07:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_statistics(apps, schema_editor):
+    # One pass of aggregate queries over the submissions stored so far.
+    Answer = apps.get_model('user_api', 'Answer')
+    Submission = apps.get_model('user_api', 'Submission')
+    QuestionStats = apps.get_model('admin_api', 'QuestionStats')
+    OptionPickStats = apps.get_model('admin_api', 'OptionPickStats')
+    ExamScoreStats = apps.get_model('admin_api', 'ExamScoreStats')
+
+    answers = Answer.objects.exclude(question=None)
+    QuestionStats.objects.bulk_create(
+        QuestionStats(question_id=row['question_id'], attempts=row['attempts'], correct=row['correct'])
+        for row in answers.values('question_id').annotate(
+            attempts=Count('id'), correct=Count('id', filter=Q(correct=True)),
+        ).order_by()
+    )
+    OptionPickStats.objects.bulk_create(
+        OptionPickStats(question_id=row['question_id'], option=row['chosen_option'], picks=row['picks'])
+        for row in answers.values('question_id', 'chosen_option').annotate(picks=Count('id')).order_by()
+    )
+    ExamScoreStats.objects.bulk_create(
+        ExamScoreStats(submissions=row.pop('submissions'), **row)
+        for row in Submission.objects.exclude(course_id='').exclude(exam_type='')
+        .values('course_id', 'exam_type', 'score', 'total').annotate(submissions=Count('id')).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0007_question_difficulty'),
+        ('user_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='admin_api.question')),
+                ('attempts', models.PositiveBigIntegerField(default=0)),
+                ('correct', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ExamScoreStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course_id', models.CharField(max_length=50)),
+                ('exam_type', models.CharField(max_length=20)),
+                ('score', models.PositiveIntegerField()),
+                ('total', models.PositiveIntegerField()),
+                ('submissions', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('course_id', 'exam_type', 'score', 'total'), name='unique_exam_score_stats')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OptionPickStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('option', models.CharField(max_length=255)),
+                ('picks', models.PositiveBigIntegerField(default=0)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='option_picks', to='admin_api.question')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('question', 'option'), name='unique_option_pick_question_option')],
+            },
+        ),
+        migrations.RunPython(backfill_statistics, migrations.RunPython.noop),
+    ]
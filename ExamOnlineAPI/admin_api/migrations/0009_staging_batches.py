@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-18 07:11
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0008_answer_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StagingBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(blank=True, default='', max_length=255)),
+                ('course_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('exam_type', models.CharField(blank=True, max_length=20, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StagedQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('text_hash', models.CharField(max_length=64)),
+                ('options', models.JSONField()),
+                ('correct_option', models.CharField(max_length=5)),
+                ('excluded', models.BooleanField(default=False)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='admin_api.stagingbatch')),
+            ],
+            options={
+                'ordering': ['batch', 'position'],
+            },
+        ),
+    ]
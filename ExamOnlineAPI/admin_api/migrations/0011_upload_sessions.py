@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-18 07:24
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0010_ingestjob_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_path', models.CharField(max_length=1024)),
+                ('course_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('exam_type', models.CharField(blank=True, max_length=20, null=True)),
+                ('backend', models.CharField(blank=True, default='', max_length=20)),
+                ('size', models.BigIntegerField(blank=True, null=True)),
+                ('received', models.BigIntegerField(default=0)),
+                ('chunks', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('completed', 'Completed')], default='open', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='admin_api.ingestjob')),
+            ],
+        ),
+    ]
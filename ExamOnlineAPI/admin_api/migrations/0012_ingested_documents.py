@@ -0,0 +1,56 @@
+# Generated by Django 5.1.4 on 2026-10-18 07:35
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0011_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestjob',
+            name='questions_deleted',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ingestjob',
+            name='questions_updated',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='IngestedDocument',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('course_id', models.CharField(max_length=50)),
+                ('exam_type', models.CharField(max_length=20)),
+                ('backend', models.CharField(max_length=20)),
+                ('parser_version', models.CharField(max_length=20)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('pages', models.JSONField(default=list)),
+                ('questions', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('course_id', 'exam_type', 'file_name'), name='unique_document_paper_file_name')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DocumentPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(db_index=True, max_length=64)),
+                ('text', models.TextField()),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_texts', to='admin_api.ingesteddocument')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('document', 'fingerprint'), name='unique_document_page_fingerprint')],
+            },
+        ),
+    ]
@@ -1,13 +1,251 @@
+import uuid
+import hashlib
+import unicodedata
 from django.db import models
 from django.contrib.postgres.fields import JSONField
 
 
+def question_text_hash(text):
+    """
+    SHA-256 of the question text with unicode and whitespace normalized.
+    """
+    text = unicodedata.normalize('NFC', text or '').replace('\u200b', '')
+    return hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+
 class Question(models.Model):
     text = models.TextField()
+    text_hash = models.CharField(max_length=64, editable=False, default='')
     course_id = models.CharField(max_length=50, default='2024_june_math')  
     exam_type = models.CharField(max_length=20)  
     options = models.JSONField() 
     correct_option = models.CharField(max_length=5)
+    difficulty = models.CharField(max_length=20, blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['text_hash', 'exam_type'], name='unique_question_text_hash_exam_type'),
+        ]
+        indexes = [
+            models.Index(fields=['course_id', 'exam_type'], name='question_course_exam_idx'),
+        ]
+
+    def __str__(self):
+        return self.text
+
+    def save(self, *args, **kwargs):
+        self.text_hash = question_text_hash(self.text)
+        super().save(*args, **kwargs)
+
+
+class CacheVersion(models.Model):
+    """
+    Version token of something cached per process, such as a paper's snapshot.
+
+    The token is replaced in the same transaction as the change that makes
+    the cached copies stale, so every worker sees the change and the new token
+    together.
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    token = models.CharField(max_length=32)
+    changed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f'{self.key}: {self.token}'
+
+
+class IngestJob(models.Model):
+    """
+    Background PDF ingestion job and its progress counters.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_name = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=1024)
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    course_id = models.CharField(max_length=50, blank=True, null=True)
+    exam_type = models.CharField(max_length=20, blank=True, null=True)
+    backend = models.CharField(max_length=20, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    pages_total = models.PositiveIntegerField(default=0)
+    pages_parsed = models.PositiveIntegerField(default=0)
+    questions_created = models.PositiveIntegerField(default=0)
+    questions_updated = models.PositiveIntegerField(default=0)
+    questions_deleted = models.PositiveIntegerField(default=0)
+    duplicates_skipped = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.file_name} ({self.status})'
+
+
+class UploadSession(models.Model):
+    """
+    A PDF uploaded in chunks, appended to ``file_path`` until it is complete.
+    """
+    STATUS_OPEN = 'open'
+    STATUS_COMPLETED = 'completed'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Open'),
+        (STATUS_COMPLETED, 'Completed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_name = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=1024)
+    course_id = models.CharField(max_length=50, blank=True, null=True)
+    exam_type = models.CharField(max_length=20, blank=True, null=True)
+    backend = models.CharField(max_length=20, blank=True, default='')
+    # Declared size of the whole file, if the client knows it.
+    size = models.BigIntegerField(blank=True, null=True)
+    received = models.BigIntegerField(default=0)
+    # [offset, length, sha256] of every chunk received, in order.
+    chunks = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    job = models.ForeignKey(IngestJob, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f'{self.file_name} ({self.received} bytes, {self.status})'
+
+
+class IngestedDocument(models.Model):
+    """
+    A PDF saved to the question bank, remembered page by page so a revision can be re-ingested incrementally.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_name = models.CharField(max_length=255)
+    course_id = models.CharField(max_length=50)
+    exam_type = models.CharField(max_length=20)
+    backend = models.CharField(max_length=20)
+    parser_version = models.CharField(max_length=20)
+    content_hash = models.CharField(max_length=64)
+    # [fingerprint, question_open] of every page, in order; question_open is
+    # whether a question was still open when the parser reached the page's end.
+    pages = models.JSONField(default=list)
+    # [first_page, last_page, fingerprint, question_id] of every parsed
+    # question, in order; question_id is null if it was not saved.
+    questions = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course_id', 'exam_type', 'file_name'], name='unique_document_paper_file_name'),
+        ]
+
+    def __str__(self):
+        return f'{self.file_name} ({self.course_id} {self.exam_type})'
+
+
+class DocumentPage(models.Model):
+    """
+    Extracted text of a page of an IngestedDocument, stored under the page's fingerprint.
+    """
+    document = models.ForeignKey(IngestedDocument, on_delete=models.CASCADE, related_name='page_texts')
+    fingerprint = models.CharField(max_length=64, db_index=True)
+    text = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['document', 'fingerprint'], name='unique_document_page_fingerprint'),
+        ]
+
+    def __str__(self):
+        return f'{self.document_id} {self.fingerprint}'
+
+
+class QuestionStats(models.Model):
+    """
+    Running answer counts for a question, kept up to date as submissions are stored.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    attempts = models.PositiveBigIntegerField(default=0)
+    correct = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.question_id}: {self.correct}/{self.attempts}'
+
+
+class OptionPickStats(models.Model):
+    """
+    How often each option of a question has been chosen.
+    """
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='option_picks')
+    option = models.CharField(max_length=255)
+    picks = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'option'], name='unique_option_pick_question_option'),
+        ]
+
+    def __str__(self):
+        return f'{self.question_id} {self.option}: {self.picks}'
+
+
+class ExamScoreStats(models.Model):
+    """
+    Number of submissions of a paper that scored ``score`` out of ``total``.
+    """
+    course_id = models.CharField(max_length=50)
+    exam_type = models.CharField(max_length=20)
+    score = models.PositiveIntegerField()
+    total = models.PositiveIntegerField()
+    submissions = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['course_id', 'exam_type', 'score', 'total'], name='unique_exam_score_stats',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.course_id} {self.exam_type} {self.score}/{self.total}: {self.submissions}'
+
+
+class StagingBatch(models.Model):
+    """
+    Questions parsed from an upload and waiting for review, until ``expires_at``.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_name = models.CharField(max_length=255, blank=True, default='')
+    course_id = models.CharField(max_length=50, blank=True, null=True)
+    exam_type = models.CharField(max_length=20, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f'{self.file_name} ({self.id})'
+
+
+class StagedQuestion(models.Model):
+    batch = models.ForeignKey(StagingBatch, on_delete=models.CASCADE, related_name='questions')
+    position = models.PositiveIntegerField()
+    text = models.TextField()
+    text_hash = models.CharField(max_length=64)
+    options = models.JSONField()
+    correct_option = models.CharField(max_length=5)
+    excluded = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['batch', 'position']
 
     def __str__(self):
         return self.text
@@ -0,0 +1,17 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class QuestionCursorPagination(CursorPagination):
+    """
+    Keyset pagination over Question ids.
+
+    Each page is fetched with ``WHERE id > <cursor> ORDER BY id LIMIT page_size + 1``,
+    so its cost does not depend on how deep the client has scrolled. Cursors are opaque.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = settings.QUESTION_PAGE_SIZE
+        self.max_page_size = settings.QUESTION_MAX_PAGE_SIZE
@@ -0,0 +1,455 @@
+"""
+Page text extraction from PDF files.
+
+Text is read through a pluggable backend (pdfplumber, raw pdfminer or
+pypdfium2) and normalized so every backend feeds the question parser the same
+text. This module does not import Django so that process-pool workers can
+import it under any multiprocessing start method.
+
+A PDF ``source`` is either a path or a seekable binary file object, such as
+an in-memory upload, so uploads are read where they already are rather than
+copied to disk first. Files given by path are memory-mapped for the
+pdfplumber and pdfminer backends; pdfium reads paths itself.
+"""
+import io
+import os
+import hashlib
+import math
+import mmap
+import time
+import logging
+import zipfile
+import multiprocessing
+from contextlib import contextmanager
+from dataclasses import dataclass
+import pdfplumber
+import pypdfium2
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LTChar, LTContainer
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+from pdfplumber.page import Page
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'pdfplumber'
+
+# Each worker gets several page ranges so a slow range does not hold up the pool.
+RANGES_PER_WORKER = 4
+# Set once can_start_processes has logged that this process is daemonic.
+_daemonic_logged = False
+
+# Characters some PDF generators sprinkle between lines; they carry no text.
+INVISIBLE_CHARACTERS = {ord('\u200b'): None, ord('\x0c'): None}
+# Page attributes that decide what a page shows.
+FINGERPRINTED_PAGE_ATTRIBUTES = ('Contents', 'Resources', 'MediaBox', 'CropBox', 'Rotate')
+
+
+def is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+
+@contextmanager
+def open_pdf(source):
+    """
+    Yield a seekable binary stream over ``source``, positioned at the start.
+
+    Paths are memory-mapped when possible and opened normally otherwise (e.g.
+    empty files); bytes are wrapped without copying; file objects are used
+    as they are and left open.
+    """
+    if is_path(source):
+        with open(source, 'rb') as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                yield f
+                return
+            with mapped:
+                yield mapped
+    elif isinstance(source, (bytes, bytearray)):
+        yield io.BytesIO(source)
+    else:
+        source.seek(0)
+        yield source
+
+
+class PDFTextBackend:
+    """
+    Reads the raw text of PDF pages. Subclasses implement one PDF library.
+    """
+    name = None
+
+    def count_pages(self, source):
+        raise NotImplementedError
+
+    def iter_pages(self, source, first_page=1, last_page=None):
+        """
+        Yield the raw text of pages ``first_page`` to ``last_page`` (1-based, inclusive).
+        """
+        raise NotImplementedError
+
+
+class PdfplumberBackend(PDFTextBackend):
+    name = 'pdfplumber'
+
+    def count_pages(self, source):
+        with open_pdf(source) as stream, pdfplumber.open(stream) as pdf:
+            return resolve1(pdf.doc.catalog['Pages']).get('Count', 0)
+
+    def iter_pages(self, source, first_page=1, last_page=None):
+        # Pages are opened lazily and their cached layout objects released as
+        # soon as their text has been read, so memory does not grow with page count.
+        with open_pdf(source) as stream, pdfplumber.open(stream) as pdf:
+            doctop = 0
+            for page_number, page_obj in enumerate(PDFPage.create_pages(pdf.doc), start=1):
+                if last_page is not None and page_number > last_page:
+                    break
+
+                page = Page(pdf, page_obj, page_number=page_number, initial_doctop=doctop)
+                doctop += page.height
+                if page_number < first_page:
+                    continue
+
+                try:
+                    text = page.extract_text() or ''
+                finally:
+                    page.close()
+                del page
+                yield text
+
+
+class PdfminerBackend(PDFTextBackend):
+    """
+    Groups pdfminer's characters into lines by position, without layout analysis.
+    """
+    name = 'pdfminer'
+    x_tolerance = 3
+    y_tolerance = 3
+
+    def count_pages(self, source):
+        with open_pdf(source) as fp:
+            document = PDFDocument(PDFParser(fp))
+            return resolve1(document.catalog['Pages']).get('Count', 0)
+
+    def iter_pages(self, source, first_page=1, last_page=None):
+        with open_pdf(source) as fp:
+            manager = PDFResourceManager()
+            device = PDFPageAggregator(manager, laparams=None)
+            interpreter = PDFPageInterpreter(manager, device)
+            for page_number, page in enumerate(PDFPage.get_pages(fp), start=1):
+                if last_page is not None and page_number > last_page:
+                    break
+                if page_number < first_page:
+                    continue
+
+                interpreter.process_page(page)
+                yield self.layout_text(device.get_result())
+
+    def layout_text(self, layout):
+        chars = sorted(_iter_chars(layout), key=lambda char: (layout.y1 - char.y1, char.x0))
+
+        lines, last_top = [], None
+        for char in chars:
+            top = layout.y1 - char.y1
+            if last_top is None or top - last_top > self.y_tolerance:
+                lines.append([])
+            lines[-1].append(char)
+            last_top = top
+
+        return '\n'.join(self.line_text(line) for line in lines)
+
+    def line_text(self, chars):
+        words, word, right_edge = [], '', None
+        for char in sorted(chars, key=lambda char: char.x0):
+            text = char.get_text()
+            if text.isspace():
+                if word:
+                    words.append(word)
+                word, right_edge = '', None
+                continue
+
+            if word and char.x0 - right_edge > self.x_tolerance:
+                words.append(word)
+                word, right_edge = '', None
+
+            word += text
+            right_edge = char.x1 if right_edge is None else max(right_edge, char.x1)
+
+        if word:
+            words.append(word)
+        return ' '.join(words)
+
+
+class Pypdfium2Backend(PDFTextBackend):
+    name = 'pypdfium2'
+
+    def count_pages(self, source):
+        pdf = self.open_document(source)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def iter_pages(self, source, first_page=1, last_page=None):
+        pdf = self.open_document(source)
+        try:
+            last_page = len(pdf) if last_page is None else min(last_page, len(pdf))
+            for index in range(first_page - 1, last_page):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                try:
+                    text = textpage.get_text_bounded()
+                finally:
+                    textpage.close()
+                    page.close()
+                yield text
+        finally:
+            pdf.close()
+
+    def open_document(self, source):
+        # pdfium maps paths itself and reads file objects through callbacks.
+        if is_path(source) or isinstance(source, bytes):
+            return pypdfium2.PdfDocument(source)
+        source.seek(0)
+        return pypdfium2.PdfDocument(source, autoclose=False)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (PdfplumberBackend, PdfminerBackend, Pypdfium2Backend)
+}
+
+
+def get_backend(name=None):
+    """
+    Return the extraction backend called ``name``; raises ValueError for unknown names.
+    """
+    name = name or DEFAULT_BACKEND
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown PDF extraction backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+
+
+def normalize_page_text(text):
+    """
+    Normalize line endings and drop blank lines and invisible characters.
+    """
+    text = text.replace('\r\n', '\n').replace('\r', '\n').translate(INVISIBLE_CHARACTERS)
+    return '\n'.join(line.rstrip() for line in text.split('\n') if line.strip())
+
+
+def count_pdf_pages(source, backend=None):
+    return get_backend(backend).count_pages(source)
+
+
+def iter_pdf_pages(source, on_page=None, first_page=1, last_page=None, backend=None):
+    """
+    Yield the normalized text of each page of the PDF ``source``, one page at a time.
+
+    ``first_page`` and ``last_page`` (1-based, inclusive) limit the pages read.
+    ``on_page``, if given, is called as ``on_page(pages_parsed, pages_total)``
+    after each page's text has been extracted.
+    """
+    extractor = get_backend(backend)
+    pages_total = extractor.count_pages(source) if on_page else None
+
+    for page_number, text in enumerate(extractor.iter_pages(source, first_page, last_page), start=first_page):
+        if on_page:
+            on_page(page_number, pages_total)
+        yield normalize_page_text(text)
+
+
+def can_start_processes():
+    """
+    Return whether this process may start a process pool.
+
+    Daemonic processes, such as the children of Celery's default prefork
+    pool, may not; the first time this is found out it is logged.
+    """
+    global _daemonic_logged
+    if not multiprocessing.current_process().daemon:
+        return True
+    if not _daemonic_logged:
+        _daemonic_logged = True
+        logger.warning(
+            "Running in a daemonic process, such as a Celery prefork worker, which cannot start a process pool: "
+            "PDFs are extracted serially. Run the worker with --pool threads or --pool solo to extract in parallel."
+        )
+    return False
+
+
+def iter_pdf_pages_parallel(file_path, workers, on_page=None, backend=None):
+    """
+    Yield page texts in page order, extracting page ranges across a process pool.
+
+    ``file_path`` must be a path: every worker opens the file itself and only
+    page texts are sent back. Extracts serially in a daemonic process, such as
+    a Celery prefork worker, and if the pool cannot be started; re-extracts a
+    range in-process if its worker dies.
+    """
+    if not can_start_processes():
+        yield from iter_pdf_pages(file_path, on_page=on_page, backend=backend)
+        return
+
+    pages_total = count_pdf_pages(file_path, backend)
+    ranges = _page_ranges(pages_total, workers * RANGES_PER_WORKER)
+
+    executor = None
+    try:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = [executor.submit(extract_page_range, file_path, first, last, backend) for first, last in ranges]
+    except (AssertionError, OSError, BrokenProcessPool) as e:
+        # e.g. the process or file descriptor limit is reached.
+        logger.warning(f"Parallel PDF extraction unavailable, falling back to serial: {str(e)}")
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        yield from iter_pdf_pages(file_path, on_page=on_page, backend=backend)
+        return
+
+    try:
+        pages_parsed = 0
+        for (first, last), future in zip(ranges, futures):
+            try:
+                texts = future.result()
+            except BrokenProcessPool:
+                logger.warning(f"PDF extraction worker died, extracting pages {first}-{last} in-process")
+                texts = extract_page_range(file_path, first, last, backend)
+
+            for text in texts:
+                pages_parsed += 1
+                if on_page:
+                    on_page(pages_parsed, pages_total)
+                yield text
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def iter_selected_pages(source, page_numbers, on_page=None, backend=None):
+    """
+    Yield ``(page_number, text)`` for the given pages of the PDF ``source`` only.
+
+    Consecutive pages are read in one pass. ``on_page``, if given, is called
+    as ``on_page(pages_done, pages_selected)`` after each page.
+    """
+    page_numbers = sorted(set(page_numbers))
+    done = 0
+    for first, last in _page_runs(page_numbers):
+        for page_number, text in enumerate(iter_pdf_pages(source, first_page=first, last_page=last, backend=backend), start=first):
+            done += 1
+            if on_page:
+                on_page(done, len(page_numbers))
+            yield page_number, text
+
+
+def iter_page_fingerprints(source):
+    """
+    Yield a SHA-256 hex digest of what each page of the PDF ``source`` draws, without extracting text.
+
+    The digest covers the page's content streams, everything its resources
+    refer to (fonts, form XObjects, images) and its boxes and rotation, so a
+    page whose text could have changed gets a new fingerprint. Streams are
+    hashed as stored, without decoding them, and objects shared by several
+    pages are hashed once.
+    """
+    with open_pdf(source) as fp:
+        document = PDFDocument(PDFParser(fp))
+        digests = {}
+        for page in PDFPage.create_pages(document):
+            attributes = {name: page.attrs[name] for name in FINGERPRINTED_PAGE_ATTRIBUTES if name in page.attrs}
+            yield _object_digest(attributes, digests).hex()
+
+
+def extract_page_range(file_path, first_page, last_page, backend=None):
+    return list(iter_pdf_pages(file_path, first_page=first_page, last_page=last_page, backend=backend))
+
+
+@dataclass
+class ExtractedDocument:
+    """
+    Everything read from a PDF for ingestion, so it can be saved without opening the PDF again.
+    """
+    content_hash: str
+    # ``iter_page_fingerprints`` digest and normalized text of every page.
+    page_digests: list
+    pages: list
+    seconds: float
+
+
+def extract_document(source, backend=None, archive=None):
+    """
+    Read the content hash, page fingerprints and normalized page texts of a PDF into an ExtractedDocument.
+
+    ``archive``, if given, is the path of a ZIP file and ``source`` the name of
+    the PDF inside it, which is read without being extracted to disk. Runs as
+    a process-pool task, so it only takes and returns plain data.
+    """
+    started = time.perf_counter()
+    if archive is not None:
+        with zipfile.ZipFile(archive) as zip_file:
+            source = zip_file.read(source)
+    with open_pdf(source) as fp:
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+            digest.update(chunk)
+    page_digests = list(iter_page_fingerprints(source))
+    pages = list(iter_pdf_pages(source, backend=backend))
+    return ExtractedDocument(digest.hexdigest(), page_digests, pages, time.perf_counter() - started)
+
+
+def _object_digest(obj, digests):
+    # ``digests`` maps the ids of indirect objects already hashed to their digest.
+    if isinstance(obj, PDFObjRef):
+        if obj.objid not in digests:
+            digests[obj.objid] = b''  # Objects referring back to themselves.
+            digests[obj.objid] = _object_digest(obj.resolve(), digests)
+        return digests[obj.objid]
+
+    digest = hashlib.sha256()
+    if isinstance(obj, PDFStream):
+        digest.update(b'stream')
+        digest.update(_object_digest({key: value for key, value in obj.attrs.items() if key != 'Length'}, digests))
+        digest.update(obj.rawdata if obj.rawdata is not None else obj.data)
+    elif isinstance(obj, dict):
+        digest.update(b'dict')
+        for key in sorted(obj, key=str):
+            digest.update(repr(key).encode())
+            digest.update(_object_digest(obj[key], digests))
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b'list')
+        for value in obj:
+            digest.update(_object_digest(value, digests))
+    else:
+        digest.update(repr(obj).encode())
+    return digest.digest()
+
+
+def _iter_chars(layout):
+    for obj in layout:
+        if isinstance(obj, LTChar):
+            yield obj
+        elif isinstance(obj, LTContainer):
+            yield from _iter_chars(obj)
+
+
+def _page_ranges(pages_total, parts):
+    size = max(1, math.ceil(pages_total / max(1, parts)))
+    return [(first, min(first + size - 1, pages_total)) for first in range(1, pages_total + 1, size)]
+
+
+def _page_runs(page_numbers):
+    # Sorted page numbers as (first, last) runs of consecutive pages.
+    runs = []
+    for page_number in page_numbers:
+        if runs and runs[-1][1] == page_number - 1:
+            runs[-1][1] = page_number
+        else:
+            runs.append([page_number, page_number])
+    return [tuple(run) for run in runs]
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .cache import invalidate_paper
+from .models import Question
+
+
+@receiver(pre_save, sender=Question)
+def remember_previous_paper(sender, instance, **kwargs):
+    """
+    Keep the paper a question is being moved out of, so its caches are dropped too.
+    """
+    instance._previous_paper = None
+    if instance.pk:
+        instance._previous_paper = (
+            Question.objects.filter(pk=instance.pk).values_list('course_id', 'exam_type').first()
+        )
+
+
+@receiver(post_save, sender=Question)
+def invalidate_paper_on_save(sender, instance, **kwargs):
+    invalidate_paper(instance.course_id, instance.exam_type)
+    previous_paper = getattr(instance, '_previous_paper', None)
+    if previous_paper and previous_paper != (instance.course_id, instance.exam_type):
+        invalidate_paper(*previous_paper)
+
+
+@receiver(post_delete, sender=Question)
+def invalidate_paper_on_delete(sender, instance, **kwargs):
+    invalidate_paper(instance.course_id, instance.exam_type)
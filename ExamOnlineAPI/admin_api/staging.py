@@ -0,0 +1,226 @@
+"""
+Review staging of parsed questions.
+
+An upload sent for review is parsed once and its questions are stored as
+StagedQuestion rows under a StagingBatch. The reviewer then confirms the batch
+by id, sending only the questions they edited or excluded, and the remaining
+rows are copied into the question bank with a single ``INSERT ... SELECT``,
+so the questions never travel back through the client or the application.
+
+Batches live for ``STAGING_BATCH_TTL`` seconds. Expired batches are deleted
+whenever a new one is staged and by the ``purge_staging_batches`` task.
+"""
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+from .models import Question, StagedQuestion, StagingBatch, question_text_hash
+from .cache import invalidate_paper
+
+
+logger = logging.getLogger(__name__)
+
+
+# Question fields copied from the staged rows; the rest are set per batch.
+COPIED_FIELDS = ['text', 'text_hash', 'options', 'correct_option']
+EDITABLE_FIELDS = ['text', 'options', 'correct_option']
+
+
+class StagingError(ValueError):
+    pass
+
+
+def stage_questions(questions_data, course_id, exam_type, file_name='', batch_size=None):
+    """
+    Store parsed questions in a new StagingBatch for review.
+
+    Questions that fail validation are left out and reported like in
+    ``save_questions``. Returns ``(batch, staged_questions, errors)``.
+    """
+    batch_size = batch_size or settings.QUESTION_BULK_BATCH_SIZE
+    purge_expired_batches()
+
+    staged, errors = [], []
+    for question_data in questions_data:
+        try:
+            question = Question(
+                text=question_data['text'],
+                text_hash=question_text_hash(question_data['text']),
+                options=question_data['options'],
+                correct_option=question_data['correct_option'],
+                course_id=course_id,
+                exam_type=exam_type,
+            )
+            question.clean_fields(exclude=['course_id', 'exam_type'])
+        except Exception as e:
+            text = question_data.get('text') if isinstance(question_data, dict) else None
+            logger.error(f"Error staging question: {text}. Error: {str(e)}")
+            errors.append({'text': text, 'error': str(e)})
+            continue
+        staged.append(StagedQuestion(
+            position=len(staged),
+            **{field: getattr(question, field) for field in COPIED_FIELDS},
+        ))
+
+    with transaction.atomic():
+        batch = StagingBatch.objects.create(
+            file_name=file_name or '',
+            course_id=course_id,
+            exam_type=exam_type,
+            expires_at=timezone.now() + timedelta(seconds=settings.STAGING_BATCH_TTL),
+        )
+        for question in staged:
+            question.batch = batch
+        StagedQuestion.objects.bulk_create(staged, batch_size=batch_size)
+
+    if not all(question.pk for question in staged):
+        # Backends that do not return ids from bulk inserts.
+        staged = list(batch.questions.all())
+    return batch, staged, errors
+
+
+def get_batch(batch_id, for_update=False):
+    """
+    Return the unexpired StagingBatch with ``batch_id``, or None.
+
+    With ``for_update`` the row stays locked until the end of the transaction,
+    so a batch cannot be confirmed twice at the same time.
+    """
+    batches = StagingBatch.objects.filter(pk=batch_id, expires_at__gt=timezone.now())
+    if for_update:
+        batches = batches.select_for_update()
+    return batches.first()
+
+
+def apply_review(batch, edits=None, exclude=None):
+    """
+    Apply the reviewer's changes to the staged rows of ``batch``.
+
+    ``edits`` is a list of ``{"id": ..., <field>: <value>}`` with any of
+    ``text``, ``options`` and ``correct_option``; ``exclude`` lists the ids of
+    staged questions that must not be saved. Raises StagingError for ids that
+    are not in the batch or invalid values.
+    """
+    edits = edits or []
+    exclude = exclude or []
+    if not isinstance(edits, list) or not all(isinstance(edit, dict) for edit in edits):
+        raise StagingError('edits must be a list of objects')
+    if not isinstance(exclude, list):
+        raise StagingError('exclude must be a list of ids')
+
+    edits_by_id = {}
+    for edit in edits:
+        unknown = set(edit) - {'id', *EDITABLE_FIELDS}
+        if unknown:
+            raise StagingError(f"Fields cannot be edited: {', '.join(sorted(unknown))}")
+        edits_by_id[edit.get('id')] = edit
+
+    requested_ids = set(edits_by_id) | set(exclude)
+    found = {
+        question.pk: question
+        for question in batch.questions.filter(pk__in=[pk for pk in requested_ids if isinstance(pk, int)])
+    }
+    missing = requested_ids - set(found)
+    if missing:
+        raise StagingError(f"Questions not in this batch: {', '.join(map(str, sorted(missing, key=str)))}")
+
+    edited = []
+    for pk, edit in edits_by_id.items():
+        question = found[pk]
+        for field in EDITABLE_FIELDS:
+            if field in edit:
+                setattr(question, field, edit[field])
+        try:
+            Question(options=question.options, text=question.text, correct_option=question.correct_option).clean_fields(
+                exclude=['course_id', 'exam_type', 'text_hash'],
+            )
+        except Exception as e:
+            raise StagingError(f'Invalid edit for question {pk}: {str(e)}')
+        question.text_hash = question_text_hash(question.text)
+        edited.append(question)
+
+    if edited:
+        StagedQuestion.objects.bulk_update(edited, EDITABLE_FIELDS + ['text_hash'])
+    if exclude:
+        batch.questions.filter(pk__in=exclude).update(excluded=True)
+
+
+def promote_batch(batch, course_id=None, exam_type=None):
+    """
+    Copy the non-excluded questions of ``batch`` into the question bank and delete the batch.
+
+    ``course_id`` and ``exam_type`` default to the ones given at upload. Rows
+    whose (text_hash, exam_type) already exists, in the bank or earlier in the
+    batch, are skipped by the unique constraint. Raises StagingError, and saves
+    nothing, if the paper is invalid or a row is left out for any other reason.
+    Returns a dict with the ``created``, ``skipped`` and ``excluded`` counts.
+    """
+    course_id = course_id or batch.course_id
+    exam_type = exam_type or batch.exam_type
+    if not course_id or not exam_type:
+        raise StagingError('course_id and exam_type are required')
+    try:
+        Question(course_id=course_id, exam_type=exam_type).clean_fields(exclude=COPIED_FIELDS)
+    except ValidationError as e:
+        raise StagingError('; '.join(f"{name}: {' '.join(messages)}" for name, messages in e.message_dict.items()))
+
+    with transaction.atomic():
+        included = batch.questions.filter(excluded=False).count()
+        excluded = batch.questions.filter(excluded=True).count()
+        created = _insert_from_staging(batch, course_id, exam_type)
+        # The insert ignores conflicts, and on some databases that also drops
+        # rows that break other constraints; only duplicates may be missing.
+        missing = batch.questions.filter(excluded=False).exclude(
+            Exists(Question.objects.filter(exam_type=exam_type, text_hash=OuterRef('text_hash'))),
+        ).count()
+        if missing:
+            raise StagingError(f'{missing} questions could not be saved')
+        batch.delete()
+
+    if created:
+        # Rows written by raw SQL send no signals, so drop the paper's caches here.
+        invalidate_paper(course_id, exam_type)
+    return {'created': created, 'skipped': included - created, 'excluded': excluded}
+
+
+def _insert_from_staging(batch, course_id, exam_type):
+    question_table = connection.ops.quote_name(Question._meta.db_table)
+    staged_table = connection.ops.quote_name(StagedQuestion._meta.db_table)
+    copied = [Question._meta.get_field(field).column for field in COPIED_FIELDS]
+    constant_fields = ['course_id', 'exam_type', 'difficulty', 'updated_at']
+    columns = copied + [Question._meta.get_field(field).column for field in constant_fields]
+
+    question_fields = [Question._meta.get_field(field) for field in ['text_hash', 'exam_type']]
+    sql = (
+        f"{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} {question_table} "
+        f"({', '.join(connection.ops.quote_name(column) for column in columns)}) "
+        f"SELECT {', '.join(connection.ops.quote_name(column) for column in copied)}, %s, %s, %s, %s "
+        f"FROM {staged_table} "
+        f"WHERE {connection.ops.quote_name(StagedQuestion._meta.get_field('batch').column)} = %s "
+        f"AND {connection.ops.quote_name(StagedQuestion._meta.get_field('excluded').column)} = %s "
+        f"ORDER BY {connection.ops.quote_name(StagedQuestion._meta.get_field('position').column)}"
+        f"{connection.ops.on_conflict_suffix_sql(question_fields, OnConflict.IGNORE, None, None)}"
+    )
+    params = [
+        course_id,
+        exam_type,
+        '',
+        Question._meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection),
+        StagedQuestion._meta.get_field('batch').get_db_prep_value(batch.pk, connection),
+        False,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def purge_expired_batches():
+    """
+    Delete the staging batches that have expired. Returns how many were deleted.
+    """
+    deleted, by_model = StagingBatch.objects.filter(expires_at__lte=timezone.now()).delete()
+    return by_model.get(StagingBatch._meta.label, 0)
@@ -0,0 +1,127 @@
+"""
+Answer statistics maintained as submissions are stored.
+
+Each stored group of submissions is first reduced to per-key deltas in
+memory, then applied to every counter table with one INSERT of the missing
+rows (ignoring conflicts) and one ``UPDATE ... SET n = n + CASE ... END``.
+The cost of a write therefore depends on the number of distinct questions,
+options and scores in the group, not on the number of answers, and reading
+the statistics of an exam never touches the submissions.
+"""
+from functools import reduce
+from operator import or_
+from collections import Counter, defaultdict
+from django.db.models import Case, F, Q, Value, When
+from .models import ExamScoreStats, OptionPickStats, Question, QuestionStats
+
+
+# Keys per INSERT/UPDATE statement.
+STATS_BATCH_SIZE = 500
+
+
+def record_results(answers, scores):
+    """
+    Add graded answers and submission scores to the statistics.
+
+    ``answers`` yields ``(question_id, chosen_option, correct)`` and ``scores``
+    yields ``(course_id, exam_type, score, total)``; submissions without a
+    paper should be left out of ``scores``. Call inside the transaction that
+    stores the submissions.
+    """
+    question_counts = defaultdict(Counter)
+    option_counts = defaultdict(Counter)
+    for question_id, chosen_option, correct in answers:
+        if question_id is None:
+            continue
+        question_counts[(question_id,)]['attempts'] += 1
+        question_counts[(question_id,)]['correct'] += int(correct)
+        option_counts[(question_id, chosen_option)]['picks'] += 1
+
+    score_counts = defaultdict(Counter)
+    for paper_score in scores:
+        score_counts[paper_score]['submissions'] += 1
+
+    increment_counters(QuestionStats, ('question_id',), question_counts)
+    increment_counters(OptionPickStats, ('question_id', 'option'), option_counts)
+    increment_counters(ExamScoreStats, ('course_id', 'exam_type', 'score', 'total'), score_counts)
+
+
+def increment_counters(model, key_fields, counts, batch_size=STATS_BATCH_SIZE):
+    """
+    Add ``counts`` (``{key: {field: delta}}``) to the rows of ``model`` identified by ``key_fields``.
+
+    Missing rows are created with their counters at zero first.
+    """
+    keys = sorted(counts)
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        model.objects.bulk_create(
+            [model(**dict(zip(key_fields, key))) for key in batch], ignore_conflicts=True,
+        )
+
+        updates = {}
+        for field in sorted({field for key in batch for field in counts[key]}):
+            keys_by_delta = defaultdict(list)
+            for key in batch:
+                if counts[key][field]:
+                    keys_by_delta[counts[key][field]].append(key)
+            updates[field] = F(field) + Case(
+                *[When(_matching(key_fields, keys), then=Value(delta)) for delta, keys in keys_by_delta.items()],
+                default=Value(0),
+            )
+        model.objects.filter(_matching(key_fields, batch)).update(**updates)
+
+
+def _matching(key_fields, keys):
+    # Most keys share their trailing fields (an option label, a paper), so match
+    # them with one IN list per combination instead of one condition per key.
+    leading_values = defaultdict(list)
+    for key in keys:
+        leading_values[key[1:]].append(key[0])
+    return reduce(or_, (
+        Q(**dict(zip(key_fields[1:], rest)), **{f'{key_fields[0]}__in': values})
+        for rest, values in leading_values.items()
+    ))
+
+
+def exam_stats(course_id, exam_type):
+    """
+    Return the statistics of a paper and of each of its questions, from the counter tables only.
+    """
+    questions = (
+        Question.objects.filter(course_id=course_id, exam_type=exam_type)
+        .order_by('id')
+        .values_list('id', 'text', 'stats__attempts', 'stats__correct')
+    )
+    option_picks = defaultdict(dict)
+    for question_id, option, picks in OptionPickStats.objects.filter(
+        question__course_id=course_id, question__exam_type=exam_type,
+    ).order_by('question_id', 'option').values_list('question_id', 'option', 'picks'):
+        option_picks[question_id][option] = picks
+
+    distribution = list(
+        ExamScoreStats.objects.filter(course_id=course_id, exam_type=exam_type)
+        .order_by('total', 'score')
+        .values('score', 'total', 'submissions')
+    )
+    submissions = sum(row['submissions'] for row in distribution)
+    points = sum(row['score'] * row['submissions'] for row in distribution)
+
+    return {
+        'course_id': course_id,
+        'exam_type': exam_type,
+        'submissions': submissions,
+        'mean_score': points / submissions if submissions else None,
+        'score_distribution': distribution,
+        'questions': [
+            {
+                'question_id': question_id,
+                'text': text,
+                'attempts': attempts or 0,
+                'correct': correct or 0,
+                'percent_correct': 100 * correct / attempts if attempts else None,
+                'option_picks': option_picks.get(question_id, {}),
+            }
+            for question_id, text, attempts, correct in questions
+        ],
+    }
@@ -0,0 +1,88 @@
+import os
+import logging
+from celery import shared_task
+from django.utils import timezone
+from .models import IngestJob
+from .documents import DocumentError, ExtractionError, ingest_document
+from .staging import purge_expired_batches
+from .upload_sessions import purge_expired_sessions
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def ingest_pdf(job_id):
+    """
+    Save the questions of an uploaded PDF as a document, recording progress on its IngestJob.
+    """
+    try:
+        job = IngestJob.objects.get(pk=job_id)
+    except IngestJob.DoesNotExist:
+        logger.error(f"Ingest job {job_id} does not exist")
+        return
+
+    def update_job(**fields):
+        IngestJob.objects.filter(pk=job.pk).update(updated_at=timezone.now(), **fields)
+
+    def on_page(pages_parsed, pages_total):
+        update_job(pages_parsed=pages_parsed, pages_total=pages_total)
+
+    update_job(status=IngestJob.STATUS_RUNNING)
+
+    try:
+        try:
+            result = ingest_document(
+                job.file_path, job.file_name, job.course_id, job.exam_type, backend=job.backend or None,
+                content_hash=job.content_hash, on_page=on_page,
+            )
+        except ExtractionError as e:
+            logger.error(f"Error extracting data from PDF: {str(e)}")
+            update_job(status=IngestJob.STATUS_FAILED, errors=[f'Error extracting data from PDF: {str(e)}'])
+            return
+        except DocumentError as e:
+            logger.warning(f"Ingest job {job_id} failed: {str(e)}")
+            update_job(status=IngestJob.STATUS_FAILED, errors=[str(e)])
+            return
+
+        update_job(
+            status=IngestJob.STATUS_SUCCEEDED,
+            pages_parsed=result.pages_total,
+            pages_total=result.pages_total,
+            questions_created=len(result.created),
+            questions_updated=len(result.updated),
+            questions_deleted=len(result.deleted),
+            # Questions already in the bank, whether from this document or another.
+            duplicates_skipped=len(result.skipped) + result.unchanged,
+            errors=result.errors,
+        )
+
+    except Exception as e:
+        logger.error(f"An unexpected error occurred in ingest job {job_id}: {str(e)}")
+        update_job(status=IngestJob.STATUS_FAILED, errors=[f'An error occurred: {str(e)}'])
+
+    finally:
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
+
+
+@shared_task
+def purge_staging_batches():
+    """
+    Delete the upload review batches that have expired.
+    """
+    deleted = purge_expired_batches()
+    if deleted:
+        logger.info(f"Purged {deleted} expired staging batches")
+    return deleted
+
+
+@shared_task
+def purge_upload_sessions():
+    """
+    Delete expired chunked uploads and the files of those never completed.
+    """
+    deleted = purge_expired_sessions()
+    if deleted:
+        logger.info(f"Purged {deleted} expired upload sessions")
+    return deleted
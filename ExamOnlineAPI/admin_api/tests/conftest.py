@@ -0,0 +1,35 @@
+import os
+import pytest
+from rest_framework.test import APIClient
+from ExamOnlineAPI.celery import app as celery_app
+from accounts.models import CustomUser
+
+
+@pytest.fixture
+def auth_client(db):
+    user = CustomUser.objects.create_user(username='admin', email='admin@example.com', password='secret')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def sample_pdf():
+    return os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sample.pdf')
+
+
+@pytest.fixture
+def ingest_dir(settings, tmp_path):
+    """An empty PDF_INGEST_DIR of the test's own."""
+    path = tmp_path / 'ingest'
+    path.mkdir()
+    settings.PDF_INGEST_DIR = str(path)
+    return path
+
+
+@pytest.fixture
+def eager_celery(ingest_dir):
+    """Run Celery tasks inline, the way the in-memory broker is used in tests."""
+    celery_app.conf.update(CELERY_TASK_ALWAYS_EAGER=True)
+    yield
+    celery_app.conf.update(CELERY_TASK_ALWAYS_EAGER=False)
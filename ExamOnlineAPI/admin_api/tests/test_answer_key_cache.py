@@ -0,0 +1,132 @@
+import json
+import pytest
+from django.db import connection
+from django.core.cache.backends.locmem import LocMemCache
+from admin_api.cache import answer_key_cache_stats, get_answer_key, get_paper_snapshot, reset_answer_key_cache_stats
+from admin_api.models import CacheVersion, Question
+from admin_api.utils import save_questions
+
+
+@pytest.fixture
+def question(db):
+    return Question.objects.create(text='What is 2 + 2?', options={'A': '4'}, correct_option='A', course_id='101', exam_type='waec')
+
+
+def test_warm_answer_key_reads_only_the_version_token(question, django_assert_num_queries):
+    with django_assert_num_queries(2):
+        assert get_answer_key('101', 'waec') == {question.id: 'A'}
+    with django_assert_num_queries(1):
+        assert get_answer_key('101', 'waec') == {question.id: 'A'}
+
+
+def test_answer_key_correction_is_shared_between_processes(question, mocker):
+    get_answer_key('101', 'waec')
+
+    # Another worker process, with a local-memory cache of its own, corrects the key.
+    mocker.patch('admin_api.cache.answer_key_cache', return_value=LocMemCache('other-process', {}))
+    question.correct_option = 'B'
+    question.save()
+    mocker.stopall()
+
+    assert get_answer_key('101', 'waec') == {question.id: 'B'}
+
+
+def test_save_and_delete_invalidate_answer_key(question):
+    get_answer_key('101', 'waec')
+
+    question.correct_option = 'B'
+    question.save()
+    assert get_answer_key('101', 'waec') == {question.id: 'B'}
+
+    question.delete()
+    assert get_answer_key('101', 'waec') == {}
+
+
+def test_moving_question_invalidates_both_papers(question):
+    get_answer_key('101', 'waec')
+    get_answer_key('101', 'jamb')
+
+    question.exam_type = 'jamb'
+    question.save()
+
+    assert get_answer_key('101', 'waec') == {}
+    assert get_answer_key('101', 'jamb') == {question.id: 'A'}
+
+
+def test_bulk_ingest_invalidates_answer_key(question):
+    get_answer_key('101', 'waec')
+
+    save_questions([{'text': 'What is 3 + 3?', 'options': {'A': '6'}, 'correct_option': 'A'}], '101', 'waec')
+
+    assert len(get_answer_key('101', 'waec')) == 2
+
+
+def test_cache_stats_endpoint(auth_client, question):
+    reset_answer_key_cache_stats()
+    get_answer_key('101', 'waec')
+    get_answer_key('101', 'waec')
+    get_answer_key('101', 'waec')
+
+    assert answer_key_cache_stats() == {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3}
+    response = auth_client.get('/admin-api/answer-key-cache/')
+    assert response.status_code == 200
+    assert response.json()['hits'] == 2
+
+
+def test_paper_snapshot_is_versioned_by_changes(question, django_assert_num_queries):
+    snapshot = get_paper_snapshot('101', 'waec')
+    assert snapshot.question_count == 1
+    assert json.loads(snapshot.json) == [{'id': question.id, 'text': 'What is 2 + 2?', 'options': {'A': '4'}}]
+    # Only the paper's version token is read.
+    with django_assert_num_queries(1):
+        assert get_paper_snapshot('101', 'waec') == snapshot
+
+    save_questions([{'text': 'What is 3 + 3?', 'options': {'A': '6'}, 'correct_option': 'A'}], '101', 'waec')
+    rebuilt = get_paper_snapshot('101', 'waec')
+    assert rebuilt.version != snapshot.version
+    assert rebuilt.question_count == 2
+
+    question.delete()
+    assert get_paper_snapshot('101', 'waec').question_count == 1
+
+
+def test_paper_version_is_shared_between_processes(question, mocker):
+    snapshot = get_paper_snapshot('101', 'waec')
+
+    # Another worker process, with a local-memory cache of its own, changes the paper.
+    mocker.patch('admin_api.cache.exam_paper_cache', return_value=LocMemCache('other-process', {}))
+    question.text = 'What is 3 + 3?'
+    question.save()
+    mocker.stopall()
+
+    rebuilt = get_paper_snapshot('101', 'waec')
+    assert rebuilt.version != snapshot.version
+    assert json.loads(rebuilt.json)[0]['text'] == 'What is 3 + 3?'
+
+
+def test_reading_an_unknown_paper_stores_nothing(db):
+    assert get_paper_snapshot('999', 'mock').question_count == 0
+    assert not CacheVersion.objects.exists()
+
+
+@pytest.mark.parametrize('upsert, with_target', [(False, False), (True, False)])
+def test_versions_are_replaced_without_a_targeted_upsert(question, mocker, upsert, with_target):
+    snapshot = get_paper_snapshot('101', 'waec')
+    features = connection.features
+    mocker.patch.object(features, 'supports_update_conflicts', upsert)
+    mocker.patch.object(features, 'supports_update_conflicts_with_target', with_target)
+    bulk_create = mocker.spy(CacheVersion.objects, 'bulk_create')
+    if upsert:
+        # As on MySQL, where SQLite's ON CONFLICT would need the target this leaves out.
+        bulk_create.side_effect = lambda versions, **options: [
+            CacheVersion.objects.update_or_create(key=version.key, defaults={'token': version.token})
+            for version in versions
+        ]
+
+    question.text = 'What is 3 + 3?'
+    question.save()
+
+    assert get_paper_snapshot('101', 'waec').version != snapshot.version
+    assert bulk_create.call_count == upsert
+    if upsert:
+        assert bulk_create.call_args.kwargs['unique_fields'] is None
@@ -0,0 +1,218 @@
+import io
+import os
+import json
+import hashlib
+import shutil
+import zipfile
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from admin_api.batch_ingest import BatchIngestError, ingest_batch, items_from_directory, items_from_zip, read_manifest
+from admin_api.models import DocumentPage, IngestedDocument, IngestJob, Question
+
+
+MANIFEST = 'file,course_id,exam_type\npapers/english.pdf,english,waec\nenglish.pdf,english,neco\n'
+
+
+@pytest.fixture
+def batch_dir(tmp_path, sample_pdf):
+    os.makedirs(tmp_path / 'batch' / 'papers')
+    shutil.copy(sample_pdf, tmp_path / 'batch' / 'papers' / 'english.pdf')
+    shutil.copy(sample_pdf, tmp_path / 'batch' / 'english.pdf')
+    (tmp_path / 'batch' / 'manifest.csv').write_text(MANIFEST)
+    return str(tmp_path / 'batch')
+
+
+def make_zip(directory):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_file:
+        for root, dirs, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                zip_file.write(path, os.path.relpath(path, directory))
+    buffer.seek(0)
+    buffer.name = 'batch.zip'
+    return buffer
+
+
+def test_read_manifest():
+    manifest = read_manifest(io.StringIO('file,course_id,exam_type,backend\n./a.pdf,math,waec,\nb.pdf,,neco,pypdfium2\n'))
+    assert manifest == {
+        'a.pdf': {'course_id': 'math', 'exam_type': 'waec', 'backend': None},
+        'b.pdf': {'course_id': None, 'exam_type': 'neco', 'backend': 'pypdfium2'},
+    }
+
+
+@pytest.mark.parametrize('text', ['file,exam_type\na.pdf,waec\n', 'file,course_id,exam_type\na.pdf,x,y\na.pdf,x,z\n'])
+def test_read_manifest_rejects_invalid(text):
+    with pytest.raises(BatchIngestError):
+        read_manifest(io.StringIO(text))
+
+
+def test_items_are_tagged_by_manifest_and_defaults(batch_dir, sample_pdf):
+    shutil.copy(sample_pdf, os.path.join(batch_dir, 'untagged.pdf'))
+    with open(os.path.join(batch_dir, 'manifest.csv'), 'a') as f:
+        f.write('lost.pdf,english,waec\n')
+
+    items = {item.file: item for item in items_from_directory(batch_dir, exam_type='jamb')}
+    assert set(items) == {'english.pdf', 'papers/english.pdf', 'untagged.pdf', 'lost.pdf'}
+    assert (items['papers/english.pdf'].course_id, items['papers/english.pdf'].exam_type) == ('english', 'waec')
+    assert items['english.pdf'].exam_type == 'neco'
+    assert items['english.pdf'].error is None
+    # Untagged files take the defaults, and both course_id and exam_type are required.
+    assert items['untagged.pdf'].exam_type == 'jamb'
+    assert items['untagged.pdf'].error
+    assert items['lost.pdf'].error == 'File listed in the manifest was not found'
+
+
+def test_ingest_batch_saves_each_file_with_one_insert(db, batch_dir):
+    items = items_from_directory(batch_dir, backend='pypdfium2')
+    with CaptureQueriesContext(connection) as context:
+        summaries = ingest_batch(items, workers=1)
+
+    inserts = [
+        query for query in context.captured_queries
+        if query['sql'].startswith('INSERT') and 'admin_api_question"' in query['sql'].split('(')[0]
+    ]
+    assert len(inserts) == 2
+    assert [summary['file'] for summary in summaries] == ['english.pdf', 'papers/english.pdf']
+    assert all(summary['status'] == 'succeeded' for summary in summaries)
+    assert all(summary['questions_created'] == summary['questions_found'] > 0 for summary in summaries)
+    assert all(summary['pages'] and summary['seconds'] > 0 for summary in summaries)
+    assert Question.objects.filter(course_id='english', exam_type='neco').count() == summaries[0]['questions_created']
+
+    summaries = ingest_batch(items, workers=1)
+    assert all(summary['questions_created'] == 0 for summary in summaries)
+    assert all(summary['duplicates_skipped'] == summary['questions_found'] for summary in summaries)
+
+
+def test_batch_files_are_recorded_as_documents(db, batch_dir, auth_client):
+    summaries = ingest_batch(items_from_directory(batch_dir, backend='pypdfium2'), workers=1)
+
+    documents = {document.file_name: document for document in IngestedDocument.objects.all()}
+    assert set(documents) == {'english.pdf', 'papers/english.pdf'}
+    for summary in summaries:
+        document = documents[summary['file']]
+        assert (document.course_id, document.exam_type) == (summary['course_id'], summary['exam_type'])
+        assert len(document.pages) == summary['pages'] == DocumentPage.objects.filter(document=document).count()
+        assert len(document.questions) == summary['questions_found']
+
+    # An upload of the same document reuses what the batch stored.
+    with open(os.path.join(batch_dir, 'english.pdf'), 'rb') as pdf_file:
+        response = auth_client.post('/admin-api/upload-pdf/', {
+            'file': pdf_file, 'course_id': 'english', 'exam_type': 'neco', 'backend': 'pypdfium2',
+        }, format='multipart')
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data['document_id'] == str(documents['english.pdf'].id)
+    assert response.data['pages_extracted'] == 0
+    assert response.data['created_questions'] == []
+
+
+def test_ingest_batch_in_parallel_from_zip_on_disk(db, batch_dir, tmp_path):
+    archive = str(tmp_path / 'batch.zip')
+    with open(archive, 'wb') as f:
+        f.write(make_zip(batch_dir).read())
+
+    items = items_from_zip(archive, backend='pypdfium2')
+    assert all(item.archive == archive for item in items)
+    serial = ingest_batch(items_from_directory(batch_dir, backend='pypdfium2'), workers=1)
+    IngestedDocument.objects.all().delete()
+    Question.objects.all().delete()
+    parallel = ingest_batch(items, workers=2)
+
+    assert [summary['questions_created'] for summary in parallel] == [summary['questions_created'] for summary in serial]
+
+
+def test_failed_file_does_not_stop_the_batch(db, batch_dir):
+    with open(os.path.join(batch_dir, 'english.pdf'), 'wb') as f:
+        f.write(b'%PDF-1.4 not really')
+
+    summaries = {summary['file']: summary for summary in ingest_batch(items_from_directory(batch_dir, backend='pypdfium2'), workers=2)}
+    assert summaries['english.pdf']['status'] == 'failed'
+    assert summaries['english.pdf']['errors'][0].startswith('Error extracting data from PDF')
+    assert summaries['papers/english.pdf']['status'] == 'succeeded'
+    assert Question.objects.filter(exam_type='waec').exists()
+
+
+def test_batch_ingest_endpoint_queues_a_task_per_file(auth_client, batch_dir, ingest_dir, sample_pdf, mocker):
+    group = mocker.patch('admin_api.views.group')
+    response = auth_client.post('/admin-api/batch-ingest/', {'file': make_zip(batch_dir), 'backend': 'pypdfium2'}, format='multipart')
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert (response.data['files'], response.data['files_failed']) == (2, 0)
+    jobs = {job['file']: job for job in response.data['jobs']}
+    assert {job['exam_type'] for job in jobs.values()} == {'waec', 'neco'}
+    assert all(job['status'] == IngestJob.STATUS_PENDING for job in jobs.values())
+    assert jobs['english.pdf']['status_url'] == f"/admin-api/ingest-jobs/{jobs['english.pdf']['job_id']}/"
+    assert not Question.objects.exists()
+
+    tasks = list(group.call_args.args[0])
+    assert sorted(task.args for task in tasks) == sorted((job['job_id'],) for job in jobs.values())
+    assert {task.task for task in tasks} == {'admin_api.tasks.ingest_pdf'}
+    group.return_value.delay.assert_called_once_with()
+    # Each PDF has a file of its own and the archive is gone.
+    stored = IngestJob.objects.values_list('file_path', 'content_hash')
+    assert sorted(os.path.dirname(path) for path, content_hash in stored) == [str(ingest_dir)] * 2
+    with open(sample_pdf, 'rb') as f:
+        assert {content_hash for path, content_hash in stored} == {hashlib.sha256(f.read()).hexdigest()}
+    assert sorted(str(path) for path in ingest_dir.iterdir()) == sorted(path for path, content_hash in stored)
+
+
+def test_batch_ingest_jobs_report_each_file(auth_client, eager_celery, batch_dir, ingest_dir):
+    with open(os.path.join(batch_dir, 'manifest.csv'), 'a') as f:
+        f.write('lost.pdf,english,waec\n')
+    response = auth_client.post('/admin-api/batch-ingest/', {'file': make_zip(batch_dir), 'backend': 'pypdfium2'}, format='multipart')
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert (response.data['files'], response.data['files_failed']) == (3, 1)
+    jobs = {job['file']: auth_client.get(job['status_url']).json() for job in response.data['jobs']}
+    assert jobs['lost.pdf']['status'] == IngestJob.STATUS_FAILED
+    assert jobs['lost.pdf']['errors'] == ['File listed in the manifest was not found']
+    for name in ['english.pdf', 'papers/english.pdf']:
+        assert jobs[name]['status'] == IngestJob.STATUS_SUCCEEDED
+        assert jobs[name]['pages_total'] == jobs[name]['pages_parsed'] > 0
+        assert jobs[name]['questions_created'] == Question.objects.filter(exam_type=jobs[name]['exam_type']).count() > 0
+    assert list(ingest_dir.iterdir()) == []
+
+
+def test_batch_ingest_endpoint_takes_separate_manifest_and_defaults(auth_client, eager_celery, batch_dir):
+    os.remove(os.path.join(batch_dir, 'manifest.csv'))
+    manifest = io.BytesIO(b'file,course_id,exam_type\nenglish.pdf,english,neco\n')
+    manifest.name = 'manifest.csv'
+    response = auth_client.post('/admin-api/batch-ingest/', {
+        'file': make_zip(batch_dir),
+        'manifest': manifest,
+        'course_id': 'english',
+        'exam_type': 'jamb',
+        'backend': 'pypdfium2',
+    }, format='multipart')
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert {(job['file'], job['exam_type']) for job in response.data['jobs']} == {
+        ('english.pdf', 'neco'), ('papers/english.pdf', 'jamb'),
+    }
+
+
+def test_batch_ingest_endpoint_rejects_invalid_uploads(auth_client, ingest_dir):
+    not_zip = io.BytesIO(b'not a zip')
+    not_zip.name = 'batch.zip'
+    response = auth_client.post('/admin-api/batch-ingest/', {'file': not_zip}, format='multipart')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    pdf = io.BytesIO(b'%PDF-1.4')
+    pdf.name = 'paper.pdf'
+    response = auth_client.post('/admin-api/batch-ingest/', {'file': pdf}, format='multipart')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert list(ingest_dir.iterdir()) == []
+
+
+def test_ingest_batch_command(db, batch_dir):
+    out = io.StringIO()
+    call_command('ingest_batch', batch_dir, '--workers', '1', '--backend', 'pypdfium2', '--json', stdout=out, stderr=io.StringIO())
+
+    result = json.loads(out.getvalue())
+    assert result['files'] == 2
+    assert result['questions_created'] == Question.objects.count() > 0
+    assert [summary['file'] for summary in result['results']] == ['english.pdf', 'papers/english.pdf']
@@ -0,0 +1,251 @@
+import hashlib
+import tracemalloc
+import pytest
+import pypdfium2
+from rest_framework import status
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from admin_api.documents import DocumentConflict, DocumentError, ingest_document
+from admin_api.models import DocumentPage, IngestedDocument, Question
+from admin_api.pdf_extraction import iter_page_fingerprints
+from admin_api.utils import iter_questions
+
+
+QUESTION_TEMPLATE = (
+    "Question {n}\n"
+    "What is {n} + {n}?\n"
+    "Options\n"
+    "A) {a}\n"
+    "B) {b}\n"
+    "C) zero\n"
+    "D) none\n"
+    "The correct answer is A.\n"
+)
+
+
+def make_pages(count, page_size=150):
+    """Page texts of ``count`` questions, cut so that questions run across pages."""
+    text = "Cover page\n" + ''.join(QUESTION_TEMPLATE.format(n=n, a=n + n, b=n * 3) for n in range(1, count + 1))
+    return [text[i:i + page_size] for i in range(0, len(text), page_size)]
+
+
+class FakePDF:
+    """Stands in for a PDF: the source is a list of page texts, each page's fingerprint is its text's hash."""
+
+    def __init__(self, mocker):
+        self.extracted = []
+        mocker.patch('admin_api.documents.iter_page_fingerprints', side_effect=self.fingerprints)
+        mocker.patch('admin_api.documents.extract_pages', side_effect=self.extract_pages)
+
+    def fingerprints(self, pages):
+        return [hashlib.sha256(text.encode()).hexdigest() for text in pages]
+
+    def extract_pages(self, pages, page_numbers, pages_total, on_page=None, backend=None):
+        for page_number in page_numbers:
+            self.extracted.append(page_number)
+            yield page_number, pages[page_number - 1]
+
+
+@pytest.fixture
+def fake_pdf(mocker):
+    return FakePDF(mocker)
+
+
+def ingest(pages, exam_type='waec'):
+    return ingest_document(pages, 'paper.pdf', 'math', exam_type)
+
+
+def bank(exam_type='waec'):
+    """The stored questions of a paper in document order, as parsed."""
+    document = IngestedDocument.objects.get(course_id='math', exam_type=exam_type, file_name='paper.pdf')
+    questions = Question.objects.in_bulk([entry[3] for entry in document.questions])
+    return [
+        {'text': questions[entry[3]].text, 'options': questions[entry[3]].options, 'correct_option': questions[entry[3]].correct_option}
+        for entry in document.questions
+    ]
+
+
+def test_first_ingestion_records_pages_and_questions(db, fake_pdf):
+    pages = make_pages(10)
+    result = ingest(pages)
+
+    assert len(result.created) == Question.objects.count() == 10
+    assert result.pages_total == result.pages_extracted == result.pages_parsed == len(pages)
+    document = result.document
+    assert len(document.pages) == len(pages)
+    assert [entry[3] for entry in document.questions] == list(
+        Question.objects.filter(text__in=result.created).order_by('id').values_list('id', flat=True)
+    )
+    assert DocumentPage.objects.filter(document=document).count() == len(pages)
+    assert bank() == list(iter_questions(pages))
+
+
+def test_identical_upload_changes_nothing(db, fake_pdf):
+    pages = make_pages(10)
+    ingest(pages)
+    fake_pdf.extracted.clear()
+
+    result = ingest(list(pages))
+    assert fake_pdf.extracted == []
+    assert result.pages_parsed == 0
+    assert (result.created, result.updated, result.deleted) == ([], [], [])
+    assert result.unchanged == 10
+
+
+def test_changed_page_is_the_only_one_extracted_and_updates_in_place(db, fake_pdf):
+    pages = make_pages(10)
+    ingest(pages)
+    changed = next(index for index, text in enumerate(pages) if 'A) 10' in text)
+    before = {question.pk: question.updated_at for question in Question.objects.all()}
+    fake_pdf.extracted.clear()
+
+    pages[changed] = pages[changed].replace('A) 10', 'A) ten')
+    result = ingest(pages)
+
+    assert fake_pdf.extracted == [changed + 1]
+    assert result.updated == ['What is 5 + 5?']
+    assert (result.created, result.deleted) == ([], [])
+    assert result.unchanged == 9
+    question = Question.objects.get(text__contains='5 + 5')
+    assert question.pk in before and question.options['A'] == 'ten'
+    untouched = {question.pk: question.updated_at for question in Question.objects.exclude(pk=question.pk)}
+    assert untouched == {pk: updated_at for pk, updated_at in before.items() if pk != question.pk}
+    assert bank() == list(iter_questions(pages))
+
+
+def test_document_deleted_during_reingestion_is_a_conflict(db, fake_pdf, mocker):
+    pages = make_pages(10)
+    ingest(pages)
+    changed = next(index for index, text in enumerate(pages) if 'A) 10' in text)
+    pages[changed] = pages[changed].replace('A) 10', 'A) ten')
+
+    def deleted_meanwhile(*args, **kwargs):
+        IngestedDocument.objects.all().delete()
+        return fake_pdf.extract_pages(*args, **kwargs)
+
+    mocker.patch('admin_api.documents.extract_pages', side_effect=deleted_meanwhile)
+    with pytest.raises(DocumentConflict, match='deleted'):
+        ingest(pages)
+
+    # Uploading it again ingests it from scratch.
+    mocker.patch('admin_api.documents.extract_pages', side_effect=fake_pdf.extract_pages)
+    result = ingest(pages)
+    assert IngestedDocument.objects.get() == result.document
+    assert len(result.created) + len(result.skipped) == 10
+
+
+def test_added_and_removed_questions_leave_other_rows_alone(db, fake_pdf):
+    pages = make_pages(12)
+    ingest(pages)
+    ids = {question.text: question.pk for question in Question.objects.all()}
+    original = pages[3]
+    fake_pdf.extracted.clear()
+
+    pages[3] = original.replace('Question 7', QUESTION_TEMPLATE.format(n=99, a=198, b=297) + 'Question 7')
+    result = ingest(pages)
+    assert fake_pdf.extracted == [4]
+    assert result.created == ['What is 99 + 99?']
+    assert (result.updated, result.deleted) == ([], [])
+    assert bank() == list(iter_questions(pages))
+
+    pages[3] = original
+    result = ingest(pages)
+    assert result.deleted == ['What is 99 + 99?']
+    assert (result.created, result.updated) == ([], [])
+    assert bank() == list(iter_questions(pages))
+    assert {question.text: question.pk for question in Question.objects.all()} == ids
+    # Only the texts of the document's current pages are kept.
+    assert set(DocumentPage.objects.values_list('text', flat=True)) == set(pages)
+
+
+@pytest.mark.parametrize('edit', [
+    lambda pages: pages.__setitem__(0, 'New cover\n'),
+    lambda pages: pages.__delitem__(5),
+    lambda pages: pages.__setitem__(4, pages[4].replace('Question', 'Questions')),
+    lambda pages: pages.__setitem__(7, pages[7] + pages.pop(8)),
+    lambda pages: pages.insert(6, 'A page of notes\n'),
+    lambda pages: pages.reverse(),
+    lambda pages: pages.insert(2, pages.pop(3)),
+])
+def test_incremental_ingestion_matches_a_full_parse(db, fake_pdf, edit):
+    pages = make_pages(15, page_size=110)
+    ingest(pages)
+    edit(pages)
+    result = ingest(pages)
+
+    assert result.pages_extracted < len(pages)
+    assert bank() == list(iter_questions(pages))
+    fresh = ingest(pages, exam_type='neco')
+    assert bank('neco') == bank()
+    assert Question.objects.filter(exam_type='waec').count() == len(fresh.document.questions)
+
+
+def test_first_ingestion_holds_a_bounded_number_of_pages(db, mocker):
+    """Page texts are parsed as they are extracted and let go once stored."""
+    page_size, count = 20000, 800
+
+    def extract_pages(count, page_numbers, pages_total, on_page=None, backend=None):
+        for n in page_numbers:
+            yield n, 'x' * page_size + QUESTION_TEMPLATE.format(n=n, a=n + n, b=n * 3)
+
+    mocker.patch(
+        'admin_api.documents.iter_page_fingerprints',
+        side_effect=lambda count: (hashlib.sha256(str(n).encode()).hexdigest() for n in range(1, count + 1)),
+    )
+    mocker.patch('admin_api.documents.extract_pages', side_effect=extract_pages)
+    tracemalloc.start()
+    try:
+        result = ingest_document(count, 'long.pdf', 'math', 'waec')
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert len(result.created) == DocumentPage.objects.count() == count
+    # All the page texts together take 16 MB.
+    assert peak < page_size * count / 4
+
+
+def test_document_without_questions_is_not_saved(db, fake_pdf):
+    with pytest.raises(DocumentError):
+        ingest(['Cover page\n', 'Nothing else\n'])
+    assert not IngestedDocument.objects.exists()
+
+
+def test_page_fingerprints_follow_page_content(sample_pdf, tmp_path):
+    fingerprints = list(iter_page_fingerprints(sample_pdf))
+    assert len(fingerprints) == len(pypdfium2.PdfDocument(sample_pdf))
+    assert list(iter_page_fingerprints(sample_pdf)) == fingerprints
+
+    pdf = pypdfium2.PdfDocument(sample_pdf)
+    pdf.del_page(1)
+    revised = tmp_path / 'revised.pdf'
+    pdf.save(str(revised))
+    assert list(iter_page_fingerprints(str(revised))) == fingerprints[:1] + fingerprints[2:]
+
+
+def test_reupload_of_revised_pdf_reuses_page_texts(db, sample_pdf, tmp_path):
+    user = CustomUser.objects.create_user(username='admin', email='admin@example.com', password='secret')
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    def upload(path):
+        with open(path, 'rb') as pdf_file:
+            return client.post('/admin-api/upload-pdf/', {
+                'file': pdf_file, 'course_id': 'english', 'exam_type': 'waec', 'backend': 'pypdfium2',
+            }, format='multipart')
+
+    first = upload(sample_pdf)
+    assert first.status_code == status.HTTP_201_CREATED
+    assert first.data['pages_extracted'] == first.data['pages_total']
+
+    pdf = pypdfium2.PdfDocument(sample_pdf)
+    pdf.del_page(len(pdf) - 1)
+    revised = tmp_path / 'sample.pdf'
+    pdf.save(str(revised))
+    second = upload(revised)
+
+    assert second.status_code == status.HTTP_201_CREATED
+    assert second.data['document_id'] == first.data['document_id']
+    assert second.data['pages_extracted'] == 0
+    assert second.data['created_questions'] == []
+    assert second.data['unchanged_count'] + len(second.data['updated_questions']) + len(second.data['deleted_questions']) == len(first.data['created_questions'])
@@ -0,0 +1,90 @@
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+from admin_api.models import ExamScoreStats, OptionPickStats, Question, QuestionStats
+from admin_api.stats import increment_counters, record_results
+
+
+@pytest.fixture
+def paper(db):
+    return [
+        Question.objects.create(
+            text=f'Question {n}?', options={'A': 'yes', 'B': 'no', 'C': 'maybe'}, correct_option='A',
+            course_id='101', exam_type='waec',
+        )
+        for n in range(3)
+    ]
+
+
+def submit(answers):
+    payload = {
+        'course_id': '101',
+        'exam_type': 'waec',
+        'submissions': [{'question_id': question.id, 'chosen_option': option} for question, option in answers],
+    }
+    response = APIClient().post('/user-api/submit/', payload, format='json')
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_counters_follow_submissions(auth_client, paper):
+    first, second, third = paper
+    submit([(first, 'A'), (second, 'B'), (third, 'A')])
+    submit([(first, 'A'), (second, 'A'), (third, 'C')])
+    submit([(first, 'B'), (second, 'A'), (third, 'A')])
+
+    response = auth_client.get('/admin-api/exam-stats/?course_id=101&exam_type=waec')
+    assert response.status_code == status.HTTP_200_OK
+    stats = response.json()
+    assert stats['submissions'] == 3
+    assert stats['mean_score'] == 2
+    assert stats['score_distribution'] == [{'score': 2, 'total': 3, 'submissions': 3}]
+
+    by_question = {question['question_id']: question for question in stats['questions']}
+    assert by_question[first.id]['attempts'] == 3
+    assert by_question[first.id]['correct'] == 2
+    assert by_question[first.id]['option_picks'] == {'A': 2, 'B': 1}
+    assert by_question[third.id]['option_picks'] == {'A': 2, 'C': 1}
+
+
+def test_unanswered_questions_are_listed(auth_client, paper):
+    response = auth_client.get('/admin-api/exam-stats/?course_id=101&exam_type=waec')
+    question = response.json()['questions'][0]
+    assert question['attempts'] == 0
+    assert question['percent_correct'] is None
+    assert question['option_picks'] == {}
+    assert response.json()['mean_score'] is None
+
+
+def test_counters_are_updated_with_one_statement_per_table(paper, django_assert_num_queries):
+    answers = [(question.id, option, option == 'A') for question in paper for option in 'AABC'] * 50
+    scores = [('101', 'waec', 2, 3)] * 50
+    # An INSERT of missing rows and an UPDATE for each of the three tables.
+    with django_assert_num_queries(6):
+        record_results(answers, scores)
+
+    assert QuestionStats.objects.get(question=paper[0]).attempts == 200
+    assert QuestionStats.objects.get(question=paper[0]).correct == 100
+    assert OptionPickStats.objects.get(question=paper[0], option='A').picks == 100
+    assert ExamScoreStats.objects.get(course_id='101', exam_type='waec', score=2, total=3).submissions == 50
+
+
+def test_increment_counters_adds_to_existing_rows(paper):
+    increment_counters(QuestionStats, ('question_id',), {(paper[0].id,): {'attempts': 2, 'correct': 1}})
+    increment_counters(
+        QuestionStats, ('question_id',),
+        {(paper[0].id,): {'attempts': 3, 'correct': 0}, (paper[1].id,): {'attempts': 1, 'correct': 1}},
+    )
+    assert dict(QuestionStats.objects.values_list('question_id', 'attempts')) == {paper[0].id: 5, paper[1].id: 1}
+    assert QuestionStats.objects.get(question=paper[0]).correct == 1
+
+
+def test_stats_read_does_not_depend_on_submissions(auth_client, paper, django_assert_num_queries):
+    for _ in range(5):
+        submit([(question, 'A') for question in paper])
+    with django_assert_num_queries(3):
+        auth_client.get('/admin-api/exam-stats/?course_id=101&exam_type=waec')
+
+
+def test_exam_stats_requires_paper(auth_client):
+    response = auth_client.get('/admin-api/exam-stats/?course_id=101')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
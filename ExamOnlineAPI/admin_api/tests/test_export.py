@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+import pytest
+from django.core.management import call_command
+from rest_framework import status
+from admin_api.models import Question
+
+
+@pytest.fixture
+def question_bank(db):
+    return Question.objects.bulk_create([
+        Question(
+            text=f'Question {n}, "quoted"?',
+            text_hash=f'hash-{n}',
+            options={'A': 'yes', 'B': 'no'},
+            correct_option='A',
+            course_id='101' if n % 2 else '202',
+            exam_type='waec',
+        )
+        for n in range(5)
+    ])
+
+
+def streamed(response):
+    return b''.join(response.streaming_content).decode('utf-8')
+
+
+def test_export_ndjson(auth_client, question_bank):
+    response = auth_client.get('/admin-api/questions/export/')
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'] == 'application/x-ndjson'
+
+    rows = [json.loads(line) for line in streamed(response).splitlines()]
+    assert [row['id'] for row in rows] == [q.id for q in question_bank]
+    assert rows[0]['options'] == {'A': 'yes', 'B': 'no'}
+
+
+def test_export_csv_with_filters(auth_client, question_bank):
+    response = auth_client.get('/admin-api/questions/export/?output=csv&course_id=101')
+    rows = list(csv.DictReader(io.StringIO(streamed(response))))
+
+    assert [row['course_id'] for row in rows] == ['101', '101']
+    assert rows[0]['text'] == 'Question 1, "quoted"?'
+    assert json.loads(rows[0]['options']) == {'A': 'yes', 'B': 'no'}
+
+
+def test_export_json_array(auth_client, question_bank):
+    response = auth_client.get('/admin-api/questions/export/?output=json&exam_type=waec')
+    assert len(json.loads(streamed(response))) == 5
+
+    response = auth_client.get('/admin-api/questions/export/?output=json&exam_type=jamb')
+    assert json.loads(streamed(response)) == []
+
+
+def test_export_rejects_unknown_format(auth_client):
+    response = auth_client.get('/admin-api/questions/export/?output=xml')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_export_command_reports_throughput(question_bank, tmp_path):
+    out, err = io.StringIO(), io.StringIO()
+    call_command('export_questions', '--chunk-size', '2', stdout=out, stderr=err)
+    assert len(out.getvalue().splitlines()) == 5
+    assert 'Exported 5 questions' in err.getvalue()
+    assert 'rows/s' in err.getvalue()
+
+    output = tmp_path / 'questions.csv'
+    call_command('export_questions', '--format', 'csv', '--exam-type', 'waec', '--output', str(output), stderr=err)
+    assert len(output.read_text().splitlines()) == 6
@@ -0,0 +1,108 @@
+import io
+import csv
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from rest_framework import status
+from admin_api.grading import AnswerSheetError, grade_answer_sheet, read_answer_sheet
+from admin_api.models import Question
+
+
+@pytest.fixture
+def paper(db):
+    return [
+        Question.objects.create(
+            text=f'Question {n}?', options={'A': 'yes', 'B': 'no'}, correct_option=correct,
+            course_id='101', exam_type='waec',
+        )
+        for n, correct in enumerate('ABA')
+    ]
+
+
+def sheet_csv(paper, rows):
+    header = 'student_id,' + ','.join(str(question.id) for question in paper)
+    return '\n'.join([header] + rows) + '\n'
+
+
+def test_grade_answer_sheet():
+    sheet = read_answer_sheet(io.StringIO('student_id,1,2,3\ns1,A,B,A\ns2, B ,B\ns3,,,\n'))
+    assert sheet.answers.shape == (3, 3)
+
+    graded = grade_answer_sheet(sheet, {1: 'A', 2: 'B', 3: 'A'})
+    assert graded.scores.tolist() == [3, 1, 0]
+    assert graded.correct_counts.tolist() == [1, 2, 1]
+    assert graded.answered_counts.tolist() == [2, 2, 1]
+
+
+@pytest.mark.parametrize('text', [
+    '',
+    'student_id\ns1\n',
+    'student_id,1,abc\ns1,A,B\n',
+    'student_id,1,1\ns1,A,B\n',
+    'student_id,1\ns1,A,B\n',
+])
+def test_malformed_answer_sheets(text):
+    with pytest.raises(AnswerSheetError):
+        read_answer_sheet(io.StringIO(text))
+
+
+def test_unknown_question_is_rejected():
+    sheet = read_answer_sheet(io.StringIO('student_id,1,9\ns1,A,B\n'))
+    with pytest.raises(AnswerSheetError, match='9'):
+        grade_answer_sheet(sheet, {1: 'A'})
+
+
+def test_grade_sheet_endpoint_streams_reports(auth_client, paper):
+    content = sheet_csv(paper, ['s1,A,B,A', 's2,B,B,B']).encode()
+    response = auth_client.post('/admin-api/grade-sheet/', {
+        'file': SimpleUploadedFile('sheet.csv', content, content_type='text/csv'),
+        'course_id': '101',
+        'exam_type': 'waec',
+    })
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'] == 'text/csv'
+    rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+    assert [(row['student_id'], row['score'], row['total']) for row in rows] == [('s1', '3', '3'), ('s2', '1', '3')]
+
+    response = auth_client.post('/admin-api/grade-sheet/', {
+        'file': SimpleUploadedFile('sheet.csv', content, content_type='text/csv'),
+        'course_id': '101',
+        'exam_type': 'waec',
+        'report': 'questions',
+    })
+    rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+    assert [row['percent_correct'] for row in rows] == ['50.0', '100.0', '50.0']
+
+
+def test_grade_sheet_endpoint_errors(auth_client, paper):
+    content = b'student_id,999999\ns1,A\n'
+    response = auth_client.post('/admin-api/grade-sheet/', {
+        'file': SimpleUploadedFile('sheet.csv', content, content_type='text/csv'),
+        'course_id': '101',
+        'exam_type': 'waec',
+    })
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = auth_client.post('/admin-api/grade-sheet/', {
+        'file': SimpleUploadedFile('sheet.csv', content, content_type='text/csv'),
+        'course_id': '999',
+        'exam_type': 'waec',
+    })
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = auth_client.post('/admin-api/grade-sheet/', {'course_id': '101', 'exam_type': 'waec'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_grade_answer_sheet_command(paper, tmp_path):
+    sheet = tmp_path / 'sheet.csv'
+    sheet.write_text(sheet_csv(paper, ['s1,A,B,A', 's2,B,A,A']))
+    questions = tmp_path / 'questions.csv'
+    out, err = io.StringIO(), io.StringIO()
+    call_command(
+        'grade_answer_sheet', str(sheet), course_id='101', exam_type='waec',
+        questions_output=str(questions), stdout=out, stderr=err,
+    )
+    assert [row['score'] for row in csv.DictReader(io.StringIO(out.getvalue()))] == ['3', '1']
+    assert [row['correct'] for row in csv.DictReader(questions.open())] == ['1', '1', '2']
+    assert 'Graded 2 students x 3 questions' in err.getvalue()
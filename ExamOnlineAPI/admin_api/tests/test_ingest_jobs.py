@@ -0,0 +1,123 @@
+import pytest
+from rest_framework import status
+from admin_api.models import Question, IngestJob
+from admin_api.pdf_extraction import can_start_processes
+
+
+@pytest.mark.django_db
+def test_async_upload_returns_job_and_reports_progress(auth_client, eager_celery, sample_pdf, ingest_dir):
+    with open(sample_pdf, 'rb') as pdf_file:
+        response = auth_client.post('/admin-api/upload-pdf/', {
+            'file': pdf_file,
+            'exam_type': 'waec',
+            'course_id': 'english',
+            'async': 'true',
+        }, format='multipart')
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job_id = response.data['job_id']
+    assert response.data['status_url'] == f'/admin-api/ingest-jobs/{job_id}/'
+
+    response = auth_client.get(f'/admin-api/ingest-jobs/{job_id}/')
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data['status'] == IngestJob.STATUS_SUCCEEDED
+    assert data['pages_total'] == data['pages_parsed'] > 0
+    assert data['questions_created'] == Question.objects.filter(exam_type='waec').count() > 0
+    assert data['duplicates_skipped'] == 0
+    assert data['errors'] == []
+    assert list(ingest_dir.iterdir()) == []
+
+
+@pytest.mark.django_db
+def test_async_upload_counts_duplicates(auth_client, eager_celery, sample_pdf):
+    for _ in range(2):
+        with open(sample_pdf, 'rb') as pdf_file:
+            response = auth_client.post('/admin-api/upload-pdf/', {
+                'file': pdf_file,
+                'exam_type': 'waec',
+                'course_id': 'english',
+                'async': 'true',
+            }, format='multipart')
+
+    job = IngestJob.objects.get(pk=response.data['job_id'])
+    assert job.questions_created == 0
+    assert job.duplicates_skipped == Question.objects.count() > 0
+
+
+@pytest.mark.django_db
+def test_async_upload_records_extraction_failure(auth_client, eager_celery, mocker, sample_pdf):
+    mocker.patch('admin_api.documents.extract_pages', side_effect=ValueError('broken PDF'))
+    with open(sample_pdf, 'rb') as pdf_file:
+        response = auth_client.post('/admin-api/upload-pdf/', {
+            'file': pdf_file,
+            'exam_type': 'waec',
+            'course_id': 'english',
+            'async': 'true',
+        }, format='multipart')
+
+    job = IngestJob.objects.get(pk=response.data['job_id'])
+    assert job.status == IngestJob.STATUS_FAILED
+    assert job.errors == ['Error extracting data from PDF: broken PDF']
+
+
+@pytest.mark.django_db
+def test_ingest_job_not_found(auth_client):
+    response = auth_client.get('/admin-api/ingest-jobs/00000000-0000-0000-0000-000000000000/')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert 'error' in response.json()
+
+
+@pytest.mark.django_db
+def test_async_upload_uses_requested_backend(auth_client, eager_celery, mocker, sample_pdf):
+    extract = mocker.patch('admin_api.documents.extract_pages', return_value=[])
+    with open(sample_pdf, 'rb') as pdf_file:
+        response = auth_client.post('/admin-api/upload-pdf/', {
+            'file': pdf_file,
+            'exam_type': 'waec',
+            'course_id': 'english',
+            'async': 'true',
+            'backend': 'pypdfium2',
+        }, format='multipart')
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert extract.call_args.kwargs['backend'] == 'pypdfium2'
+    assert auth_client.get(response.data['status_url']).json()['backend'] == 'pypdfium2'
+
+
+@pytest.mark.django_db
+def test_upload_rejects_unknown_backend(auth_client, sample_pdf):
+    with open(sample_pdf, 'rb') as pdf_file:
+        response = auth_client.post('/admin-api/upload-pdf/', {
+            'file': pdf_file,
+            'exam_type': 'waec',
+            'backend': 'ghostscript',
+        }, format='multipart')
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'error' in response.json()
+
+
+@pytest.mark.django_db
+def test_ingest_job_in_prefork_worker_extracts_serially(auth_client, eager_celery, settings, mocker, caplog, sample_pdf):
+    settings.PDF_EXTRACT_WORKERS = 2
+    settings.PDF_PARALLEL_MIN_PAGES = 1
+    mocker.patch('admin_api.pdf_extraction._daemonic_logged', False)
+    mocker.patch('admin_api.pdf_extraction.multiprocessing.current_process').return_value.daemon = True
+    pool = mocker.patch('admin_api.pdf_extraction.ProcessPoolExecutor')
+
+    with open(sample_pdf, 'rb') as pdf_file:
+        response = auth_client.post('/admin-api/upload-pdf/', {
+            'file': pdf_file,
+            'exam_type': 'waec',
+            'course_id': 'english',
+            'async': 'true',
+        }, format='multipart')
+
+    job = IngestJob.objects.get(pk=response.data['job_id'])
+    assert job.status == IngestJob.STATUS_SUCCEEDED
+    assert job.questions_created == Question.objects.count() > 0
+    pool.assert_not_called()
+    # The fallback is logged once per process, not once per PDF.
+    assert not can_start_processes()
+    assert sum('daemonic' in record.message for record in caplog.records) == 1
@@ -0,0 +1,101 @@
+import pytest
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from admin_api.models import Question, question_text_hash
+from admin_api.utils import save_questions
+
+
+def test_question_text_hash_normalizes_whitespace():
+    assert question_text_hash('What is\n 2 + 2?\u200b ') == question_text_hash('What is 2 + 2?')
+    assert question_text_hash('What is 2 + 2?') != question_text_hash('What is 2 + 3?')
+
+
+@pytest.mark.django_db
+def test_save_sets_text_hash():
+    question = Question.objects.create(text='What is 2 + 2?', options={}, correct_option='A', exam_type='waec')
+    assert question.text_hash == question_text_hash('What is 2 + 2?')
+
+
+@pytest.mark.django_db
+def test_save_questions_skips_whitespace_variants():
+    Question.objects.create(text='What is 2 + 2?', options={}, correct_option='A', exam_type='waec')
+    questions = [{'text': 'What is\n2 + 2?', 'options': {'A': '4'}, 'correct_option': 'A'}]
+
+    result = save_questions(questions, '101', 'waec')
+
+    assert result['created'] == []
+    assert result['skipped'] == ['What is\n2 + 2?']
+    assert save_questions(questions, '101', 'jamb')['created'] == ['What is\n2 + 2?']
+
+
+@pytest.mark.django_db
+def test_database_constraint_skips_concurrent_duplicate(mocker):
+    """A row another upload inserts just before the batch is reported as skipped, not created."""
+    questions = [
+        {'text': 'What is 2 + 2?', 'options': {'A': '4'}, 'correct_option': 'A'},
+        {'text': 'What is 3 + 3?', 'options': {'A': '6'}, 'correct_option': 'A'},
+    ]
+    real_bulk_create = Question.objects.bulk_create
+
+    def racing_bulk_create(*args, **kwargs):
+        Question.objects.create(text='What is 2 + 2?', options={}, correct_option='A', exam_type='waec')
+        return real_bulk_create(*args, **kwargs)
+
+    mocker.patch.object(Question.objects, 'bulk_create', side_effect=racing_bulk_create)
+    result = save_questions(questions, '101', 'waec')
+
+    assert result['errors'] == []
+    assert result['created'] == ['What is 3 + 3?']
+    assert result['skipped'] == ['What is 2 + 2?']
+    assert Question.objects.filter(exam_type='waec').count() == 2
+
+
+@pytest.mark.django_db
+def test_save_questions_reads_once_per_batch():
+    Question.objects.create(text='Question 0?', options={}, correct_option='A', exam_type='waec')
+    questions = [{'text': f'Question {n}?', 'options': {'A': '4'}, 'correct_option': 'A'} for n in range(3)]
+
+    with CaptureQueriesContext(connection) as queries:
+        result = save_questions(questions, '101', 'waec')
+
+    assert result['skipped'] == ['Question 0?']
+    assert [query['sql'].split()[0] for query in queries].count('SELECT') == 1
+
+
+@pytest.mark.django_db
+def test_create_duplicate_question_conflicts(auth_client):
+    payload = {
+        "text": "New question?",
+        "options": {"A": "yes", "B": "no"},
+        "correct_option": "A",
+        "course_id": 202,
+        "exam_type": "final"
+    }
+    assert auth_client.post('/admin-api/questions/', payload, format='json').status_code == status.HTTP_201_CREATED
+
+    response = auth_client.post('/admin-api/questions/', payload, format='json')
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert 'error' in response.json()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_text_hash_migration_lists_duplicates_instead_of_deleting_them():
+    before, after = [('admin_api', '0003_ingestjob_backend')], [('admin_api', '0004_question_text_hash')]
+    executor = MigrationExecutor(connection)
+    executor.migrate(before)
+    OldQuestion = executor.loader.project_state(before).apps.get_model('admin_api', 'Question')
+    try:
+        first = OldQuestion.objects.create(text='What is 2 + 2?', options={}, correct_option='A', course_id='101', exam_type='waec')
+        second = OldQuestion.objects.create(text='What is\n2 + 2?', options={}, correct_option='B', course_id='101', exam_type='waec')
+        OldQuestion.objects.create(text='What is 2 + 2?', options={}, correct_option='A', course_id='101', exam_type='jamb')
+
+        executor.loader.build_graph()
+        with pytest.raises(IntegrityError, match=rf'{second.id} \(same as {first.id}\)'):
+            executor.migrate(after)
+        assert OldQuestion.objects.count() == 3
+    finally:
+        OldQuestion.objects.all().delete()
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
@@ -0,0 +1,82 @@
+import pytest
+from rest_framework import status
+from admin_api.models import Question
+from admin_api.cache import exam_paper_cache
+
+
+@pytest.fixture
+def question_bank(db):
+    return Question.objects.bulk_create([
+        Question(
+            text=f'Question {n}?',
+            text_hash=f'hash-{n}',
+            options={'A': 'yes', 'B': 'no'},
+            correct_option='A',
+            course_id='101' if n % 2 else '202',
+            exam_type='waec',
+        )
+        for n in range(25)
+    ])
+
+
+def test_question_list_walks_pages_forward_and_back(auth_client, question_bank):
+    response = auth_client.get('/admin-api/questions/?page_size=10')
+    assert response.status_code == status.HTTP_200_OK
+    first_page = response.json()
+    assert len(first_page['questions']) == 10
+    assert first_page['previous'] is None
+
+    seen = [q['id'] for q in first_page['questions']]
+    page = first_page
+    while page['next']:
+        page = auth_client.get(page['next']).json()
+        seen += [q['id'] for q in page['questions']]
+    assert seen == sorted(q.id for q in question_bank)
+    assert len(page['questions']) == 5
+
+    previous = auth_client.get(page['previous']).json()
+    assert [q['id'] for q in previous['questions']] == seen[10:20]
+
+
+def test_question_list_page_query_count_is_constant(auth_client, question_bank, django_assert_num_queries):
+    page = auth_client.get('/admin-api/questions/?page_size=5').json()
+    while page['next']:
+        # The bank's version token and the page.
+        with django_assert_num_queries(2):
+            page = auth_client.get(page['next']).json()
+
+
+def test_question_list_filters(auth_client, question_bank):
+    response = auth_client.get('/admin-api/questions/?course_id=101&exam_type=waec&page_size=100')
+    questions = response.json()['questions']
+    assert len(questions) == 12
+    assert {q['course_id'] for q in questions} == {'101'}
+
+    response = auth_client.get('/admin-api/questions/?exam_type=jamb')
+    assert response.json() == {'questions': [], 'next': None, 'previous': None}
+
+
+def test_question_list_rejects_bad_cursor(auth_client, question_bank):
+    response = auth_client.get('/admin-api/questions/?cursor=not-a-cursor')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'error' in response.json()
+
+
+def test_question_list_conditional_get(auth_client, question_bank, django_assert_num_queries):
+    exam_paper_cache().clear()
+    url = '/admin-api/questions/?page_size=10'
+    response = auth_client.get(url)
+    etag = response['ETag']
+    assert response.has_header('Last-Modified')
+
+    # Only the bank's version token is read.
+    with django_assert_num_queries(1):
+        response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    question = question_bank[0]
+    question.text = 'Changed question?'
+    question.save()
+    response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag'] != etag
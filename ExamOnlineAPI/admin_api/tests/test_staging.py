@@ -0,0 +1,189 @@
+from datetime import timedelta
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from admin_api.cache import get_answer_key
+from admin_api.models import Question, StagedQuestion, StagingBatch, question_text_hash
+from admin_api.staging import StagingError, promote_batch, purge_expired_batches, stage_questions
+from admin_api.tasks import purge_staging_batches
+
+
+PARSED = [
+    {'text': 'What is 2 + 2?', 'options': {'A': '3', 'B': '4'}, 'correct_option': 'B'},
+    {'text': 'What is 3 + 3?', 'options': {'A': '6', 'B': '7'}, 'correct_option': 'A'},
+    {'text': 'What is 4 + 4?', 'options': {'A': '8', 'B': '9'}, 'correct_option': 'A'},
+]
+
+
+@pytest.fixture
+def batch(db):
+    batch, staged, errors = stage_questions(PARSED, 'math', 'waec', file_name='paper.pdf')
+    assert errors == []
+    return batch
+
+
+def confirm(client, payload):
+    return client.post('/admin-api/confirm-questions/', payload, format='json')
+
+
+def test_review_upload_stages_questions(auth_client, sample_pdf):
+    with open(sample_pdf, 'rb') as pdf_file:
+        response = auth_client.post('/admin-api/upload-pdf/', {
+            'file': pdf_file,
+            'exam_type': 'waec',
+            'course_id': 'english',
+            'review': 'true',
+        }, format='multipart')
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert not Question.objects.exists()
+    batch = StagingBatch.objects.get(pk=response.data['batch_id'])
+    assert batch.file_name == 'sample.pdf'
+    assert [question['id'] for question in response.data['questions']] == list(
+        batch.questions.values_list('id', flat=True)
+    )
+    assert len(response.data['questions']) > 0
+
+
+def test_stage_reports_invalid_questions(db):
+    batch, staged, errors = stage_questions(PARSED + [{'text': 'No options'}], 'math', 'waec')
+    assert len(staged) == batch.questions.count() == 3
+    assert [question.position for question in staged] == [0, 1, 2]
+    assert errors[0]['text'] == 'No options'
+
+
+def test_confirm_promotes_batch_with_one_insert(auth_client, batch):
+    get_answer_key('math', 'waec')
+    with CaptureQueriesContext(connection) as context:
+        response = confirm(auth_client, {'batch_id': str(batch.id)})
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data['created_count'] == 3
+    assert response.data['skipped_count'] == 0
+    question_inserts = [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('INSERT') and 'admin_api_question"' in query['sql'].split('SELECT')[0]
+    ]
+    assert len(question_inserts) == 1
+    assert 'SELECT' in question_inserts[0]
+
+    questions = Question.objects.order_by('id')
+    assert [question.text for question in questions] == [question['text'] for question in PARSED]
+    assert {(question.course_id, question.exam_type) for question in questions} == {('math', 'waec')}
+    assert questions[0].options == PARSED[0]['options']
+    assert not StagingBatch.objects.exists()
+    assert not StagedQuestion.objects.exists()
+    assert len(get_answer_key('math', 'waec')) == 3
+
+
+def test_confirm_applies_edits_and_exclusions(auth_client, batch):
+    first, second, third = batch.questions.all()
+    response = confirm(auth_client, {
+        'batch_id': str(batch.id),
+        'edits': [{'id': first.id, 'text': 'What is 2 + 3?', 'options': {'A': '5', 'B': '4'}, 'correct_option': 'A'}],
+        'exclude': [third.id],
+    })
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data['created_count'] == 2
+    assert response.data['excluded_count'] == 1
+    edited = Question.objects.get(text='What is 2 + 3?')
+    assert edited.options == {'A': '5', 'B': '4'}
+    assert edited.correct_option == 'A'
+    assert edited.text_hash == question_text_hash('What is 2 + 3?')
+    assert not Question.objects.filter(text=third.text).exists()
+
+
+def test_confirm_skips_existing_questions(auth_client, batch):
+    Question.objects.create(text='What  is 2 + 2?', options={'A': '4'}, correct_option='A', exam_type='waec')
+    response = confirm(auth_client, {'batch_id': str(batch.id)})
+
+    assert response.data['created_count'] == 2
+    assert response.data['skipped_count'] == 1
+    assert Question.objects.filter(exam_type='waec').count() == 3
+
+
+def test_confirm_can_override_paper(auth_client, batch):
+    response = confirm(auth_client, {'batch_id': str(batch.id), 'course_id': 'physics', 'exam_type': 'neco'})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Question.objects.filter(course_id='physics', exam_type='neco').count() == 3
+
+
+def test_confirm_rejects_unknown_ids_and_keeps_batch(auth_client, batch):
+    other, _, _ = stage_questions(PARSED, 'math', 'neco')
+    foreign_id = other.questions.first().id
+    response = confirm(auth_client, {'batch_id': str(batch.id), 'exclude': [foreign_id]})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not Question.objects.exists()
+    assert StagingBatch.objects.filter(pk=batch.pk).exists()
+
+
+def test_confirm_rejects_invalid_edit(auth_client, batch):
+    question = batch.questions.first()
+    response = confirm(auth_client, {'batch_id': str(batch.id), 'edits': [{'id': question.id, 'correct_option': ''}]})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert batch.questions.get(pk=question.pk).correct_option == 'B'
+
+
+def test_confirmed_batch_cannot_be_confirmed_again(auth_client, batch):
+    assert confirm(auth_client, {'batch_id': str(batch.id)}).status_code == status.HTTP_201_CREATED
+    assert confirm(auth_client, {'batch_id': str(batch.id)}).status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_expired_batches_are_not_confirmed_and_are_purged(auth_client, batch):
+    StagingBatch.objects.filter(pk=batch.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+    assert confirm(auth_client, {'batch_id': str(batch.id)}).status_code == status.HTTP_404_NOT_FOUND
+
+    stage_questions(PARSED, 'math', 'waec')
+    assert not StagingBatch.objects.filter(pk=batch.pk).exists()
+    assert StagedQuestion.objects.count() == 3
+
+
+def test_purge_task_deletes_only_expired_batches(batch):
+    expired, _, _ = stage_questions(PARSED, 'math', 'neco')
+    StagingBatch.objects.filter(pk=expired.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    assert purge_staging_batches() == 1
+    assert list(StagingBatch.objects.values_list('pk', flat=True)) == [batch.pk]
+    assert purge_expired_batches() == 0
+
+
+def test_confirm_still_accepts_question_list(auth_client):
+    response = confirm(auth_client, {'questions': PARSED, 'course_id': 'math', 'exam_type': 'waec'})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert len(response.data['created_questions']) == 3
+
+
+def test_promote_counts_duplicates_within_batch(db):
+    batch, _, _ = stage_questions(PARSED + [PARSED[0]], 'math', 'waec')
+    assert promote_batch(batch) == {'created': 3, 'skipped': 1, 'excluded': 0}
+
+
+@pytest.mark.parametrize('course_id', [None, '', 'x' * 51])
+def test_promote_rejects_invalid_course_id_and_keeps_batch(db, course_id):
+    batch, _, _ = stage_questions(PARSED, course_id, 'waec')
+    with pytest.raises(StagingError, match='course_id'):
+        promote_batch(batch, course_id=course_id)
+
+    assert not Question.objects.exists()
+    assert StagingBatch.objects.filter(pk=batch.pk).exists()
+
+
+def test_promote_fails_when_rows_are_dropped_for_other_reasons(db, batch, mocker):
+    # As if the database had ignored rows breaking another constraint.
+    mocker.patch('admin_api.staging._insert_from_staging', return_value=0)
+    with pytest.raises(StagingError, match='3 questions could not be saved'):
+        promote_batch(batch)
+    assert StagingBatch.objects.filter(pk=batch.pk).exists()
+
+
+def test_confirm_without_course_id_is_an_error(auth_client):
+    batch, _, _ = stage_questions(PARSED, None, 'waec')
+    response = confirm(auth_client, {'batch_id': str(batch.id)})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'course_id' in response.data['error']
+    assert not Question.objects.exists()
@@ -0,0 +1,141 @@
+import os
+import hashlib
+from datetime import timedelta
+import pytest
+from django.utils import timezone
+from rest_framework import status
+from admin_api.models import IngestJob, Question, UploadSession
+from admin_api.tasks import purge_upload_sessions
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+@pytest.fixture
+def pdf_data(sample_pdf):
+    with open(sample_pdf, 'rb') as f:
+        return f.read()
+
+
+def open_session(client, size=None, **data):
+    payload = {'file_name': 'compilation.pdf', 'course_id': 'english', 'exam_type': 'waec', **data}
+    if size is not None:
+        payload['size'] = size
+    return client.post('/admin-api/uploads/', payload, format='json')
+
+
+def put_chunk(client, upload_id, offset, data, checksum=True):
+    headers = {'HTTP_X_CHUNK_SHA256': hashlib.sha256(data).hexdigest()} if checksum is True else {}
+    if isinstance(checksum, str):
+        headers = {'HTTP_X_CHUNK_SHA256': checksum}
+    return client.put(
+        f'/admin-api/uploads/{upload_id}/?offset={offset}', data, content_type='application/octet-stream', **headers,
+    )
+
+
+def test_chunked_upload_is_ingested(auth_client, eager_celery, pdf_data, ingest_dir):
+    response = open_session(auth_client, size=len(pdf_data))
+    assert response.status_code == status.HTTP_201_CREATED
+    upload_id = response.data['upload_id']
+
+    for offset in range(0, len(pdf_data), CHUNK_SIZE):
+        response = put_chunk(auth_client, upload_id, offset, pdf_data[offset:offset + CHUNK_SIZE])
+        assert response.status_code == status.HTTP_200_OK
+    assert response.data['received'] == len(pdf_data)
+
+    response = auth_client.post(
+        f'/admin-api/uploads/{upload_id}/complete/', {'sha256': hashlib.sha256(pdf_data).hexdigest()}, format='json',
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = IngestJob.objects.get(pk=response.data['job_id'])
+    assert job.status == IngestJob.STATUS_SUCCEEDED
+    assert job.questions_created == Question.objects.filter(exam_type='waec').count() > 0
+    assert job.content_hash == hashlib.sha256(pdf_data).hexdigest()
+    assert list(ingest_dir.iterdir()) == []
+    assert auth_client.get(f'/admin-api/uploads/{upload_id}/').data['status'] == UploadSession.STATUS_COMPLETED
+
+
+def test_resume_after_interruption(auth_client, eager_celery, pdf_data):
+    upload_id = open_session(auth_client).data['upload_id']
+    assert put_chunk(auth_client, upload_id, 0, pdf_data[:CHUNK_SIZE]).status_code == status.HTTP_200_OK
+
+    # A chunk at the wrong offset tells the client where to carry on.
+    response = put_chunk(auth_client, upload_id, 2 * CHUNK_SIZE, pdf_data[2 * CHUNK_SIZE:3 * CHUNK_SIZE])
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.data['received'] == CHUNK_SIZE
+
+    # Retrying a chunk that was stored is harmless.
+    assert put_chunk(auth_client, upload_id, 0, pdf_data[:CHUNK_SIZE]).status_code == status.HTTP_200_OK
+
+    received = auth_client.get(f'/admin-api/uploads/{upload_id}/').data['received']
+    assert put_chunk(auth_client, upload_id, received, pdf_data[received:]).status_code == status.HTTP_200_OK
+
+    session = UploadSession.objects.get(pk=upload_id)
+    with open(session.file_path, 'rb') as f:
+        assert f.read() == pdf_data
+    assert [chunk[:2] for chunk in session.chunks] == [[0, CHUNK_SIZE], [CHUNK_SIZE, len(pdf_data) - CHUNK_SIZE]]
+
+
+def test_corrupted_chunk_is_refused(auth_client, eager_celery, pdf_data):
+    upload_id = open_session(auth_client).data['upload_id']
+    response = put_chunk(auth_client, upload_id, 0, pdf_data[:CHUNK_SIZE], checksum=hashlib.sha256(b'other').hexdigest())
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    session = UploadSession.objects.get(pk=upload_id)
+    assert session.received == 0
+    assert os.path.getsize(session.file_path) == 0
+
+
+def test_chunk_limits(auth_client, eager_celery, settings, pdf_data):
+    settings.UPLOAD_CHUNK_MAX_SIZE = CHUNK_SIZE
+    upload_id = open_session(auth_client, size=CHUNK_SIZE + 10).data['upload_id']
+
+    assert put_chunk(auth_client, upload_id, 0, pdf_data[:CHUNK_SIZE + 1]).status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert put_chunk(auth_client, upload_id, 0, pdf_data[:CHUNK_SIZE]).status_code == status.HTTP_200_OK
+    # Past the declared size.
+    response = put_chunk(auth_client, upload_id, CHUNK_SIZE, pdf_data[CHUNK_SIZE:CHUNK_SIZE + 11])
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+    settings.UPLOAD_SESSION_MAX_SIZE = CHUNK_SIZE
+    assert open_session(auth_client, size=CHUNK_SIZE + 1).status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+def test_incomplete_or_invalid_upload_is_not_completed(auth_client, eager_celery, pdf_data):
+    upload_id = open_session(auth_client, size=len(pdf_data)).data['upload_id']
+    put_chunk(auth_client, upload_id, 0, pdf_data[:CHUNK_SIZE])
+    response = auth_client.post(f'/admin-api/uploads/{upload_id}/complete/', {}, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data['received'] == CHUNK_SIZE
+
+    upload_id = open_session(auth_client).data['upload_id']
+    put_chunk(auth_client, upload_id, 0, b'not a pdf')
+    response = auth_client.post(f'/admin-api/uploads/{upload_id}/complete/', {}, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not IngestJob.objects.exists()
+
+
+def test_abort_removes_file(auth_client, eager_celery, ingest_dir):
+    upload_id = open_session(auth_client).data['upload_id']
+    put_chunk(auth_client, upload_id, 0, b'%PDF-1.4')
+
+    assert auth_client.delete(f'/admin-api/uploads/{upload_id}/').status_code == status.HTTP_204_NO_CONTENT
+    assert list(ingest_dir.iterdir()) == []
+    assert put_chunk(auth_client, upload_id, 8, b'more').status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_abandoned_sessions_are_purged(auth_client, eager_celery, ingest_dir):
+    abandoned = open_session(auth_client).data['upload_id']
+    active = open_session(auth_client).data['upload_id']
+    UploadSession.objects.filter(pk=abandoned).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    assert put_chunk(auth_client, abandoned, 0, b'%PDF-1.4').status_code == status.HTTP_404_NOT_FOUND
+    assert purge_upload_sessions() == 1
+    assert list(UploadSession.objects.values_list('pk', flat=True)) == [UploadSession.objects.get(pk=active).pk]
+    assert [path.name for path in ingest_dir.iterdir()] == [f'upload-{UploadSession.objects.get(pk=active).pk.hex}.part']
+
+
+def test_open_session_validates_input(auth_client, eager_celery):
+    assert auth_client.post('/admin-api/uploads/', {}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+    assert open_session(auth_client, file_name='notes.txt').status_code == status.HTTP_400_BAD_REQUEST
+    assert open_session(auth_client, backend='ghostscript').status_code == status.HTTP_400_BAD_REQUEST
+    assert open_session(auth_client, size='lots').status_code == status.HTTP_400_BAD_REQUEST
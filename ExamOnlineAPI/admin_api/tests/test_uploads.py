@@ -0,0 +1,114 @@
+import os
+import hashlib
+import tempfile
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from rest_framework import status
+from admin_api import documents
+from admin_api.models import IngestJob, Question
+from admin_api.uploads import (
+    cache_parsed_upload, get_parsed_upload, parsed_upload_cache, parsed_upload_cache_key, store_upload, upload_source,
+)
+
+
+def upload(client, sample_pdf, **data):
+    with open(sample_pdf, 'rb') as pdf_file:
+        return client.post('/admin-api/upload-pdf/', {'file': pdf_file, 'course_id': 'english', **data}, format='multipart')
+
+
+def test_store_upload_hashes_to_unique_files(tmp_path):
+    first_path, first_hash = store_upload(SimpleUploadedFile('paper.pdf', b'%PDF-1 same'), directory=tmp_path)
+    second_path, second_hash = store_upload(SimpleUploadedFile('paper.pdf', b'%PDF-1 same'), directory=tmp_path)
+
+    assert first_path != second_path
+    assert first_hash == second_hash == hashlib.sha256(b'%PDF-1 same').hexdigest()
+    with open(first_path, 'rb') as f:
+        assert f.read() == b'%PDF-1 same'
+
+
+def test_store_upload_moves_spooled_file(tmp_path):
+    upload = TemporaryUploadedFile('paper.pdf', 'application/pdf', 0, None)
+    upload.write(b'%PDF-1 large')
+    upload.seek(0)
+    spooled = upload.temporary_file_path()
+
+    file_path, content_hash = store_upload(upload, directory=tmp_path)
+    upload.close()
+
+    assert not os.path.exists(spooled)
+    assert os.path.dirname(file_path) == str(tmp_path)
+    with open(file_path, 'rb') as f:
+        assert f.read() == b'%PDF-1 large'
+    assert content_hash == hashlib.sha256(b'%PDF-1 large').hexdigest()
+
+
+def test_upload_source_reads_uploads_in_place():
+    in_memory = SimpleUploadedFile('paper.pdf', b'%PDF-1')
+    assert upload_source(in_memory) is in_memory.file
+
+    spooled = TemporaryUploadedFile('paper.pdf', 'application/pdf', 0, None)
+    try:
+        assert upload_source(spooled) == spooled.temporary_file_path()
+    finally:
+        spooled.close()
+
+
+def test_cache_is_keyed_by_parser_version(mocker):
+    cache_parsed_upload('abc', [{'text': 'Q'}], pages=2)
+    assert get_parsed_upload('abc').questions == [{'text': 'Q'}]
+
+    mocker.patch('admin_api.uploads.PARSER_VERSION', 'next')
+    assert get_parsed_upload('abc') is None
+
+
+def test_empty_results_are_not_cached():
+    cache_parsed_upload('abc', [])
+    assert get_parsed_upload('abc') is None
+    assert parsed_upload_cache().get(parsed_upload_cache_key('abc')) is None
+
+
+@pytest.mark.django_db
+def test_repeat_upload_skips_extraction(auth_client, mocker, sample_pdf):
+    extract = mocker.spy(documents, 'extract_pages')
+
+    response = upload(auth_client, sample_pdf, exam_type='waec')
+    assert response.status_code == status.HTTP_201_CREATED
+    created = response.data['created_questions']
+    assert created
+
+    response = upload(auth_client, sample_pdf, exam_type='neco')
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data['created_questions'] == created
+    assert extract.call_count == 1
+    assert Question.objects.filter(exam_type='neco').count() == len(created)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('max_memory_size', [10 * 1024 * 1024, 0])
+def test_sync_upload_is_not_copied(auth_client, settings, mocker, sample_pdf, max_memory_size):
+    settings.FILE_UPLOAD_MAX_MEMORY_SIZE = max_memory_size
+    mkstemp = mocker.spy(tempfile, 'mkstemp')
+    extract = mocker.spy(documents, 'extract_pages')
+
+    assert upload(auth_client, sample_pdf, exam_type='waec').status_code == status.HTTP_201_CREATED
+
+    source = extract.call_args.args[0]
+    if max_memory_size:
+        assert not isinstance(source, str)
+    else:
+        assert os.path.basename(source).endswith('.upload.pdf')
+    assert mkstemp.call_count == 0
+
+
+@pytest.mark.django_db
+def test_async_repeat_upload_reuses_parse(auth_client, eager_celery, mocker, sample_pdf):
+    extract = mocker.spy(documents, 'extract_pages')
+
+    first = IngestJob.objects.get(pk=upload(auth_client, sample_pdf, exam_type='waec', **{'async': 'true'}).data['job_id'])
+    second = IngestJob.objects.get(pk=upload(auth_client, sample_pdf, exam_type='neco', **{'async': 'true'}).data['job_id'])
+
+    assert extract.call_count == 1
+    assert first.content_hash == second.content_hash
+    assert second.status == IngestJob.STATUS_SUCCEEDED
+    assert second.questions_created == first.questions_created > 0
+    assert second.pages_total == second.pages_parsed == first.pages_total
@@ -0,0 +1,225 @@
+import io
+import mmap
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from admin_api.models import Question
+from admin_api.pdf_extraction import BACKENDS, get_backend, iter_pdf_pages, open_pdf
+from admin_api.utils import extract_data_from_pdf, iter_questions, parse_text_to_questions, save_questions
+
+
+QUESTION_TEMPLATE = (
+    "Question {n}\n"
+    "What is {n} + {n}?\n"
+    "Options\n"
+    "A) {a}\n"
+    "B) {b}\n"
+    "C) zero\n"
+    "D) none\n"
+    "The correct answer is A."
+)
+
+
+def make_document(count):
+    return ''.join(QUESTION_TEMPLATE.format(n=n, a=n + n, b=n * 3) for n in range(1, count + 1))
+
+
+@pytest.mark.parametrize('page_size', [1, 7, 50, 131, 10000])
+def test_iter_questions_matches_whole_document_parse(page_size):
+    """Questions split across page boundaries come out the same as from the joined text."""
+    text = "Cover page\n" + make_document(20)
+    pages = [text[i:i + page_size] for i in range(0, len(text), page_size)]
+
+    assert list(iter_questions(pages)) == parse_text_to_questions(text)
+    assert len(parse_text_to_questions(text)) == 20
+
+
+def test_iter_questions_yields_before_last_page_is_read():
+    pages_read = []
+
+    def pages():
+        for n in range(1, 6):
+            pages_read.append(n)
+            yield make_document(1).replace('Question 1', f'Question {n}')
+
+    first = next(iter_questions(pages()))
+    assert first['correct_option'] == 'A'
+    assert pages_read == [1]
+
+
+def test_iter_questions_accepts_lines():
+    text = make_document(30)
+    assert list(iter_questions(text.splitlines(keepends=True))) == parse_text_to_questions(text)
+
+
+def test_option_text_keeps_capital_letters():
+    text = QUESTION_TEMPLATE.format(n=1, a='Abuja and Dakar', b='Cairo')
+    options = parse_text_to_questions(text)[0]['options']
+    assert options == {'A': 'Abuja and Dakar', 'B': 'Cairo', 'C': 'zero', 'D': 'none'}
+
+
+def test_any_option_labels():
+    text = (
+        "Question 1\nPick one.\nOptions\na) first\nb) second\nc) third\nd) fourth\ne) fifth\n"
+        "The correct answer is e.\n"
+        "Question 2\nPick a number.\nOptions\n1) one\n2) two\n10) ten\nThe correct answer is 10."
+    )
+    first, second = parse_text_to_questions(text)
+    assert first['options'] == {'a': 'first', 'b': 'second', 'c': 'third', 'd': 'fourth', 'e': 'fifth'}
+    assert first['correct_option'] == 'e'
+    assert second['options'] == {'1': 'one', '2': 'two', '10': 'ten'}
+
+
+def test_markers_run_together():
+    text = (
+        "Cover pageQuestion 1\nWhat is it?\nOptions\nA) isn't itB) can't he\nC) does he\n"
+        "D) multi\nline optionThe correct answer is B.Question 2\nNext?\nOptions\nA) yes\nB) no\n"
+        "The correct answer is A."
+    )
+    first, second = parse_text_to_questions(text)
+    assert first == {
+        'text': 'What is it?',
+        'options': {'A': "isn't it", 'B': "can't he", 'C': 'does he', 'D': 'multi\nline option'},
+        'correct_option': 'B',
+    }
+    assert second['text'] == 'Next?'
+
+
+def test_question_without_answer_is_dropped():
+    unanswered = QUESTION_TEMPLATE.format(n=1, a=2, b=3).replace('The correct answer is A.', '')
+    questions = parse_text_to_questions(unanswered * 500 + make_document(1))
+    assert questions == parse_text_to_questions(make_document(1))
+
+
+def test_extract_data_from_pdf_reports_each_page(sample_pdf):
+    progress = []
+    questions = extract_data_from_pdf(sample_pdf, on_page=lambda parsed, total: progress.append((parsed, total)))
+
+    assert questions
+    assert progress == [(n, len(progress)) for n in range(1, len(progress) + 1)]
+    assert all(set(q) == {'text', 'options', 'correct_option'} for q in questions)
+
+
+def test_parallel_extraction_matches_serial(settings, sample_pdf):
+    serial = extract_data_from_pdf(sample_pdf)
+
+    settings.PDF_EXTRACT_WORKERS = 2
+    settings.PDF_PARALLEL_MIN_PAGES = 1
+    progress = []
+    parallel = extract_data_from_pdf(sample_pdf, on_page=lambda parsed, total: progress.append(parsed))
+
+    assert parallel == serial
+    assert progress == list(range(1, len(progress) + 1))
+
+
+def test_small_files_use_serial_extraction(settings, mocker, sample_pdf):
+    settings.PDF_EXTRACT_WORKERS = 4
+    settings.PDF_PARALLEL_MIN_PAGES = 1000
+    pool = mocker.patch('admin_api.pdf_extraction.ProcessPoolExecutor')
+
+    assert extract_data_from_pdf(sample_pdf)
+    pool.assert_not_called()
+
+
+def test_parallel_extraction_falls_back_when_pool_unavailable(settings, mocker, sample_pdf):
+    serial = extract_data_from_pdf(sample_pdf)
+
+    settings.PDF_EXTRACT_WORKERS = 2
+    settings.PDF_PARALLEL_MIN_PAGES = 1
+    mocker.patch('admin_api.pdf_extraction.ProcessPoolExecutor', side_effect=OSError('no processes'))
+
+    assert extract_data_from_pdf(sample_pdf) == serial
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_backends_parse_sample_pdf_identically(backend, sample_pdf):
+    """Each backend must yield the same questions so deployments can switch safely."""
+    reference = parse_text_to_questions(''.join(iter_pdf_pages(sample_pdf, backend='pdfplumber')))
+    text = ''.join(iter_pdf_pages(sample_pdf, backend=backend))
+
+    assert reference
+    assert parse_text_to_questions(text) == reference
+    assert extract_data_from_pdf(sample_pdf, backend=backend) == reference
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_backends_read_file_objects(backend, settings, sample_pdf):
+    settings.PDF_EXTRACT_WORKERS = 2
+    settings.PDF_PARALLEL_MIN_PAGES = 1
+    with open(sample_pdf, 'rb') as f:
+        stream = io.BytesIO(f.read())
+
+    assert extract_data_from_pdf(stream, backend=backend) == extract_data_from_pdf(sample_pdf, backend=backend)
+    assert not stream.closed
+
+
+def test_open_pdf_maps_paths(sample_pdf, tmp_path):
+    with open_pdf(sample_pdf) as stream:
+        assert isinstance(stream, mmap.mmap)
+        assert stream.read(5) == b'%PDF-'
+
+    empty = tmp_path / 'empty.pdf'
+    empty.write_bytes(b'')
+    with open_pdf(str(empty)) as stream:
+        assert stream.read() == b''
+
+
+def test_parallel_extraction_with_pypdfium2(settings, sample_pdf):
+    settings.PDF_EXTRACT_WORKERS = 2
+    settings.PDF_PARALLEL_MIN_PAGES = 1
+
+    assert extract_data_from_pdf(sample_pdf, backend='pypdfium2') == extract_data_from_pdf(sample_pdf, backend='pdfplumber')
+
+
+def test_settings_select_default_backend(settings, mocker, sample_pdf):
+    settings.PDF_EXTRACT_BACKEND = 'pypdfium2'
+    iter_pages = mocker.spy(BACKENDS['pypdfium2'], 'iter_pages')
+
+    assert extract_data_from_pdf(sample_pdf)
+    iter_pages.assert_called_once()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_backend('ghostscript')
+
+
+def make_questions(count, prefix='Question'):
+    return [
+        {'text': f'{prefix} {n}?', 'options': {'A': 'yes', 'B': 'no'}, 'correct_option': 'A'}
+        for n in range(count)
+    ]
+
+
+@pytest.mark.django_db
+def test_save_questions_skips_existing_and_repeated_texts():
+    Question.objects.create(text='Question 1?', options={}, correct_option='A', course_id='101', exam_type='waec')
+    questions = make_questions(3) + make_questions(1, prefix='Question')
+
+    result = save_questions(questions, '101', 'waec')
+
+    assert result['created'] == ['Question 0?', 'Question 2?']
+    assert result['skipped'] == ['Question 1?', 'Question 0?']
+    assert result['errors'] == []
+    assert Question.objects.filter(exam_type='waec').count() == 3
+
+
+@pytest.mark.django_db
+def test_save_questions_reports_invalid_items():
+    questions = make_questions(2) + [{'text': 'No options?'}, {'text': 'Bad answer?', 'options': {}, 'correct_option': 'ABCDEFG'}]
+
+    result = save_questions(questions, '101', 'waec')
+
+    assert result['created'] == ['Question 0?', 'Question 1?']
+    assert [error['text'] for error in result['errors']] == ['No options?', 'Bad answer?']
+
+
+@pytest.mark.django_db
+def test_save_questions_query_count_does_not_grow_per_question():
+    with CaptureQueriesContext(connection) as small:
+        save_questions(make_questions(10, prefix='Small'), '101', 'waec', batch_size=100)
+    with CaptureQueriesContext(connection) as large:
+        save_questions(make_questions(100, prefix='Large'), '101', 'waec', batch_size=100)
+
+    assert len(large) == len(small)
+    assert Question.objects.count() == 110
@@ -58,7 +58,7 @@ def test_upload_pdf_success(api_client, mocker, sample_pdf):
 @pytest.mark.django_db
 def test_upload_invalid_pdf(api_client, mocker, sample_pdf):
     """Test uploading a non-PDF file."""
-    mock_extract_data = mocker.patch('admin_api.views.extract_data_from_pdf', return_value=[])
+    mock_extract_data = mocker.patch('admin_api.documents.extract_pages', return_value=[])
 
     with open(sample_pdf, 'rb') as pdf_file:
         response = api_client.post('/admin-api/upload-pdf/', {
@@ -0,0 +1,191 @@
+"""
+Resumable chunked uploads of large PDFs.
+
+A client opens an UploadSession, then PUTs the file in chunks, each at the
+offset the server has received so far. Every chunk is streamed from the
+request straight to the session's file in ``PDF_INGEST_DIR``, hashed on the
+way, and checked against the SHA-256 the client sent with it, so a corrupted
+chunk is refused and sent again instead of spoiling the whole file. After an
+interruption the client asks the session for ``received`` and carries on
+from there. Completing the session hands the file to an IngestJob, exactly
+like an asynchronous upload.
+
+Unfinished sessions expire ``UPLOAD_SESSION_TTL`` seconds after their last
+chunk. They are deleted, with their files, whenever a session is opened and
+by the ``purge_upload_sessions`` task.
+"""
+import os
+import hashlib
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import UploadSession
+
+
+logger = logging.getLogger(__name__)
+
+
+# Bytes read from the request per write.
+READ_SIZE = 64 * 1024
+PDF_SIGNATURE = b'%PDF-'
+
+
+class UploadSessionError(ValueError):
+    pass
+
+
+class OffsetMismatch(UploadSessionError):
+    def __init__(self, received):
+        super().__init__(f'Expected the chunk at offset {received}')
+        self.received = received
+
+
+class ChunkTooLarge(UploadSessionError):
+    pass
+
+
+def _expiry():
+    return timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+
+
+def create_session(file_name, course_id=None, exam_type=None, backend='', size=None):
+    """
+    Open an UploadSession with an empty file to append chunks to.
+    """
+    if size is not None and size > settings.UPLOAD_SESSION_MAX_SIZE:
+        raise ChunkTooLarge(f'Files can be at most {settings.UPLOAD_SESSION_MAX_SIZE} bytes')
+    purge_expired_sessions()
+
+    session = UploadSession(
+        file_name=file_name, course_id=course_id, exam_type=exam_type, backend=backend or '', size=size,
+        expires_at=_expiry(),
+    )
+    session.file_path = os.path.join(settings.PDF_INGEST_DIR, f'upload-{session.id.hex}.part')
+    open(session.file_path, 'xb').close()
+    try:
+        session.save()
+    except Exception:
+        os.remove(session.file_path)
+        raise
+    return session
+
+
+def get_open_session(pk, for_update=False):
+    """
+    Return the unexpired, unfinished UploadSession ``pk``, or None.
+    """
+    sessions = UploadSession.objects.filter(
+        pk=pk, status=UploadSession.STATUS_OPEN, expires_at__gt=timezone.now(),
+    )
+    if for_update:
+        sessions = sessions.select_for_update()
+    return sessions.first()
+
+
+def write_chunk(session, offset, stream, checksum=None):
+    """
+    Append the bytes read from ``stream`` to ``session`` at ``offset``.
+
+    ``offset`` must be what the session has received so far; a chunk that was
+    already stored with the same ``checksum`` is accepted again without being
+    written, so a retried request is harmless. ``checksum`` is the hex SHA-256
+    the client computed for the chunk; the chunk is refused if it differs.
+    Leftovers of an interrupted earlier attempt at the same offset are
+    overwritten. Call with the session locked.
+    """
+    if offset != session.received:
+        if checksum and [offset, checksum.lower()] in [[start, digest] for start, length, digest in session.chunks]:
+            return session
+        raise OffsetMismatch(session.received)
+
+    limit = settings.UPLOAD_CHUNK_MAX_SIZE
+    if session.size is not None:
+        limit = min(limit, session.size - offset)
+    else:
+        limit = min(limit, settings.UPLOAD_SESSION_MAX_SIZE - offset)
+
+    digest = hashlib.sha256()
+    length = 0
+    with open(session.file_path, 'r+b') as f:
+        f.seek(offset)
+        try:
+            while True:
+                data = stream.read(READ_SIZE)
+                if not data:
+                    break
+                length += len(data)
+                if length > limit:
+                    raise ChunkTooLarge(f'The chunk is larger than the {limit} bytes allowed at offset {offset}')
+                digest.update(data)
+                f.write(data)
+
+            if not length:
+                raise UploadSessionError('The chunk is empty')
+            if checksum and digest.hexdigest() != checksum.lower():
+                raise UploadSessionError('The chunk does not match its checksum')
+        except Exception:
+            f.truncate(offset)
+            raise
+        f.truncate(offset + length)
+        f.flush()
+        os.fsync(f.fileno())
+
+    session.received = offset + length
+    session.chunks.append([offset, length, digest.hexdigest()])
+    session.expires_at = _expiry()
+    session.save(update_fields=['received', 'chunks', 'expires_at', 'updated_at'])
+    return session
+
+
+def finish_session(session, checksum=None):
+    """
+    Check that ``session`` holds a whole PDF and mark it completed.
+
+    ``checksum`` is the optional hex SHA-256 of the whole file. Returns the
+    file's content hash; the file then belongs to whoever processes it.
+    """
+    if session.size is not None and session.received != session.size:
+        raise UploadSessionError(f'Received {session.received} of {session.size} bytes')
+    if not session.received:
+        raise UploadSessionError('Nothing was uploaded')
+
+    digest = hashlib.sha256()
+    with open(session.file_path, 'rb') as f:
+        if f.read(len(PDF_SIGNATURE)) != PDF_SIGNATURE:
+            raise UploadSessionError('The file is not a PDF')
+        f.seek(0)
+        for data in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(data)
+    content_hash = digest.hexdigest()
+    if checksum and content_hash != checksum.lower():
+        raise UploadSessionError('The file does not match its checksum')
+
+    session.status = UploadSession.STATUS_COMPLETED
+    session.save(update_fields=['status', 'updated_at'])
+    return content_hash
+
+
+def discard_session(session):
+    _remove_file(session.file_path)
+    session.delete()
+
+
+def purge_expired_sessions():
+    """
+    Delete expired sessions and the files of those never completed. Returns how many were deleted.
+    """
+    expired = UploadSession.objects.filter(expires_at__lte=timezone.now())
+    for file_path in expired.filter(status=UploadSession.STATUS_OPEN).values_list('file_path', flat=True):
+        _remove_file(file_path)
+    deleted, by_model = expired.delete()
+    return by_model.get(UploadSession._meta.label, 0)
+
+
+def _remove_file(file_path):
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove upload file {file_path}: {str(e)}")
@@ -0,0 +1,132 @@
+"""
+Uploaded PDFs and a cache of their parsed questions.
+
+Uploads are parsed where Django already holds them: small ones straight from
+memory and large ones from Django's own temporary file, so a synchronous
+upload is never copied. Uploads handed to a Celery worker are moved into
+``PDF_INGEST_DIR`` (or written there once if they are in memory) under a
+unique name, as are the PDFs of a batch ZIP.
+
+The SHA-256 of an upload addresses the ``parsed_uploads`` cache: the
+questions parsed from a PDF are kept under its content hash and
+``PARSER_VERSION``, so reviewing the same file again skips extraction.
+Uploads saved straight to the bank reuse page texts through their
+IngestedDocument instead (see ``documents``). Changing the parser changes
+``PARSER_VERSION`` and so retires the old entries.
+"""
+import os
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from django.core.cache import caches
+from django.core.files.move import file_move_safe
+from .utils import PARSER_VERSION
+
+
+PARSED_UPLOAD_CACHE = 'parsed_uploads'
+# Bytes read at a time when copying a PDF out of an uploaded ZIP.
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class ParsedUpload:
+    questions: list
+    # Pages in the document, when known.
+    pages: int = None
+
+
+def hash_upload(uploaded_file):
+    """
+    Return the SHA-256 hex digest of an uploaded file's content.
+    """
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def upload_source(uploaded_file):
+    """
+    Return what the PDF extraction should read an upload from.
+
+    That is the path of Django's temporary file for uploads spooled to disk,
+    and the in-memory file object otherwise.
+    """
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        return uploaded_file.temporary_file_path()
+    uploaded_file.seek(0)
+    return uploaded_file.file
+
+
+def store_upload(uploaded_file, directory=None, suffix='.pdf'):
+    """
+    Give ``uploaded_file`` a new, uniquely named file in ``directory`` that outlives the request.
+
+    Uploads spooled to disk are moved there, which is a rename on the same
+    filesystem; in-memory uploads are written out. Returns
+    ``(file_path, content_hash)``. The caller removes the file.
+    """
+    content_hash = hash_upload(uploaded_file)
+    fd, file_path = tempfile.mkstemp(prefix='upload-', suffix=suffix, dir=directory)
+    try:
+        if hasattr(uploaded_file, 'temporary_file_path'):
+            os.close(fd)
+            file_move_safe(uploaded_file.temporary_file_path(), file_path, allow_overwrite=True)
+        else:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in uploaded_file.chunks():
+                    f.write(chunk)
+    except BaseException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return file_path, content_hash
+
+
+def store_archive_member(zip_file, member, directory=None):
+    """
+    Write the file ``member`` of an open ZipFile to a new, uniquely named file in ``directory``.
+
+    Returns ``(file_path, content_hash)``, as ``store_upload`` does. The
+    caller removes the file.
+    """
+    digest = hashlib.sha256()
+    fd, file_path = tempfile.mkstemp(prefix='upload-', suffix='.pdf', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f, zip_file.open(member) as source:
+            for chunk in iter(lambda: source.read(ARCHIVE_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(file_path)
+        raise
+    return file_path, digest.hexdigest()
+
+
+def parsed_upload_cache():
+    return caches[PARSED_UPLOAD_CACHE]
+
+
+def parsed_upload_cache_key(content_hash):
+    return f'parsed-upload:{PARSER_VERSION}:{content_hash}'
+
+
+def get_parsed_upload(content_hash):
+    """
+    Return the cached ParsedUpload of the PDF with ``content_hash``, or None.
+    """
+    if not content_hash:
+        return None
+    return parsed_upload_cache().get(parsed_upload_cache_key(content_hash))
+
+
+def cache_parsed_upload(content_hash, questions, pages=None):
+    """
+    Remember the questions parsed from the PDF with ``content_hash``.
+
+    Documents without questions are not cached, so a failed or mocked
+    extraction is never served again.
+    """
+    if content_hash and questions:
+        parsed_upload_cache().set(parsed_upload_cache_key(content_hash), ParsedUpload(list(questions), pages))
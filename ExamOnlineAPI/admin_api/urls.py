@@ -1,11 +1,20 @@
 from django.urls import path
-from .views import UploadPDFView, QuestionListView, QuestionDetailView
+from .views import UploadPDFView, ConfirmQuestionsView, QuestionListView, QuestionDetailView, IngestJobDetailView, QuestionExportView, AnswerKeyCacheStatsView, ExamStatsView, GradeAnswerSheetView, UploadSessionListView, UploadSessionDetailView, UploadSessionCompleteView, BatchIngestView
 
 
 urlpatterns = [
     path('upload-pdf/', UploadPDFView.as_view(), name='upload-pdf'),
-    path('confirm-questions/', UploadPDFView.as_view(), name='confirm-questions'),
+    path('confirm-questions/', ConfirmQuestionsView.as_view(), name='confirm-questions'),
     path('questions/', QuestionListView.as_view(), name='question-list'),
+    path('questions/export/', QuestionExportView.as_view(), name='question-export'),
     path('questions/<int:pk>/', QuestionDetailView.as_view(), name='question-detail'),
+    path('ingest-jobs/<uuid:pk>/', IngestJobDetailView.as_view(), name='ingest-job-detail'),
+    path('answer-key-cache/', AnswerKeyCacheStatsView.as_view(), name='answer-key-cache-stats'),
+    path('exam-stats/', ExamStatsView.as_view(), name='exam-stats'),
+    path('grade-sheet/', GradeAnswerSheetView.as_view(), name='grade-sheet'),
+    path('uploads/', UploadSessionListView.as_view(), name='upload-session-list'),
+    path('uploads/<uuid:pk>/', UploadSessionDetailView.as_view(), name='upload-session-detail'),
+    path('uploads/<uuid:pk>/complete/', UploadSessionCompleteView.as_view(), name='upload-session-complete'),
+    path('batch-ingest/', BatchIngestView.as_view(), name='batch-ingest'),
 
 ]
@@ -1,40 +1,326 @@
-import pdfplumber
 import re
+import logging
+from functools import lru_cache
+from django.conf import settings
+from django.db import transaction
+from .models import Question, question_text_hash
+from .cache import invalidate_paper
+from .pdf_extraction import count_pdf_pages, is_path, iter_pdf_pages, iter_pdf_pages_parallel
 
-def extract_data_from_pdf(file_path):
-    with pdfplumber.open(file_path) as pdf:
-        text = ''
-        for page in pdf.pages:
-            text += page.extract_text()
-        # print("Extracted Text:", text)
 
-    return parse_text_to_questions(text)
+logger = logging.getLogger(__name__)
+
+
+# Part of the parsed-upload cache key; change it whenever the parser's output changes.
+PARSER_VERSION = '2'
+
+# Papers are laid out as
+#
+#     Question 12
+#     <question text, any number of lines>
+#     Options
+#     A) <option text>
+#     B) <option text>
+#     The correct answer is B.
+#
+# but extracted text often runs markers together ("...examsQuestion 1",
+# "A) isn't itB) can't he", "...difficultThe correct answer is A."), so the
+# markers are looked for inside lines too.
+QUESTION_HEADER = 'Question '
+OPTIONS_MARKER = 'Options'
+ANSWER_PATTERN = re.compile(r"The correct answer is (\w+)\.")
+# Any label may start a line; within a line only the label following the
+# previous one (B after A, 3 after 2) is taken as the start of a new option.
+LINE_OPTION_LABEL_PATTERN = re.compile(r"[ \t]*([A-Za-z0-9]{1,4})\)(?:[ \t]+|$)")
+# Longest answer marker guaranteed to be seen before the end of its line.
+ANSWER_LOOKBEHIND = 64
+
+SEEK, QUESTION_TEXT, OPTIONS = range(3)
+
+
+def iter_page_texts(source, on_page=None, backend=None):
+    """
+    Yield the text of each page, extracting in parallel for large enough files.
+
+    ``source`` is a path or a binary file object. ``backend`` names the
+    extraction backend and defaults to ``PDF_EXTRACT_BACKEND``. Parallel
+    extraction is used for paths when ``PDF_EXTRACT_WORKERS`` is above 1 and
+    the document has at least ``PDF_PARALLEL_MIN_PAGES`` pages.
+    """
+    backend = backend or settings.PDF_EXTRACT_BACKEND
+    workers = settings.PDF_EXTRACT_WORKERS
+    if workers > 1 and is_path(source) and count_pdf_pages(source, backend) >= settings.PDF_PARALLEL_MIN_PAGES:
+        return iter_pdf_pages_parallel(source, workers, on_page=on_page, backend=backend)
+    return iter_pdf_pages(source, on_page=on_page, backend=backend)
+
+
+def iter_questions(chunks):
+    """
+    Yield parsed questions from an iterable of text chunks as soon as each is complete.
+
+    Chunks are concatenated as they are, so they can be pages, lines with their
+    line endings, or any other split of the document, and the questions come
+    out the same as with ``parse_text_to_questions`` on the whole text. The
+    text is scanned once, line by line, by ``QuestionParser``.
+    """
+    parser = QuestionParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def iter_questions_from_pdf(source, on_page=None, backend=None):
+    return iter_questions(iter_page_texts(source, on_page=on_page, backend=backend))
+
+
+def extract_data_from_pdf(source, on_page=None, backend=None):
+    """
+    Extract questions from the PDF ``source``, a path or a binary file object.
+
+    ``on_page``, if given, is called as ``on_page(pages_parsed, pages_total)``
+    after each page's text has been extracted.
+    """
+    return list(iter_questions_from_pdf(source, on_page=on_page, backend=backend))
 
-import re
 
 def parse_text_to_questions(text):
-    questions = []
-    question_pattern = re.compile(r"Question (\d+)\n(.*?)Options(.*?)The correct answer is (\w+)\.", re.DOTALL)
-    
-    matches = question_pattern.findall(text)
-
-    for match in matches:
-        question_number, question_text, options_text, correct_option = match
-        options = {}
-
-        # Extract options
-        option_pattern = re.compile(r"([A-D])\) ([^A-D]+)")
-        options_matches = option_pattern.findall(options_text)
-        
-        for option in options_matches:
-            label, option_text = option
-            options[label] = option_text.strip()
-
-        question = {
-            'text': question_text.strip(),
-            'options': options,
-            'correct_option': correct_option,
-        }
-        questions.append(question)
-    
-    return questions
+    return list(iter_questions([text]))
+
+
+class QuestionParser:
+    """
+    Line-oriented state machine turning paper text into question dicts.
+
+    Text is given to ``feed`` in chunks of any size; complete lines are parsed
+    as they arrive and only the unfinished last line is kept, so every
+    character is looked at a bounded number of times. An unfinished line is
+    still checked for the answer marker, so a question ending a page is
+    yielded before the next page is read. A question that is interrupted by
+    the next header before its answer is dropped.
+    """
+
+    def __init__(self):
+        self.state = SEEK
+        self.pending = []
+        self._reset()
+
+    @property
+    def question_open(self):
+        """
+        Whether the text fed so far ends inside a question.
+        """
+        return self.state != SEEK
+
+    def _reset(self):
+        self.text_lines = []
+        self.options = {}
+        self.label = None
+        self.next_label = None
+
+    def feed(self, chunk):
+        questions = []
+        newline = chunk.rfind('\n')
+        if newline == -1:
+            self.pending.append(chunk)
+        else:
+            first = chunk.find('\n')
+            self._parse_line(''.join(self.pending) + chunk[:first], questions)
+            if first != newline:
+                for line in chunk[first + 1:newline].split('\n'):
+                    self._parse_line(line, questions)
+            self.pending = [chunk[newline + 1:]] if newline + 1 < len(chunk) else []
+
+        if self.state == OPTIONS and self.pending and '.' in chunk[newline + 1:]:
+            self._parse_line_end(questions)
+        return questions
+
+    def close(self):
+        questions = []
+        if self.pending:
+            self._parse_line(''.join(self.pending), questions)
+            self.pending = []
+        return questions
+
+    def _parse_line_end(self, questions):
+        # Look for an answer marker in the unfinished line, near its end only,
+        # and parse the line up to it.
+        tail = self.pending[-1]
+        if len(self.pending) > 1:
+            tail = self.pending[-2][-ANSWER_LOOKBEHIND:] + tail
+        match = ANSWER_PATTERN.search(tail)
+        if match is None:
+            return
+        line = ''.join(self.pending)
+        match = ANSWER_PATTERN.search(line, max(0, len(line) - len(tail)))
+        self._parse_options(line, 0, match, questions)
+        rest = line[match.end():]
+        self.pending = [rest] if rest else []
+
+    def _parse_line(self, line, questions):
+        position = 0
+        while True:
+            answer = ANSWER_PATTERN.search(line, position) if self.state == OPTIONS else None
+            if answer is None and _is_header(line, position):
+                self._reset()
+                self.state = QUESTION_TEXT
+                return
+
+            if self.state == SEEK:
+                return
+
+            if self.state == QUESTION_TEXT:
+                marker = line.find(OPTIONS_MARKER, position)
+                if marker == -1:
+                    self.text_lines.append(line[position:])
+                    return
+                self.text_lines.append(line[position:marker])
+                self.state = OPTIONS
+                position = marker + len(OPTIONS_MARKER)
+                continue
+
+            self._parse_options(line, position, answer, questions)
+            if answer is None:
+                return
+            position = answer.end()
+
+    def _parse_options(self, line, position, answer, questions):
+        end = answer.start() if answer else len(line)
+        label = LINE_OPTION_LABEL_PATTERN.match(line, position, end)
+        if label:
+            self._start_option(label.group(1))
+            position = label.end()
+        elif self.label is not None:
+            self.options[self.label].append('\n')
+
+        while self.next_label is not None:
+            start = line.find(self.next_label + ')', position, end)
+            if start == -1:
+                break
+            text_start = start + len(self.next_label) + 1
+            if text_start < end and line[text_start] not in ' \t':
+                if self.label is not None:
+                    self.options[self.label].append(line[position:text_start])
+                position = text_start
+                continue
+            if self.label is not None:
+                self.options[self.label].append(line[position:start])
+            self._start_option(self.next_label)
+            position = text_start
+
+        if self.label is not None:
+            self.options[self.label].append(line[position:end])
+
+        if answer:
+            questions.append({
+                'text': '\n'.join(self.text_lines).strip(),
+                'options': {label: ''.join(parts).strip() for label, parts in self.options.items()},
+                'correct_option': answer.group(1),
+            })
+            self.state = SEEK
+            self._reset()
+
+    def _start_option(self, label):
+        self.label = label
+        self.options[label] = []
+        self.next_label = _next_label(label)
+
+
+def _is_header(line, position):
+    # A header ends its line: "Question 12".
+    before, header, number = line[position:].rpartition(QUESTION_HEADER)
+    return bool(header) and number.isdigit()
+
+
+@lru_cache(maxsize=None)
+def _next_label(label):
+    if label.isdigit():
+        return str(int(label) + 1)
+    if len(label) == 1 and label.isalpha() and label not in 'zZ':
+        return chr(ord(label) + 1)
+    return None
+
+
+def save_questions(questions_data, course_id, exam_type, batch_size=None):
+    """
+    Save parsed questions, skipping any whose normalized text already exists for the exam_type.
+
+    Rows are written with ``bulk_create(ignore_conflicts=True)`` in batches of
+    ``batch_size`` (``QUESTION_BULK_BATCH_SIZE`` by default), so the
+    (text_hash, exam_type) unique constraint drops existing questions,
+    including ones a concurrent upload has just saved. One lookup per batch
+    afterwards tells the rows this call inserted from the ones it skipped.
+    Only a batch that fails for another reason is saved again row by row, to
+    report its bad rows. Returns a dict with the ``created`` and ``skipped``
+    question texts and a list of per-question ``errors``.
+    """
+    batch_size = batch_size or settings.QUESTION_BULK_BATCH_SIZE
+    created, skipped, errors = [], [], []
+
+    new_questions = []
+    for question_data in questions_data:
+        try:
+            question = Question(
+                text=question_data['text'],
+                text_hash=question_text_hash(question_data['text']),
+                options=question_data['options'],
+                correct_option=question_data['correct_option'],
+                course_id=course_id,
+                exam_type=exam_type,
+            )
+            question.clean_fields()
+        except Exception as e:
+            text = question_data.get('text') if isinstance(question_data, dict) else None
+            logger.error(f"Error saving question: {text}. Error: {str(e)}")
+            errors.append({'text': text, 'error': str(e)})
+            continue
+        new_questions.append(question)
+
+    to_create, seen = [], set()
+    for question in new_questions:
+        if question.text_hash not in seen:
+            seen.add(question.text_hash)
+            to_create.append(question)
+
+    inserted, failed = set(), set()
+    with transaction.atomic():
+        for start in range(0, len(to_create), batch_size):
+            batch = to_create[start:start + batch_size]
+            try:
+                with transaction.atomic():
+                    Question.objects.bulk_create(batch, ignore_conflicts=True)
+            except Exception:
+                # Conflicts are ignored, so only invalid rows get here: retry row by row to report them.
+                for question in batch:
+                    try:
+                        with transaction.atomic():
+                            Question.objects.bulk_create([question], ignore_conflicts=True)
+                    except Exception as e:
+                        logger.error(f"Error saving question: {question.text}. Error: {str(e)}")
+                        errors.append({'text': question.text, 'error': str(e)})
+                        failed.add(question.text_hash)
+            inserted |= _inserted_hashes(batch, exam_type)
+
+    for question in new_questions:
+        if question.text_hash in failed:
+            continue
+        if question.text_hash in inserted:
+            # Later repeats of the same text in this upload are skipped.
+            inserted.discard(question.text_hash)
+            created.append(question.text)
+        else:
+            logger.info(f"Question already exists: {question.text}")
+            skipped.append(question.text)
+
+    if created:
+        # bulk_create sends no post_save signals, so drop the paper's caches here.
+        invalidate_paper(course_id, exam_type)
+
+    return {'created': created, 'skipped': skipped, 'errors': errors}
+
+
+def _inserted_hashes(batch, exam_type):
+    # bulk_create stamps each object's updated_at before the insert; a row with
+    # any other stamp was already there and the insert was ignored.
+    stamps = {question.text_hash: question.updated_at for question in batch}
+    rows = Question.objects.filter(exam_type=exam_type, text_hash__in=stamps).values_list('text_hash', 'updated_at')
+    return {text_hash for text_hash, updated_at in rows if updated_at == stamps[text_hash]}
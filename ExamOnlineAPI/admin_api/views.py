@@ -2,11 +2,41 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework import status
-from .models import Question
-from .utils import extract_data_from_pdf  
+from rest_framework.exceptions import NotFound
+from .models import Question, IngestJob, UploadSession
+from .utils import extract_data_from_pdf, save_questions
+from .pdf_extraction import BACKENDS
+from .pagination import QuestionCursorPagination
+from .export import EXPORT_FORMATS, iter_export
+from .cache import answer_key_cache_stats, bank_version, get_answer_key
+from .grading import REPORTS, AnswerSheetError, grade_answer_sheet, iter_report, read_answer_sheet
+from .stats import exam_stats
+from .documents import DocumentConflict, DocumentError, ExtractionError, ingest_document
+from .batch_ingest import BatchIngestError, items_from_zip, read_manifest
+from .staging import StagingError, apply_review, get_batch, promote_batch, stage_questions
+from .tasks import ingest_pdf
+from .upload_sessions import (
+    ChunkTooLarge, OffsetMismatch, UploadSessionError, create_session, discard_session, finish_session,
+    get_open_session, write_chunk,
+)
+from .uploads import (
+    cache_parsed_upload, get_parsed_upload, hash_upload, store_archive_member, store_upload, upload_source,
+)
+import io
+import os
+import uuid
+import zlib
 import logging
+import zipfile
+from celery import group
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth import authenticate 
+from django.urls import reverse
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
@@ -34,61 +64,138 @@ class UploadPDFView(APIView):
             if not pdf_file.name.endswith('.pdf'):
                 return Response({'error': 'Invalid file format. Only PDF is allowed'}, status=status.HTTP_400_BAD_REQUEST)
 
-            file_path = f'/tmp/{pdf_file.name}'
-            with open(file_path, 'wb') as f:
-                for chunk in pdf_file.chunks():
-                    f.write(chunk)
+            backend = request.data.get('backend') or settings.PDF_EXTRACT_BACKEND
+            if backend not in BACKENDS:
+                return Response({'error': f"Invalid backend. Choose one of: {', '.join(BACKENDS)}"}, status=status.HTTP_400_BAD_REQUEST)
 
-            try:
-                questions_data = extract_data_from_pdf(file_path)
-            except Exception as e:
-                logger.error(f"Error extracting data from PDF: {str(e)}") 
-                return Response({'error': f'Error extracting data from PDF: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            if not self.is_review(request):
+                if self.is_async(request):
+                    return self.enqueue(pdf_file, course_id, exam_type, backend)
+                return self.ingest(pdf_file, course_id, exam_type, backend)
+
+            content_hash = hash_upload(pdf_file)
+            parsed = get_parsed_upload(content_hash)
+            if parsed is not None:
+                questions_data = parsed.questions
+            else:
+                try:
+                    questions_data = extract_data_from_pdf(upload_source(pdf_file), backend=backend)
+                except Exception as e:
+                    logger.error(f"Error extracting data from PDF: {str(e)}") 
+                    return Response({'error': f'Error extracting data from PDF: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                cache_parsed_upload(content_hash, questions_data)
             
             # Ensure no empty questions_data causes success response
             if not questions_data:
                 logger.warning("No questions extracted from PDF.")
                 return Response({'error': 'No questions found in PDF'}, status=status.HTTP_400_BAD_REQUEST)
 
+            return self.stage(questions_data, pdf_file.name, course_id, exam_type)
 
-            created_questions = []
-            # Proceed to save valid questions
-            for question_data in questions_data:
-                try:
-                    existing_question = Question.objects.filter(text=question_data['text'], exam_type=exam_type).first()
+        except Exception as e:
+            logger.error(f"An unexpected error occurred: {str(e)}") 
+            return Response({'error': f'An error occurred: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-                    if existing_question:
-                        print(f"Question already exists: {question_data['text']}")
-                        continue
+    def is_async(self, request):
+        value = request.data.get('async')
+        if value is None:
+            return settings.PDF_INGEST_ASYNC
+        return str(value).lower() in ('1', 'true', 'yes')
 
-                    Question.objects.create(
-                        text=question_data['text'],
-                        options=question_data['options'],
-                        correct_option=question_data['correct_option'],
-                        course_id=course_id,
-                        exam_type=exam_type, 
-                    )
+    def is_review(self, request):
+        return str(request.data.get('review', '')).lower() in ('1', 'true', 'yes')
 
-                except Exception as e:
-                    print(f"Error saving question: {question_data['text']}. Error: {str(e)}")
-                    logger.error(f"Error saving question: {question_data['text']}. Error: {str(e)}")
-                    continue
+    def ingest(self, pdf_file, course_id, exam_type, backend):
+        """
+        Save the questions of the upload, re-ingesting only what changed if the same document was uploaded before.
+        """
+        try:
+            result = ingest_document(
+                upload_source(pdf_file), pdf_file.name, course_id, exam_type, backend=backend,
+                content_hash=hash_upload(pdf_file),
+            )
+        except ExtractionError as e:
+            logger.error(f"Error extracting data from PDF: {str(e)}")
+            return Response({'error': f'Error extracting data from PDF: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except DocumentConflict as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except DocumentError as e:
+            logger.warning(f"Upload {pdf_file.name} not ingested: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "message": "File processed successfully and saved.",
+            "document_id": str(result.document.id),
+            "created_questions": result.created,
+            "updated_questions": result.updated,
+            "deleted_questions": result.deleted,
+            "skipped_questions": result.skipped,
+            "unchanged_count": result.unchanged,
+            "errors": result.errors,
+            "pages_total": result.pages_total,
+            "pages_extracted": result.pages_extracted,
+        }, status=status.HTTP_201_CREATED)
+
+    def stage(self, questions_data, file_name, course_id, exam_type):
+        """
+        Keep the parsed questions in a staging batch and return them for review.
+        """
+        batch, staged, errors = stage_questions(questions_data, course_id, exam_type, file_name=file_name)
+        return Response({
+            'message': 'File processed successfully. Review the questions and confirm the batch to save them.',
+            'batch_id': str(batch.id),
+            'expires_at': batch.expires_at,
+            'questions': [
+                {
+                    'id': question.id,
+                    'text': question.text,
+                    'options': question.options,
+                    'correct_option': question.correct_option,
+                }
+                for question in staged
+            ],
+            'errors': errors,
+        }, status=status.HTTP_201_CREATED)
 
-            response_data = {
-                "message": "File processed successfully and saved.",
-                "created_questions": created_questions,
-            }
+    def enqueue(self, pdf_file, course_id, exam_type, backend):
+        """
+        Store the upload where the workers can read it and queue an ingest job for it.
+        """
+        file_path, content_hash = store_upload(pdf_file, directory=settings.PDF_INGEST_DIR)
+        job = queue_ingest_job(pdf_file.name, file_path, content_hash, course_id, exam_type, backend)
+        return ingest_job_accepted(job)
 
-            return Response(response_data, status=status.HTTP_201_CREATED)
 
-        except Exception as e:
-            logger.error(f"An unexpected error occurred: {str(e)}") 
-            return Response({'error': f'An error occurred: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+def queue_ingest_job(file_name, file_path, content_hash, course_id, exam_type, backend):
+    """
+    Create an IngestJob for a PDF stored in ``PDF_INGEST_DIR`` and queue it.
+    """
+    job = IngestJob.objects.create(
+        file_name=file_name,
+        file_path=file_path,
+        content_hash=content_hash,
+        course_id=course_id,
+        exam_type=exam_type,
+        backend=backend,
+    )
+    ingest_pdf.delay(str(job.id))
+    return job
+
+
+def ingest_job_accepted(job):
+    return Response({
+        'message': 'File accepted for processing.',
+        'job_id': str(job.id),
+        'status_url': reverse('ingest-job-detail', kwargs={'pk': job.id}),
+    }, status=status.HTTP_202_ACCEPTED)
 
 
 class ConfirmQuestionsView(APIView):
     """
     Save reviewed questions to the database.
+
+    Either confirm a staged upload with ``batch_id`` (plus optional ``edits``
+    and ``exclude``), or send the full list of ``questions``.
     """
     permission_classes = [IsAuthenticated]
     def post(self, request, *args, **kwargs):
@@ -96,37 +203,21 @@ class ConfirmQuestionsView(APIView):
             questions_data = request.data.get('questions')
             exam_type = request.data.get('exam_type')
             course_id = request.data.get('course_id')
+            batch_id = request.data.get('batch_id')
+
+            if batch_id:
+                return self.confirm_batch(request, batch_id, course_id, exam_type)
 
             if not questions_data:
                 return Response({'error': 'No questions provided for saving.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            created_questions = []
-
-            for question_data in questions_data:
-                try:
-                    existing_question = Question.objects.filter(text=question_data['text'], exam_type=exam_type).first()
-
-                    if existing_question:
-                        print(f"Question already exists: {question_data['text']}")
-                        continue
-
-                    Question.objects.create(
-                        text=question_data['text'],
-                        options=question_data['options'],
-                        correct_option=question_data['correct_option'],
-                        course_id=course_id,
-                        exam_type=exam_type,
-                    )
-                    created_questions.append(question_data['text'])
-
-                except Exception as e:
-                    print(f"Error saving question: {question_data['text']}. Error: {str(e)}")
-                    logger.error(f"Error saving question: {question_data['text']}. Error: {str(e)}")
-                    continue
+            result = save_questions(questions_data, course_id, exam_type)
 
             response_data = {
                 "message": "Questions saved successfully.",
-                "created_questions": created_questions,
+                "created_questions": result['created'],
+                "skipped_questions": result['skipped'],
+                "errors": result['errors'],
             }
 
             return Response(response_data, status=status.HTTP_201_CREATED)
@@ -135,16 +226,77 @@ class ConfirmQuestionsView(APIView):
             logger.error(f"An unexpected error occurred: {str(e)}")
             return Response({'error': f'An error occurred: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def confirm_batch(self, request, batch_id, course_id, exam_type):
+        try:
+            uuid.UUID(str(batch_id))
+        except ValueError:
+            return Response({'error': 'Invalid batch_id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            batch = get_batch(batch_id, for_update=True)
+            if batch is None:
+                return Response({'error': 'Staging batch not found or expired'}, status=status.HTTP_404_NOT_FOUND)
+            try:
+                apply_review(batch, edits=request.data.get('edits'), exclude=request.data.get('exclude'))
+                result = promote_batch(batch, course_id=course_id, exam_type=exam_type)
+            except StagingError as e:
+                transaction.set_rollback(True)
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "message": "Questions saved successfully.",
+            "batch_id": str(batch_id),
+            "created_count": result['created'],
+            "skipped_count": result['skipped'],
+            "excluded_count": result['excluded'],
+        }, status=status.HTTP_201_CREATED)
+
+
+
+def question_bank_etag(request, *args, **kwargs):
+    return f'W/"{_requested_bank_version(request)[0]}"'
+
+
+def question_bank_last_modified(request, *args, **kwargs):
+    return _requested_bank_version(request)[1]
+
+
+def _requested_bank_version(request):
+    # Looked up once per request and shared by both validators.
+    if not hasattr(request, '_bank_version'):
+        request._bank_version = bank_version()
+    return request._bank_version
 
 
 class QuestionListView(APIView):
     """
-    Retrieve list of questions and create a new question.
+    Retrieve a page of questions and create a new question.
+
+    The listing is cursor-paginated by id (``cursor``, ``page_size``) and can be
+    filtered by ``course_id`` and ``exam_type``. Pages are validated by the
+    question bank's version token, so an unchanged bank answers If-None-Match
+    with a 304 after reading only that token.
     """
     permission_classes = [IsAuthenticated]
+
+    @method_decorator(condition(etag_func=question_bank_etag, last_modified_func=question_bank_last_modified))
     def get(self, request, *args, **kwargs):
         try:
             questions = Question.objects.all()
+
+            course_id = request.query_params.get('course_id')
+            exam_type = request.query_params.get('exam_type')
+            if course_id:
+                questions = questions.filter(course_id=course_id)
+            if exam_type:
+                questions = questions.filter(exam_type=exam_type)
+
+            paginator = QuestionCursorPagination()
+            try:
+                questions = paginator.paginate_queryset(questions, request, view=self)
+            except NotFound:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
             data = [
                 {
                     'id': q.id,
@@ -153,10 +305,15 @@ class QuestionListView(APIView):
                     'correct_option': q.correct_option,
                     'course_id': q.course_id,
                     'exam_type': q.exam_type,
+                    'difficulty': q.difficulty,
                 }
                 for q in questions
             ]
-            return Response({'questions': data}, status=status.HTTP_200_OK)
+            return Response({
+                'questions': data,
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
+            }, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error fetching questions: {str(e)}")
             return Response({'error': 'Error fetching questions'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -168,17 +325,24 @@ class QuestionListView(APIView):
             correct_option = request.data.get('correct_option')
             course_id = request.data.get('course_id')
             exam_type = request.data.get('exam_type')
+            difficulty = request.data.get('difficulty') or ''
 
             if not all([text, options, correct_option, course_id, exam_type]):
                 return Response({'error': 'Missing required fields'}, status=status.HTTP_400_BAD_REQUEST)
 
-            question = Question.objects.create(
-                text=text,
-                options=options,
-                correct_option=correct_option,
-                course_id=course_id,
-                exam_type=exam_type
-            )
+            try:
+                with transaction.atomic():
+                    question = Question.objects.create(
+                        text=text,
+                        options=options,
+                        correct_option=correct_option,
+                        course_id=course_id,
+                        exam_type=exam_type,
+                        difficulty=difficulty,
+                    )
+            except IntegrityError:
+                return Response({'error': 'Question already exists for this exam_type'}, status=status.HTTP_409_CONFLICT)
+
             return Response({
                 'id': question.id,
                 'text': question.text,
@@ -186,6 +350,7 @@ class QuestionListView(APIView):
                 'correct_option': question.correct_option,
                 'course_id': question.course_id,
                 'exam_type': question.exam_type,
+                'difficulty': question.difficulty,
             }, status=status.HTTP_201_CREATED)
         except Exception as e:
             logger.error(f"Error creating question: {str(e)}")
@@ -216,6 +381,7 @@ class QuestionDetailView(APIView):
                 'correct_option': question.correct_option,
                 'course_id': question.course_id,
                 'exam_type': question.exam_type,
+                'difficulty': question.difficulty,
             }, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error retrieving question: {str(e)}")
@@ -232,13 +398,19 @@ class QuestionDetailView(APIView):
             correct_option = request.data.get('correct_option', question.correct_option)
             course_id = request.data.get('course_id', question.course_id)
             exam_type = request.data.get('exam_type', question.exam_type)
+            difficulty = request.data.get('difficulty', question.difficulty) or ''
 
             question.text = text
             question.options = options
             question.correct_option = correct_option
             question.course_id = course_id
             question.exam_type = exam_type
-            question.save()
+            question.difficulty = difficulty
+            try:
+                with transaction.atomic():
+                    question.save()
+            except IntegrityError:
+                return Response({'error': 'Question already exists for this exam_type'}, status=status.HTTP_409_CONFLICT)
 
             return Response({
                 'id': question.id,
@@ -247,6 +419,7 @@ class QuestionDetailView(APIView):
                 'correct_option': question.correct_option,
                 'course_id': question.course_id,
                 'exam_type': question.exam_type,
+                'difficulty': question.difficulty,
             }, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error updating question: {str(e)}")
@@ -265,7 +438,386 @@ class QuestionDetailView(APIView):
             return Response({'error': 'Error deleting question'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class IngestJobDetailView(APIView):
+    """
+    Report the progress of a background PDF ingestion job.
+    """
+    permission_classes = [IsAuthenticated]
+    def get(self, request, pk, *args, **kwargs):
+        try:
+            job = IngestJob.objects.get(pk=pk)
+        except IngestJob.DoesNotExist:
+            return Response({'error': 'Ingest job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'id': str(job.id),
+            'file_name': job.file_name,
+            'course_id': job.course_id,
+            'exam_type': job.exam_type,
+            'backend': job.backend,
+            'status': job.status,
+            'pages_total': job.pages_total,
+            'pages_parsed': job.pages_parsed,
+            'questions_created': job.questions_created,
+            'questions_updated': job.questions_updated,
+            'questions_deleted': job.questions_deleted,
+            'duplicates_skipped': job.duplicates_skipped,
+            'errors': job.errors,
+            'created_at': job.created_at,
+            'updated_at': job.updated_at,
+        }, status=status.HTTP_200_OK)
+
+
+class QuestionExportView(APIView):
+    """
+    Stream the whole question bank as NDJSON, CSV or a JSON array.
+
+    Choose the format with ``output`` (``ndjson`` by default) and filter with
+    ``course_id`` and ``exam_type``. Rows are streamed as they are read, so memory
+    use does not depend on the size of the bank.
+    """
+    permission_classes = [IsAuthenticated]
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get('output', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': f"Invalid output format. Choose one of: {', '.join(EXPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            iter_export(
+                export_format,
+                course_id=request.query_params.get('course_id'),
+                exam_type=request.query_params.get('exam_type'),
+            ),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="questions.{extension}"'
+        return response
+
+
+class AnswerKeyCacheStatsView(APIView):
+    """
+    Report hit/miss counters of the grading answer-key cache.
+    """
+    permission_classes = [IsAuthenticated]
+    def get(self, request, *args, **kwargs):
+        return Response(answer_key_cache_stats(), status=status.HTTP_200_OK)
+
+
+class ExamStatsView(APIView):
+    """
+    Report percent-correct and option picks per question and the score distribution of a paper.
+
+    The figures come from counters maintained as submissions are stored, so the
+    cost depends on the number of questions in the paper, not on submissions.
+    """
+    permission_classes = [IsAuthenticated]
+    def get(self, request, *args, **kwargs):
+        course_id = request.query_params.get('course_id')
+        exam_type = request.query_params.get('exam_type')
+        if not course_id or not exam_type:
+            return Response({'error': 'course_id and exam_type are required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return Response(exam_stats(course_id, exam_type), status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error(f"Error fetching exam statistics: {str(e)}")
+            return Response({'error': 'Error fetching exam statistics'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class GradeAnswerSheetView(APIView):
+    """
+    Grade an uploaded CSV answer sheet against a paper and stream the results as CSV.
+
+    The sheet has a ``student_id`` column followed by one column per question id.
+    ``report=students`` (default) returns each student's score, ``report=questions``
+    each question's correctness rate.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, *args, **kwargs):
+        sheet_file = request.FILES.get('file')
+        course_id = request.data.get('course_id')
+        exam_type = request.data.get('exam_type')
+        report = request.data.get('report') or 'students'
+
+        if not sheet_file:
+            return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+        if not course_id or not exam_type:
+            return Response({'error': 'course_id and exam_type are required'}, status=status.HTTP_400_BAD_REQUEST)
+        if report not in REPORTS:
+            return Response({'error': f"Invalid report. Choose one of: {', '.join(REPORTS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        answer_key = get_answer_key(course_id, exam_type)
+        if not answer_key:
+            return Response({'error': f'No questions found for the given {course_id} and {exam_type}'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            sheet = read_answer_sheet(io.TextIOWrapper(sheet_file, encoding='utf-8-sig', newline=''))
+            graded = grade_answer_sheet(sheet, answer_key)
+        except (AnswerSheetError, UnicodeDecodeError) as e:
+            return Response({'error': f'Invalid answer sheet: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(iter_report(graded, report), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{report}.csv"'
+        return response
+
+
+class UploadSessionListView(APIView):
+    """
+    Open a resumable, chunked upload of a large PDF.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        file_name = request.data.get('file_name')
+        if not file_name:
+            return Response({'error': 'file_name is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if not file_name.endswith('.pdf'):
+            return Response({'error': 'Invalid file format. Only PDF is allowed'}, status=status.HTTP_400_BAD_REQUEST)
+
+        backend = request.data.get('backend') or settings.PDF_EXTRACT_BACKEND
+        if backend not in BACKENDS:
+            return Response({'error': f"Invalid backend. Choose one of: {', '.join(BACKENDS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        size = request.data.get('size')
+        try:
+            size = int(size) if size not in (None, '') else None
+        except (TypeError, ValueError):
+            return Response({'error': 'size must be a number of bytes'}, status=status.HTTP_400_BAD_REQUEST)
+        if size is not None and size <= 0:
+            return Response({'error': 'size must be a number of bytes'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            session = create_session(
+                file_name, course_id=request.data.get('course_id'), exam_type=request.data.get('exam_type'),
+                backend=backend, size=size,
+            )
+        except ChunkTooLarge as e:
+            return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except Exception as e:
+            logger.error(f"Error opening upload session: {str(e)}")
+            return Response({'error': 'Error opening upload session'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response(upload_session_data(session), status=status.HTTP_201_CREATED)
 
 
+class UploadSessionDetailView(APIView):
+    """
+    Report, extend or abort a chunked upload.
+
+    ``PUT ?offset=<received>`` appends the raw request body; send its hex
+    SHA-256 in the ``X-Chunk-SHA256`` header to have it verified.
+    """
+    permission_classes = [IsAuthenticated]
 
+    def get(self, request, pk, *args, **kwargs):
+        session = UploadSession.objects.filter(pk=pk).first()
+        if session is None:
+            return Response({'error': 'Upload session not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(upload_session_data(session), status=status.HTTP_200_OK)
 
+    def put(self, request, pk, *args, **kwargs):
+        try:
+            offset = int(request.query_params.get('offset', ''))
+        except ValueError:
+            return Response({'error': 'offset is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            declared_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            declared_length = 0
+        if declared_length > settings.UPLOAD_CHUNK_MAX_SIZE:
+            return Response(
+                {'error': f'Chunks can be at most {settings.UPLOAD_CHUNK_MAX_SIZE} bytes'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        try:
+            with transaction.atomic():
+                session = get_open_session(pk, for_update=True)
+                if session is None:
+                    return Response({'error': 'Upload session not found or no longer open'}, status=status.HTTP_404_NOT_FOUND)
+                write_chunk(
+                    session, offset, request.stream or io.BytesIO(), checksum=request.headers.get('X-Chunk-SHA256'),
+                )
+        except OffsetMismatch as e:
+            return Response({'error': str(e), 'received': e.received}, status=status.HTTP_409_CONFLICT)
+        except ChunkTooLarge as e:
+            return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except UploadSessionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error writing upload chunk: {str(e)}")
+            return Response({'error': 'Error writing upload chunk'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response(upload_session_data(session), status=status.HTTP_200_OK)
+
+    def delete(self, request, pk, *args, **kwargs):
+        with transaction.atomic():
+            session = get_open_session(pk, for_update=True)
+            if session is None:
+                return Response({'error': 'Upload session not found or no longer open'}, status=status.HTTP_404_NOT_FOUND)
+            discard_session(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionCompleteView(APIView):
+    """
+    Finish a chunked upload and queue the file for ingestion.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                session = get_open_session(pk, for_update=True)
+                if session is None:
+                    return Response({'error': 'Upload session not found or no longer open'}, status=status.HTTP_404_NOT_FOUND)
+                try:
+                    content_hash = finish_session(session, checksum=request.data.get('sha256'))
+                except UploadSessionError as e:
+                    return Response({'error': str(e), 'received': session.received}, status=status.HTTP_400_BAD_REQUEST)
+
+                job = queue_ingest_job(
+                    session.file_name, session.file_path, content_hash, session.course_id, session.exam_type,
+                    session.backend,
+                )
+                session.job = job
+                session.save(update_fields=['job', 'updated_at'])
+        except Exception as e:
+            logger.error(f"Error completing upload session: {str(e)}")
+            return Response({'error': 'Error completing upload session'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return ingest_job_accepted(job)
+
+
+def upload_session_data(session):
+    return {
+        'upload_id': str(session.id),
+        'file_name': session.file_name,
+        'course_id': session.course_id,
+        'exam_type': session.exam_type,
+        'status': session.status,
+        'size': session.size,
+        'received': session.received,
+        'chunks': [{'offset': offset, 'length': length, 'sha256': digest} for offset, length, digest in session.chunks],
+        'max_chunk_size': settings.UPLOAD_CHUNK_MAX_SIZE,
+        'expires_at': session.expires_at,
+        'upload_url': reverse('upload-session-detail', kwargs={'pk': session.id}),
+        'complete_url': reverse('upload-session-complete', kwargs={'pk': session.id}),
+        'job_id': str(session.job_id) if session.job_id else None,
+    }
+
+
+class BatchIngestView(APIView):
+    """
+    Queue a ZIP of PDFs, each tagged with its paper by a manifest, for ingestion.
+
+    The manifest is ``manifest.csv`` inside the ZIP, or a separate ``manifest``
+    upload, with the columns ``file,course_id,exam_type`` and optionally
+    ``backend``. ``course_id``, ``exam_type`` and ``backend`` sent with the
+    request apply to files the manifest leaves untagged. Every file gets an
+    IngestJob, and every file is ingested by its own Celery task.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, *args, **kwargs):
+        zip_file = request.FILES.get('file')
+        manifest_file = request.FILES.get('manifest')
+        backend = request.data.get('backend') or settings.PDF_EXTRACT_BACKEND
+
+        if not zip_file:
+            return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+        if not zip_file.name.lower().endswith('.zip'):
+            return Response({'error': 'Invalid file format. Only ZIP is allowed'}, status=status.HTTP_400_BAD_REQUEST)
+        if backend not in BACKENDS:
+            return Response({'error': f"Invalid backend. Choose one of: {', '.join(BACKENDS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            manifest = None
+            if manifest_file:
+                manifest = read_manifest(io.TextIOWrapper(manifest_file, encoding='utf-8-sig', newline=''))
+        except (BatchIngestError, UnicodeDecodeError) as e:
+            return Response({'error': f'Invalid batch: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Stored on disk, so the PDFs can be copied out one at a time.
+        archive_path = store_upload(zip_file, directory=settings.PDF_INGEST_DIR, suffix='.zip')[0]
+        try:
+            items = items_from_zip(
+                archive_path, manifest,
+                course_id=request.data.get('course_id'), exam_type=request.data.get('exam_type'), backend=backend,
+            )
+        except BatchIngestError as e:
+            os.remove(archive_path)
+            return Response({'error': f'Invalid batch: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+        if not items:
+            os.remove(archive_path)
+            return Response({'error': 'No PDF files found in the ZIP'}, status=status.HTTP_400_BAD_REQUEST)
+
+        jobs = queue_batch_jobs(archive_path, items)
+        return Response({
+            'message': 'Batch accepted for processing.',
+            'files': len(jobs),
+            'files_failed': sum(1 for job in jobs if job.status == IngestJob.STATUS_FAILED),
+            'jobs': [
+                {
+                    'file': job.file_name,
+                    'course_id': job.course_id,
+                    'exam_type': job.exam_type,
+                    'job_id': str(job.id),
+                    'status': job.status,
+                    'errors': job.errors,
+                    'status_url': reverse('ingest-job-detail', kwargs={'pk': job.id}),
+                }
+                for job in jobs
+            ],
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+def queue_batch_jobs(archive_path, items):
+    """
+    Create an IngestJob for every BatchItem of a ZIP stored in ``PDF_INGEST_DIR`` and queue them.
+
+    Each PDF is copied out of the archive to a file of its own and gets its
+    own ``ingest_pdf`` task, exactly as a single ``async=true`` upload, so the
+    files of a batch are spread across the workers. Files that cannot be
+    ingested get a failed job straight away. The archive is removed once its
+    PDFs are out.
+    """
+    stored = {}
+    try:
+        with zipfile.ZipFile(archive_path) as zip_file:
+            for item in items:
+                if item.error:
+                    continue
+                try:
+                    stored[item.file] = store_archive_member(zip_file, item.source, directory=settings.PDF_INGEST_DIR)
+                except (zipfile.BadZipFile, zlib.error) as e:
+                    item.error = f'Could not read the file from the ZIP: {str(e)}'
+
+        jobs = IngestJob.objects.bulk_create([
+            IngestJob(
+                file_name=item.file,
+                file_path=stored[item.file][0] if item.file in stored else '',
+                content_hash=stored[item.file][1] if item.file in stored else '',
+                course_id=item.course_id,
+                exam_type=item.exam_type,
+                backend=item.backend or '',
+                status=IngestJob.STATUS_FAILED if item.error else IngestJob.STATUS_PENDING,
+                errors=[item.error] if item.error else [],
+            )
+            for item in items
+        ])
+    except BaseException:
+        for file_path, content_hash in stored.values():
+            os.remove(file_path)
+        raise
+    finally:
+        os.remove(archive_path)
+
+    queued = [job for job in jobs if job.status == IngestJob.STATUS_PENDING]
+    if queued:
+        group(ingest_pdf.s(str(job.id)) for job in queued).delay()
+    return jobs
@@ -0,0 +1,14 @@
+import pytest
+from admin_api.cache import answer_key_cache, exam_paper_cache, student_paper_cache
+from admin_api.uploads import parsed_upload_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Rolled-back test rows send no signals, so every test starts, and leaves, with cold caches."""
+    caches = [answer_key_cache(), exam_paper_cache(), student_paper_cache(), parsed_upload_cache()]
+    for cache in caches:
+        cache.clear()
+    yield
+    for cache in caches:
+        cache.clear()
@@ -0,0 +1,57 @@
+import json
+import time
+from django.core.management.base import BaseCommand
+from user_api.shuffling import original_option, shuffle_options
+
+
+class Command(BaseCommand):
+    help = 'Time per-student option shuffling against rendering the same paper to JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000)
+        parser.add_argument('--questions', type=int, default=100)
+        parser.add_argument('--options', type=int, default=4, help='Options per question.')
+
+    def handle(self, *args, **options):
+        labels = [chr(ord('A') + n) for n in range(options['options'])]
+        paper = [
+            {
+                'id': question_id,
+                'text': f'Question {question_id}: which of these options is the right one?',
+                'options': {label: f'Option {label} of question {question_id}' for label in labels},
+            }
+            for question_id in range(1, options['questions'] + 1)
+        ]
+        students = range(1, options['students'] + 1)
+
+        started = time.perf_counter()
+        for _ in students:
+            json.dumps(paper, ensure_ascii=False, separators=(',', ':'))
+        render_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for student in students:
+            for question in paper:
+                shuffle_options(question['options'], student, 'benchmark:exam', question['id'])
+        shuffle_time = time.perf_counter() - started
+
+        sorted_labels = tuple(labels)
+        started = time.perf_counter()
+        for student in students:
+            for question in paper:
+                original_option(labels[0], sorted_labels, student, 'benchmark:exam', question['id'])
+        grade_time = time.perf_counter() - started
+
+        shuffles = len(students) * len(paper)
+        self.stdout.write(f'{len(students)} students x {len(paper)} questions ({shuffles:,} shuffles)')
+        self.stdout.write(f'Rendering papers to JSON: {render_time:.2f}s')
+        self.stdout.write(
+            f'Shuffling options:        {shuffle_time:.2f}s ({_per_call_us(shuffle_time, shuffles):.1f}us per question)'
+        )
+        self.stdout.write(
+            f'Mapping answers back:     {grade_time:.2f}s ({_per_call_us(grade_time, shuffles):.1f}us per question)'
+        )
+
+
+def _per_call_us(elapsed, calls):
+    return elapsed / calls * 1e6 if calls else 0
@@ -0,0 +1,124 @@
+import time
+import threading
+from django.core.management.base import BaseCommand
+from django.db import connection
+from admin_api.models import ExamScoreStats, OptionPickStats, Question, QuestionStats, question_text_hash
+from user_api.models import Answer, Submission
+from user_api.submissions import SubmissionBuffer, write_submissions
+
+
+LOAD_TEST_COURSE = 'load-test'
+LOAD_TEST_EXAM = 'load-test'
+
+
+class Command(BaseCommand):
+    help = (
+        'Store graded submissions from concurrent threads and report how many per second are committed. '
+        'Uses a throwaway paper that is deleted, with its submissions, afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submissions', type=int, default=2000)
+        parser.add_argument('--answers', type=int, default=50, help='Answers per submission.')
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--batch-size', type=int, help='Defaults to SUBMISSION_BATCH_SIZE.')
+        parser.add_argument('--flush-interval', type=float, help='Defaults to SUBMISSION_FLUSH_INTERVAL.')
+        parser.add_argument(
+            '--unbuffered', action='store_true',
+            help='Save every submission and answer with its own INSERT instead, for comparison.',
+        )
+
+    def handle(self, *args, **options):
+        question_ids = self.create_paper(options['answers'])
+        groups = []
+
+        def counting_writer(group):
+            groups.append(len(group))
+            return write_submissions(group)
+
+        buffer = SubmissionBuffer(
+            batch_size=options['batch_size'], flush_interval=options['flush_interval'], writer=counting_writer,
+        )
+        store = save_one_by_one if options['unbuffered'] else buffer.submit
+
+        per_thread = [options['submissions'] // options['threads']] * options['threads']
+        per_thread[0] += options['submissions'] - sum(per_thread)
+        # Submissions each thread had acknowledged as committed.
+        acknowledged = [0] * len(per_thread)
+        errors = []
+
+        def worker(index, count):
+            try:
+                for _ in range(count):
+                    submission, answers = make_submission(question_ids)
+                    try:
+                        store(submission, answers)
+                    except Exception as e:
+                        errors.append(e)
+                    else:
+                        acknowledged[index] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(index, count)) for index, count in enumerate(per_thread)]
+        started = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            self.delete_paper()
+
+        stored = sum(acknowledged)
+        rate = stored / elapsed if elapsed else 0
+        mode = 'one INSERT per row' if options['unbuffered'] else 'grouped writes'
+        self.stdout.write(f'{stored} submissions x {options["answers"]} answers with {len(threads)} threads ({mode})')
+        self.stdout.write(f'{elapsed:.2f}s: {rate:,.0f} submissions/s, {rate * options["answers"]:,.0f} answers/s')
+        if groups:
+            self.stdout.write(f'{len(groups)} writes, {stored / len(groups):.1f} submissions per write on average')
+        if errors:
+            self.stderr.write(f'{len(errors)} submissions failed, first error: {errors[0]}')
+
+    def create_paper(self, size):
+        self.delete_paper()
+        questions = Question.objects.bulk_create([
+            Question(
+                text=f'Load test question {n}',
+                text_hash=question_text_hash(f'Load test question {n}'),
+                options={'A': 'yes', 'B': 'no'},
+                correct_option='A',
+                course_id=LOAD_TEST_COURSE,
+                exam_type=LOAD_TEST_EXAM,
+            )
+            for n in range(size)
+        ])
+        if all(question.pk for question in questions):
+            return [question.pk for question in questions]
+        return list(Question.objects.filter(course_id=LOAD_TEST_COURSE, exam_type=LOAD_TEST_EXAM).values_list('id', flat=True))
+
+    def delete_paper(self):
+        paper = {'course_id': LOAD_TEST_COURSE, 'exam_type': LOAD_TEST_EXAM}
+        questions = {f'question__{field}': value for field, value in paper.items()}
+        Submission.objects.filter(**paper).delete()
+        ExamScoreStats.objects.filter(**paper).delete()
+        OptionPickStats.objects.filter(**questions).delete()
+        QuestionStats.objects.filter(**questions).delete()
+        Question.objects.filter(**paper).delete()
+
+
+def make_submission(question_ids):
+    submission = Submission(course_id=LOAD_TEST_COURSE, exam_type=LOAD_TEST_EXAM)
+    answers = [
+        Answer(submission=submission, question_id=question_id, chosen_option='A', correct=True)
+        for question_id in question_ids
+    ]
+    submission.score = submission.total = len(answers)
+    return submission, answers
+
+
+def save_one_by_one(submission, answers):
+    submission.save()
+    for answer in answers:
+        answer.save()
@@ -1,3 +1,33 @@
+import uuid
+from django.conf import settings
 from django.db import models
+from admin_api.models import Question
 
-# Create your models here.
+
+class Submission(models.Model):
+    """
+    One graded batch of answers sent to SubmitAnswersView.
+
+    The id is generated in Python so answers can reference their submission
+    when both are written with bulk_create.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    course_id = models.CharField(max_length=50, blank=True, default='')
+    exam_type = models.CharField(max_length=20, blank=True, default='')
+    score = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.id} ({self.score}/{self.total})'
+
+
+class Answer(models.Model):
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='answers')
+    question = models.ForeignKey(Question, on_delete=models.SET_NULL, null=True, related_name='answers')
+    chosen_option = models.CharField(max_length=255)
+    correct = models.BooleanField()
+
+    def __str__(self):
+        return f'{self.question_id}: {self.chosen_option}'
@@ -0,0 +1,48 @@
+"""
+Random exam draws from a paper's QuestionPool.
+
+A draw only touches the ids it picks, so its cost grows with the number of
+questions asked for, not the size of the pool. The same seed over an unchanged
+pool always gives the same questions in the same order.
+"""
+import random
+
+
+def draw_question_ids(pool, count, seed, stratify=False):
+    """
+    Return ``count`` distinct question ids from ``pool``, in exam order.
+
+    With ``stratify``, every difficulty contributes in proportion to its share of
+    the pool (largest remainder rounding).
+    """
+    if count > len(pool):
+        raise ValueError(f'Cannot draw {count} questions from a pool of {len(pool)}')
+
+    rng = random.Random(seed)
+    if not stratify:
+        return [pool.ids[index] for index in rng.sample(range(len(pool)), count)]
+
+    drawn = []
+    for difficulty, quota in stratum_quotas(pool, count).items():
+        start, stop = pool.strata[difficulty]
+        drawn.extend(pool.ids[index] for index in rng.sample(range(start, stop), quota))
+    rng.shuffle(drawn)
+    return drawn
+
+
+def stratum_quotas(pool, count):
+    """
+    Split ``count`` across the pool's difficulties in proportion to their sizes.
+    """
+    total = len(pool)
+    shares = {
+        difficulty: count * (stop - start) / total
+        for difficulty, (start, stop) in sorted(pool.strata.items())
+    }
+    quotas = {difficulty: int(share) for difficulty, share in shares.items()}
+
+    remainder = count - sum(quotas.values())
+    by_fraction = sorted(shares, key=lambda difficulty: shares[difficulty] - quotas[difficulty], reverse=True)
+    for difficulty in by_fraction[:remainder]:
+        quotas[difficulty] += 1
+    return quotas
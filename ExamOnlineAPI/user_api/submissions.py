@@ -0,0 +1,191 @@
+"""
+Write-behind storage of graded submissions.
+
+Requests hand their Submission and Answer rows to ``submission_buffer`` and
+block until those rows are committed, so a response is never sent for an
+unsaved submission. Writes are grouped: the first request to find no write in
+progress becomes the leader and stores everything queued so far in one
+transaction, with two ``bulk_create`` calls, while requests arriving in the
+meantime queue up for the next group. Under load the groups grow by themselves;
+a lone request is written straight away. The answer statistics in
+``admin_api.stats`` are updated in the same transaction.
+
+Only requests served by threads of the same process are grouped, so the web
+server must run several threads per worker process (e.g. ``gunicorn
+--threads 8``). A buffer that has only ever been used by one thread, as under
+gunicorn's default sync workers, stops waiting for the flush interval and
+logs a warning once.
+
+The leader writes on its own database connection, so ``submit`` must not be
+called inside a transaction that could still be rolled back.
+"""
+import time
+import logging
+import threading
+from django.conf import settings
+from django.db import transaction
+from admin_api.stats import record_results
+from .models import Answer, Submission
+
+
+logger = logging.getLogger(__name__)
+
+# Submissions, all from one thread, after which a buffer stops waiting for others.
+SINGLE_THREAD_SUBMISSIONS = 20
+
+
+class SubmissionNotSaved(Exception):
+    pass
+
+
+class PendingSubmission:
+    def __init__(self, submission, answers):
+        self.submission = submission
+        self.answers = answers
+        self.done = False
+        self.error = None
+
+
+class SubmissionBuffer:
+    """
+    Groups concurrent submissions into batched, committed writes.
+
+    A group is written once ``batch_size`` submissions are queued or
+    ``flush_interval`` seconds have passed since its leader started waiting;
+    both default to the ``SUBMISSION_*`` settings. Once
+    ``SINGLE_THREAD_SUBMISSIONS`` submissions have all come from a single
+    thread, nothing else can join a group and it is written at once.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None, writer=None):
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._writer = writer or write_submissions
+        self._condition = threading.Condition()
+        self._queue = []
+        self._writing = False
+        # Up to two submitting threads, enough to tell a shared buffer from an unshared one.
+        self._threads = set()
+        self._submitted = 0
+
+    @property
+    def batch_size(self):
+        return self._batch_size or settings.SUBMISSION_BATCH_SIZE
+
+    @property
+    def flush_interval(self):
+        if self._flush_interval is not None:
+            return self._flush_interval
+        return settings.SUBMISSION_FLUSH_INTERVAL
+
+    def submit(self, submission, answers):
+        """
+        Queue a submission and its answers; return once they are committed.
+
+        Raises the database error if they could not be stored.
+        """
+        pending = PendingSubmission(submission, answers)
+        with self._condition:
+            self._count_thread()
+            self._queue.append(pending)
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify_all()
+
+            while not pending.done:
+                if self._writing:
+                    self._condition.wait()
+                    continue
+                self._write_next_group()
+
+        if pending.error:
+            raise pending.error
+        return pending.submission
+
+    @property
+    def single_threaded(self):
+        return len(self._threads) == 1 and self._submitted >= SINGLE_THREAD_SUBMISSIONS
+
+    def _count_thread(self):
+        # Called with the lock held.
+        if len(self._threads) > 1:
+            return
+        self._threads.add(threading.get_ident())
+        self._submitted += 1
+        if len(self._threads) == 1 and self._submitted == SINGLE_THREAD_SUBMISSIONS and self.flush_interval:
+            logger.warning(
+                f"The first {SINGLE_THREAD_SUBMISSIONS} submissions all came from one thread, so they cannot be "
+                "grouped; run the web workers with several threads (e.g. gunicorn --threads 8) to group them."
+            )
+
+    def _write_next_group(self):
+        # Called with the lock held; releases it while writing.
+        self._writing = True
+        deadline = time.monotonic() + (0 if self.single_threaded else self.flush_interval)
+        while len(self._queue) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._condition.wait(remaining)
+
+        group = self._queue[:self.batch_size]
+        del self._queue[:self.batch_size]
+
+        self._condition.release()
+        # Until the writer returns, the group counts as unsaved, so a write cut
+        # short by a BaseException (e.g. SystemExit at shutdown) is not acknowledged.
+        interrupted = SubmissionNotSaved('The submission could not be saved')
+        errors = {pending: interrupted for pending in group}
+        try:
+            errors = self._writer(group) or {}
+        except Exception as e:
+            errors = {pending: e for pending in group}
+        finally:
+            self._condition.acquire()
+            for pending in group:
+                pending.done = True
+                pending.error = errors.get(pending)
+            self._writing = False
+            self._condition.notify_all()
+
+
+def write_submissions(group):
+    """
+    Store a group of PendingSubmissions in one transaction.
+
+    If the group fails, each submission is retried on its own so only the bad
+    ones fail. Returns ``{pending: error}`` for those.
+    """
+    try:
+        with transaction.atomic():
+            _bulk_insert(group)
+        return {}
+    except Exception as e:
+        logger.warning(f"Writing {len(group)} submissions failed, retrying one by one: {str(e)}")
+
+    errors = {}
+    for pending in group:
+        try:
+            with transaction.atomic():
+                _bulk_insert([pending])
+        except Exception as e:
+            logger.error(f"Error saving submission {pending.submission.id}: {str(e)}")
+            errors[pending] = e
+    return errors
+
+
+def _bulk_insert(group):
+    submissions = [pending.submission for pending in group]
+    answers = [answer for pending in group for answer in pending.answers]
+    Submission.objects.bulk_create(submissions)
+    Answer.objects.bulk_create(answers)
+    record_results(
+        ((answer.question_id, answer.chosen_option, answer.correct) for answer in answers),
+        (
+            (submission.course_id, submission.exam_type, submission.score, submission.total)
+            for submission in submissions
+            if submission.course_id and submission.exam_type
+        ),
+    )
+
+
+submission_buffer = SubmissionBuffer()
@@ -0,0 +1,52 @@
+from array import array
+from admin_api.cache import QuestionPool
+from user_api.sampling import draw_question_ids, stratum_quotas
+
+
+def make_pool(sizes):
+    ids, strata = array('q'), {}
+    for difficulty, size in sizes.items():
+        start = len(ids)
+        ids.extend(range(start + 1, start + size + 1))
+        strata[difficulty] = (start, len(ids))
+    return QuestionPool(version='v1', ids=ids, strata=strata)
+
+
+def test_draw_is_reproducible_from_seed():
+    pool = make_pool({'': 10000})
+    first = draw_question_ids(pool, 50, 'seed-1')
+    assert first == draw_question_ids(pool, 50, 'seed-1')
+    assert first != draw_question_ids(pool, 50, 'seed-2')
+    assert len(set(first)) == 50
+
+
+def test_draw_whole_pool():
+    pool = make_pool({'easy': 3, 'hard': 2})
+    assert sorted(draw_question_ids(pool, 5, 'seed')) == [1, 2, 3, 4, 5]
+
+
+def test_draw_larger_than_pool_is_rejected():
+    pool = make_pool({'': 3})
+    try:
+        draw_question_ids(pool, 4, 'seed')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('Expected ValueError')
+
+
+def test_stratum_quotas_follow_pool_mix():
+    pool = make_pool({'easy': 500, 'medium': 300, 'hard': 200})
+    assert stratum_quotas(pool, 10) == {'easy': 5, 'hard': 2, 'medium': 3}
+    assert sum(stratum_quotas(pool, 7).values()) == 7
+
+
+def test_stratified_draw_takes_quota_from_each_difficulty():
+    pool = make_pool({'easy': 500, 'medium': 300, 'hard': 200})
+    drawn = draw_question_ids(pool, 10, 'seed', stratify=True)
+    easy, medium, hard = (
+        [question_id for question_id in drawn if start < question_id <= stop]
+        for start, stop in (pool.strata['easy'], pool.strata['medium'], pool.strata['hard'])
+    )
+    assert (len(easy), len(medium), len(hard)) == (5, 3, 2)
+    assert drawn == draw_question_ids(pool, 10, 'seed', stratify=True)
@@ -0,0 +1,118 @@
+import gzip
+import io
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from admin_api.models import Question
+from user_api.models import Answer
+from user_api.shuffling import option_permutation, original_option, shuffle_options
+
+
+OPTIONS = {'A': 'Berlin', 'B': 'Madrid', 'C': 'Paris', 'D': 'Rome'}
+
+
+@pytest.fixture
+def student(db):
+    return CustomUser.objects.create_user(username='student', email='student@example.com', password='secret')
+
+
+@pytest.fixture
+def student_client(student):
+    client = APIClient()
+    client.force_authenticate(user=student)
+    return client
+
+
+@pytest.fixture
+def paper(db):
+    return [
+        Question.objects.create(
+            text=f'Capital question {n}?', options=OPTIONS, correct_option='C', course_id='101', exam_type='waec',
+        )
+        for n in range(12)
+    ]
+
+
+def test_permutation_is_deterministic_and_keyed():
+    permutation = option_permutation(1, '101:waec', 7, 4)
+    assert sorted(permutation) == [0, 1, 2, 3]
+    assert option_permutation(1, '101:waec', 7, 4) == permutation
+    assert len({tuple(option_permutation(user_id, '101:waec', 7, 4)) for user_id in range(50)}) > 1
+
+
+def test_original_option_inverts_shuffle():
+    labels = tuple(sorted(OPTIONS))
+    for user_id in range(20):
+        shuffled = shuffle_options(OPTIONS, user_id, '101:waec', 3)
+        assert set(shuffled) == set(OPTIONS)
+        shown_label = next(label for label, text in shuffled.items() if text == 'Paris')
+        assert original_option(shown_label, labels, user_id, '101:waec', 3) == 'C'
+
+
+def test_list_options_are_reordered():
+    options = ['2', '3', '4', '5']
+    assert sorted(shuffle_options(options, 1, '101:waec', 3)) == options
+    assert original_option('4', None, 1, '101:waec', 3) == '4'
+
+
+def test_anonymous_question_list_is_not_shuffled(paper):
+    response = APIClient().get('/user-api/questions/?course_id=101&exam_type=waec')
+    assert all(question['options'] == OPTIONS for question in response.json())
+
+
+def test_student_sees_own_order_and_is_graded_through_it(student_client, paper):
+    url = '/user-api/questions/?course_id=101&exam_type=waec'
+    questions = student_client.get(url).json()
+    assert {tuple(question['options'].values()) for question in questions} != {tuple(OPTIONS.values())}
+    assert student_client.get(url).json() == questions
+
+    answers = [
+        {
+            'question_id': question['id'],
+            'chosen_option': next(label for label, text in question['options'].items() if text == 'Paris'),
+        }
+        for question in questions
+    ]
+    response = student_client.post('/user-api/submit/', {'submissions': answers}, format='json')
+    assert all(result['correct'] for result in response.json()['results'])
+
+    body = {'course_id': '101', 'exam_type': 'waec', 'submissions': answers}
+    response = student_client.post('/user-api/submit/', body, format='json')
+    assert all(result['correct'] for result in response.json()['results'])
+    assert set(Answer.objects.values_list('chosen_option', flat=True)) == {'C'}
+
+
+def test_student_etag_differs_from_anonymous(student_client, paper):
+    url = '/user-api/questions/?course_id=101&exam_type=waec'
+    assert student_client.get(url)['ETag'] != APIClient().get(url)['ETag']
+
+
+def test_student_copy_is_rendered_once_per_paper_version(student_client, paper, django_assert_num_queries):
+    url = '/user-api/questions/?course_id=101&exam_type=waec'
+    first = student_client.get(url)
+    # Only the paper's version token is read; the shuffled bytes come from the cache.
+    with django_assert_num_queries(1):
+        second = student_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    assert second['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(second.content) == first.content
+    assert 'Authorization' in second['Vary']
+
+    paper[0].options = {**OPTIONS, 'D': 'Lisbon'}
+    paper[0].save()
+    questions = student_client.get(url).json()
+    assert sorted(questions[0]['options'].values()) == ['Berlin', 'Lisbon', 'Madrid', 'Paris']
+
+
+def test_students_do_not_share_a_copy(student_client, paper):
+    url = '/user-api/questions/?course_id=101&exam_type=waec'
+    other = CustomUser.objects.create_user(username='other', email='other@example.com', password='secret')
+    other_client = APIClient()
+    other_client.force_authenticate(user=other)
+    assert student_client.get(url).json() != other_client.get(url).json()
+
+
+def test_benchmark_command():
+    out = io.StringIO()
+    call_command('benchmark_option_shuffle', students=5, questions=3, stdout=out)
+    assert '5 students x 3 questions' in out.getvalue()
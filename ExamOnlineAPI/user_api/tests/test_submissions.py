@@ -0,0 +1,143 @@
+import io
+import time
+import itertools
+import threading
+import pytest
+from django.core.management import call_command
+from django.db import DatabaseError
+from admin_api.models import ExamScoreStats, OptionPickStats, QuestionStats
+from user_api.models import Answer, Submission
+from user_api.submissions import SINGLE_THREAD_SUBMISSIONS, SubmissionBuffer, SubmissionNotSaved, write_submissions
+
+
+def test_concurrent_submissions_are_written_in_groups():
+    groups = []
+    first_write_started = threading.Event()
+    release_first_write = threading.Event()
+
+    def writer(group):
+        groups.append([pending.submission for pending in group])
+        if len(groups) == 1:
+            first_write_started.set()
+            release_first_write.wait(5)
+        return {}
+
+    buffer = SubmissionBuffer(batch_size=100, flush_interval=0, writer=writer)
+    results = []
+    threads = [threading.Thread(target=lambda n=n: results.append(buffer.submit(n, []))) for n in range(10)]
+
+    threads[0].start()
+    assert first_write_started.wait(5)
+    # These queue up behind the write in progress and are stored together.
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.1)
+    release_first_write.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert sorted(results) == list(range(10))
+    assert [len(group) for group in groups] == [1, 9]
+
+
+def test_batch_size_limits_group():
+    groups = []
+    buffer = SubmissionBuffer(batch_size=3, flush_interval=1, writer=lambda group: groups.append(len(group)))
+    threads = [threading.Thread(target=buffer.submit, args=(n, [])) for n in range(6)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert sum(groups) == 6
+    assert max(groups) <= 3
+    # Full groups are written without waiting for the flush interval.
+    assert time.monotonic() - started < 1
+
+
+def test_write_errors_reach_the_submitter():
+    def writer(group):
+        return {pending: ValueError('bad row') for pending in group if pending.submission == 'bad'}
+
+    buffer = SubmissionBuffer(writer=writer, flush_interval=0)
+    assert buffer.submit('good', []) == 'good'
+    with pytest.raises(ValueError):
+        buffer.submit('bad', [])
+
+
+def test_interrupted_write_is_not_acknowledged():
+    class Shutdown(BaseException):
+        pass
+
+    def writer(group):
+        assert len(group) == 2
+        raise Shutdown()
+
+    buffer = SubmissionBuffer(batch_size=2, flush_interval=5, writer=writer)
+    outcomes = []
+
+    def submit(name):
+        try:
+            outcomes.append(buffer.submit(name, []))
+        except BaseException as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=submit, args=(name,)) for name in ('first', 'second')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    # The leader sees the interruption; the other submission is not reported as saved.
+    assert {type(outcome) for outcome in outcomes} == {Shutdown, SubmissionNotSaved}
+    assert len(outcomes) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load_test_command_cleans_up():
+    out = io.StringIO()
+    call_command('load_test_submissions', submissions=20, answers=3, threads=4, stdout=out)
+    assert '20 submissions x 3 answers with 4 threads' in out.getvalue()
+    assert not Submission.objects.exists()
+    assert not Answer.objects.exists()
+    assert not ExamScoreStats.objects.exists()
+    assert not QuestionStats.objects.exists()
+    assert not OptionPickStats.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load_test_command_counts_only_stored_submissions(mocker):
+    writes = itertools.count()
+
+    def every_other_fails(group):
+        # Groups are written one at a time, so the count needs no lock.
+        failed = {pending: DatabaseError('disk full') for pending in group if next(writes) % 2}
+        write_submissions([pending for pending in group if pending not in failed])
+        return failed
+
+    mocker.patch('user_api.management.commands.load_test_submissions.write_submissions', side_effect=every_other_fails)
+    out, err = io.StringIO(), io.StringIO()
+    call_command('load_test_submissions', submissions=20, answers=3, threads=4, stdout=out, stderr=err)
+
+    assert '10 submissions x 3 answers with 4 threads' in out.getvalue()
+    assert '10 submissions failed, first error: disk full' in err.getvalue()
+
+
+def test_buffer_used_by_one_thread_stops_waiting(caplog):
+    buffer = SubmissionBuffer(flush_interval=0.02, writer=lambda group: {})
+    for n in range(SINGLE_THREAD_SUBMISSIONS):
+        buffer.submit(n, [])
+    assert buffer.single_threaded
+
+    started = time.monotonic()
+    for n in range(10):
+        buffer.submit(n, [])
+    assert time.monotonic() - started < 0.1
+    assert sum('one thread' in record.message for record in caplog.records) == 1
+
+    # A second thread turns the waiting back on.
+    thread = threading.Thread(target=buffer.submit, args=('other', []))
+    thread.start()
+    thread.join(5)
+    assert not buffer.single_threaded
@@ -1,6 +1,11 @@
+import gzip
+import json
 import pytest
 from rest_framework.test import APIClient
 from admin_api.models import Question
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from user_api.models import Answer, Submission
 
 
 
@@ -9,6 +14,10 @@ def api_client():
     return APIClient()
 
 
+def statements(context, verb):
+    return [query['sql'] for query in context.captured_queries if query['sql'].startswith(verb)]
+
+
 @pytest.mark.django_db
 def test_question_list_success(api_client):
     Question.objects.create(
@@ -24,9 +33,27 @@ def test_question_list_success(api_client):
 
 
 @pytest.mark.django_db
-def test_question_list_with_no_questions(api_client):
+def test_question_list_is_one_query_without_answers(api_client, django_assert_num_queries):
+    for n in range(3):
+        Question.objects.create(
+            text=f"What is {n} + {n}?",
+            options=["0", "2", "4", "6"],
+            correct_option=str(n + n),
+            course_id=101,
+            exam_type="final"
+        )
+    # The paper's version token and its questions.
+    with django_assert_num_queries(2):
+        response = api_client.get('/user-api/questions/?course_id=101&exam_type=final')
+    assert response.status_code == 200
+    assert [set(question) for question in response.json()] == [{'id', 'text', 'options'}] * 3
+
+
+@pytest.mark.django_db
+def test_question_list_with_no_questions(api_client, django_assert_num_queries):
     """Test retrieving questions when no matching questions exist."""
-    response = api_client.get('/user-api/questions/?course_id=999&exam_type=mock')
+    with django_assert_num_queries(2):
+        response = api_client.get('/user-api/questions/?course_id=999&exam_type=mock')
     assert response.status_code == 404
     assert 'error' in response.json()
 
@@ -70,3 +97,248 @@ def test_submit_answers_with_missing_fields(api_client):
     response = api_client.post('/user-api/submit/', payload, format='json')
     assert response.status_code == 400
     assert 'error' in response.json()
+
+
+@pytest.mark.django_db
+def test_submit_answers_grades_batch_in_one_query(api_client):
+    questions = [
+        Question.objects.create(
+            text=f"What is {n} + {n}?",
+            options=["0", "2", "4", "6"],
+            correct_option=str(n + n),
+            course_id=101,
+            exam_type="final"
+        )
+        for n in range(4)
+    ]
+    payload = {
+        "submissions": [
+            {"question_id": question.id, "chosen_option": "2"} for question in questions
+        ]
+    }
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.post('/user-api/submit/', payload, format='json')
+    assert response.status_code == 200
+    assert len(statements(context, 'SELECT')) == 1
+    # The submission and all its answers are stored with one INSERT each.
+    assert len(statements(context, 'INSERT INTO "user_api_')) == 2
+    assert [result['correct'] for result in response.json()['results']] == [False, True, False, False]
+    assert response.json()['results'][1] == {"question_id": questions[1].id, "chosen_option": "2", "correct": True}
+
+
+@pytest.mark.django_db
+def test_submit_answers_with_unknown_question(api_client):
+    question = Question.objects.create(
+        text="What is 2 + 2?",
+        options=["2", "3", "4", "5"],
+        correct_option="4",
+        course_id=101,
+        exam_type="final"
+    )
+    payload = {
+        "submissions": [
+            {"question_id": question.id, "chosen_option": "4"},
+            {"question_id": 999, "chosen_option": "4"},
+        ]
+    }
+    response = api_client.post('/user-api/submit/', payload, format='json')
+    assert response.status_code == 404
+    assert response.json() == {'error': 'Question with id 999 does not exist'}
+
+
+@pytest.mark.django_db
+def test_submit_answers_with_warm_answer_key_cache(api_client):
+    question = Question.objects.create(
+        text="What is 2 + 2?",
+        options=["2", "3", "4", "5"],
+        correct_option="4",
+        course_id=101,
+        exam_type="final"
+    )
+    payload = {
+        "course_id": "101",
+        "exam_type": "final",
+        "submissions": [
+            {"question_id": question.id, "chosen_option": "4"}
+        ]
+    }
+    api_client.post('/user-api/submit/', payload, format='json')
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.post('/user-api/submit/', payload, format='json')
+    # Only the paper's version token is read.
+    assert len(statements(context, 'SELECT')) == 1
+    assert 'admin_api_cacheversion' in statements(context, 'SELECT')[0]
+    assert response.status_code == 200
+    assert response.json()['results'][0]['correct'] is True
+
+    payload['exam_type'] = 'mock'
+    response = api_client.post('/user-api/submit/', payload, format='json')
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_question_list_serves_snapshot_until_paper_changes(api_client, django_assert_num_queries):
+    question = Question.objects.create(
+        text="What is 2 + 2?",
+        options=["2", "3", "4", "5"],
+        correct_option="4",
+        course_id=101,
+        exam_type="final"
+    )
+    url = '/user-api/questions/?course_id=101&exam_type=final'
+    first = api_client.get(url)
+    # Only the paper's version token is read.
+    with django_assert_num_queries(1):
+        second = api_client.get(url)
+    assert second.content == first.content
+    assert second.json() == [{"id": question.id, "text": "What is 2 + 2?", "options": ["2", "3", "4", "5"]}]
+
+    question.text = "What is 3 + 3?"
+    question.save()
+    assert api_client.get(url).json()[0]['text'] == "What is 3 + 3?"
+
+
+@pytest.mark.django_db
+def test_question_list_gzip_snapshot(api_client):
+    Question.objects.create(
+        text="What is 2 + 2?",
+        options=["2", "3", "4", "5"],
+        correct_option="4",
+        course_id=101,
+        exam_type="final"
+    )
+    url = '/user-api/questions/?course_id=101&exam_type=final'
+    response = api_client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+    assert response['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response['Vary']
+    assert json.loads(gzip.decompress(response.content)) == api_client.get(url).json()
+
+
+@pytest.mark.django_db
+def test_question_list_conditional_get(api_client, django_assert_num_queries):
+    question = Question.objects.create(
+        text="What is 2 + 2?",
+        options=["2", "3", "4", "5"],
+        correct_option="4",
+        course_id=101,
+        exam_type="final"
+    )
+    url = '/user-api/questions/?course_id=101&exam_type=final'
+    response = api_client.get(url)
+    etag = response['ETag']
+    assert etag.startswith('W/"')
+    assert response.has_header('Last-Modified')
+
+    with django_assert_num_queries(1):
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response.content == b''
+
+    question.delete()
+    Question.objects.create(
+        text="What is 3 + 3?",
+        options=["2", "4", "6", "8"],
+        correct_option="6",
+        course_id=101,
+        exam_type="final"
+    )
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+@pytest.fixture
+def question_pool(db):
+    return Question.objects.bulk_create([
+        Question(
+            text=f"Pool question {n}?",
+            text_hash=f"pool-{n}",
+            options={"A": "yes", "B": "no"},
+            correct_option="A",
+            difficulty="hard" if n % 4 == 0 else "easy",
+            course_id=101,
+            exam_type="final",
+        )
+        for n in range(40)
+    ])
+
+
+@pytest.mark.django_db
+def test_random_exam_is_reproducible_from_seed(api_client, question_pool, django_assert_num_queries):
+    url = '/user-api/exams/random/?course_id=101&exam_type=final&count=8'
+    first = api_client.get(url)
+    assert first.status_code == 200
+    seed = first.json()['seed']
+    ids = [question['id'] for question in first.json()['questions']]
+    assert len(set(ids)) == 8
+    assert set(first.json()['questions'][0]) == {'id', 'text', 'options'}
+
+    # Warm pool: only the paper's version token and the drawn questions are read.
+    with django_assert_num_queries(2):
+        again = api_client.get(f'{url}&seed={seed}')
+    assert [question['id'] for question in again.json()['questions']] == ids
+
+
+@pytest.mark.django_db
+def test_random_exam_stratified(api_client, question_pool):
+    response = api_client.get('/user-api/exams/random/?course_id=101&exam_type=final&count=8&stratify=true&seed=s')
+    assert response.status_code == 200
+    difficulties = dict(Question.objects.values_list('id', 'difficulty'))
+    drawn = [difficulties[question['id']] for question in response.json()['questions']]
+    assert drawn.count('hard') == 2
+    assert drawn.count('easy') == 6
+
+
+@pytest.mark.django_db
+def test_random_exam_pool_refreshes_on_change(api_client, question_pool):
+    url = '/user-api/exams/random/?course_id=101&exam_type=final&count=40&seed=s'
+    assert api_client.get(url).status_code == 200
+    Question.objects.get(pk=question_pool[0].pk).delete()
+    response = api_client.get(url)
+    assert response.status_code == 400
+    assert 'error' in response.json()
+
+
+@pytest.mark.django_db
+def test_random_exam_validation(api_client, question_pool):
+    assert api_client.get('/user-api/exams/random/?course_id=101&exam_type=final').status_code == 400
+    assert api_client.get('/user-api/exams/random/?course_id=101&exam_type=final&count=abc').status_code == 400
+    assert api_client.get('/user-api/exams/random/?course_id=999&exam_type=final&count=2').status_code == 404
+
+
+@pytest.mark.django_db
+def test_submit_answers_stores_submission(api_client):
+    question = Question.objects.create(
+        text="What is 2 + 2?",
+        options={"A": "3", "B": "4"},
+        correct_option="B",
+        course_id=101,
+        exam_type="final"
+    )
+    payload = {
+        "course_id": "101",
+        "exam_type": "final",
+        "submissions": [{"question_id": question.id, "chosen_option": "A"}],
+    }
+    response = api_client.post('/user-api/submit/', payload, format='json')
+    assert response.status_code == 200
+
+    submission = Submission.objects.get(pk=response.json()['submission_id'])
+    assert (submission.course_id, submission.exam_type, submission.score, submission.total) == ('101', 'final', 0, 1)
+    assert list(submission.answers.values_list('question_id', 'chosen_option', 'correct')) == [(question.id, 'A', False)]
+
+
+@pytest.mark.django_db
+def test_submit_answers_reports_storage_failure(api_client, mocker):
+    question = Question.objects.create(
+        text="What is 2 + 2?",
+        options={"A": "3", "B": "4"},
+        correct_option="B",
+        course_id=101,
+        exam_type="final"
+    )
+    mocker.patch.object(Answer.objects, 'bulk_create', side_effect=RuntimeError('disk full'))
+    payload = {"submissions": [{"question_id": question.id, "chosen_option": "B"}]}
+    response = api_client.post('/user-api/submit/', payload, format='json')
+    assert response.status_code == 500
+    assert not Submission.objects.exists()
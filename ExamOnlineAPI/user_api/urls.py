@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import QuestionListView, SubmitAnswersView
+from .views import QuestionListView, RandomExamView, SubmitAnswersView
 
 urlpatterns = [
     path('questions/', QuestionListView.as_view(), name='question-list'),
+    path('exams/random/', RandomExamView.as_view(), name='random-exam'),
     path('submit/', SubmitAnswersView.as_view(), name='submit-answers'),
 ]
\ No newline at end of file
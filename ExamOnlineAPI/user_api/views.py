@@ -3,11 +3,52 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from admin_api.models import Question
+from admin_api.cache import PaperSnapshot, get_grading_key, get_paper_snapshot, get_question_pool, student_paper_cache
+from .sampling import draw_question_ids
+from .shuffling import exam_id, option_labels, original_option, shuffle_options
+from .models import Answer, Submission
+from .submissions import submission_buffer
+import logging
+import gzip
+import json
+import secrets
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from urllib.parse import quote
+from django.views.decorators.http import condition
+
+
+logger = logging.getLogger(__name__)
+
+
+def paper_etag(request, *args, **kwargs):
+    snapshot = _requested_snapshot(request)
+    if not snapshot or not snapshot.question_count:
+        return None
+    # Signed-in students get their own option order, so their own validator.
+    if request.user.is_authenticated:
+        return f'W/"{snapshot.etag}-{request.user.pk}"'
+    return f'W/"{snapshot.etag}"'
+
+
+def paper_last_modified(request, *args, **kwargs):
+    snapshot = _requested_snapshot(request)
+    return snapshot.last_modified if snapshot and snapshot.question_count else None
 
 
 class QuestionListView(APIView):
-    """Retrieve all questions based on course_id and exam_type"""
+    """Retrieve all questions based on course_id and exam_type
 
+    The list is served from a gzip-compressed snapshot of the paper that is
+    rebuilt only when one of its questions changes. Responses carry the
+    snapshot's ETag and Last-Modified, and a matching If-None-Match or
+    If-Modified-Since gets a 304. Signed-in students get the options of each
+    question in their own order, from a shuffled copy of the snapshot that is
+    rendered once per student and paper version.
+    """
+
+    @method_decorator(condition(etag_func=paper_etag, last_modified_func=paper_last_modified))
     def get(self, request, *args, **kwargs):
         course_id = request.query_params.get('course_id')
         exam_type = request.query_params.get('exam_type')
@@ -15,23 +56,67 @@ class QuestionListView(APIView):
         if not course_id or not exam_type:
             return Response({'error': 'course_id and exam_type fileds are required.'}, status=status.HTTP_400_BAD_REQUEST)
     
-        questions = Question.objects.filter(course_id=course_id, exam_type=exam_type)
-        if not questions.exists():
+        # Pre-rendered paper: once the snapshot is built, only its version token is read.
+        snapshot = _requested_snapshot(request)
+        if not snapshot.question_count:
             return Response({'error': f'No questions found for the given {course_id} and {exam_type}'}, status=status.HTTP_404_NOT_FOUND)
-        
-        data = [
-            {
-                'id': question.id,
-                'text': question.text,
-                'options': question.options,
-            } for question in questions
-        ]
-        return Response(data, status=status.HTTP_200_OK)
+
+        if request.user.is_authenticated:
+            snapshot = get_student_snapshot(snapshot, request.user.pk, course_id, exam_type)
+
+        return snapshot_response(request, snapshot)
     
 
 
+class RandomExamView(APIView):
+    """Draw a random exam of ``count`` questions for course_id and exam_type.
+
+    Pass the returned ``seed`` back to regenerate the same exam while the paper
+    is unchanged. ``stratify=true`` keeps the paper's mix of difficulties.
+    """
+
+    def get(self, request, *args, **kwargs):
+        course_id = request.query_params.get('course_id')
+        exam_type = request.query_params.get('exam_type')
+        count = request.query_params.get('count')
+
+        if not course_id or not exam_type or not count:
+            return Response({'error': 'course_id, exam_type and count fields are required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        count = _as_id(count)
+        if not count or count < 1:
+            return Response({'error': 'count must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        seed = request.query_params.get('seed') or secrets.token_hex(8)
+        stratify = request.query_params.get('stratify', '').lower() in ('1', 'true', 'yes')
+
+        pool = get_question_pool(course_id, exam_type)
+        if not len(pool):
+            return Response({'error': f'No questions found for the given {course_id} and {exam_type}'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            question_ids = draw_question_ids(pool, count, f'{seed}:{course_id}:{exam_type}', stratify=stratify)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        questions = {
+            question['id']: question
+            for question in Question.objects.filter(id__in=question_ids).values('id', 'text', 'options')
+        }
+        questions = [questions[question_id] for question_id in question_ids if question_id in questions]
+        if request.user.is_authenticated:
+            questions = shuffle_questions(questions, request.user.pk, course_id, exam_type)
+
+        return Response({'seed': seed, 'questions': questions}, status=status.HTTP_200_OK)
+
+
 class SubmitAnswersView(APIView):
-    """Confirm user's answers."""
+    """Confirm user's answers.
+
+    Sending the paper's course_id and exam_type lets grading use the cached answer key.
+    A signed-in student's chosen labels are mapped back through their option order.
+    Every graded submission is stored, in groups, before the response is sent.
+    """
 
     def post(self, request, *args, **kwargs):
         submissions = request.data.get('submissions')
@@ -39,24 +124,126 @@ class SubmitAnswersView(APIView):
         if not submissions or not isinstance(submissions, list):
             return Response({'error': 'Invalid submission format'}, status=status.HTTP_400_BAD_REQUEST)
         
-        results = []
         for submission in submissions:
-            question_id = submission.get('question_id')
-            chosen_option = submission.get('chosen_option')
-
-            if not question_id or not chosen_option:
+            if not submission.get('question_id') or not submission.get('chosen_option'):
                 return Response({'error': 'Each submision must include the question_id and chosen_option'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            try:
-                question = Question.objects.get(id=question_id)
-                is_correct = question.correct_option == chosen_option
-                results.append({
-                    'question_id': question_id,
-                    'chosen_option': chosen_option,
-                    'correct': is_correct
-                })
-            except Question.DoesNotExist:
+
+        course_id = request.data.get('course_id')
+        exam_type = request.data.get('exam_type')
+        question_papers = {}
+        if course_id and exam_type:
+            # Cached answer key for the paper: only its version token is read once warm.
+            answer_key, labels = get_grading_key(course_id, exam_type)
+            paper = exam_id(course_id, exam_type)
+        else:
+            # Grade the whole batch from a single lookup.
+            question_ids = {_as_id(submission['question_id']) for submission in submissions}
+            rows = Question.objects.filter(id__in=question_ids - {None}).values_list(
+                'id', 'correct_option', 'options', 'course_id', 'exam_type',
+            )
+            answer_key, labels, paper = {}, {}, None
+            for question_id, correct_option, options, question_course_id, question_exam_type in rows:
+                answer_key[question_id] = correct_option
+                labels[question_id] = option_labels(options)
+                question_papers[question_id] = (question_course_id, question_exam_type)
+            if len(set(question_papers.values())) == 1:
+                # Every answered question is from one paper: count the score towards it.
+                course_id, exam_type = next(iter(question_papers.values()))
+
+        user_id = request.user.pk if request.user.is_authenticated else None
+        record = Submission(user_id=user_id, course_id=course_id or '', exam_type=exam_type or '')
+
+        results, answers = [], []
+        for submission in submissions:
+            question_id = submission['question_id']
+            chosen_option = submission['chosen_option']
+
+            key = _as_id(question_id)
+            correct_option = answer_key.get(key)
+            if correct_option is None:
                 return Response({'error': f'Question with id {question_id} does not exist'}, status=status.HTTP_404_NOT_FOUND)
-            
-        return Response({'results': results}, status=status.HTTP_200_OK)
 
+            graded_option = chosen_option
+            if user_id is not None:
+                graded_option = original_option(
+                    chosen_option, labels.get(key), user_id, paper or exam_id(*question_papers[key]), key,
+                )
+
+            correct = correct_option == graded_option
+            results.append({
+                'question_id': question_id,
+                'chosen_option': chosen_option,
+                'correct': correct
+            })
+            answers.append(Answer(submission=record, question_id=key, chosen_option=str(graded_option)[:255], correct=correct))
+
+        record.score = sum(answer.correct for answer in answers)
+        record.total = len(answers)
+        try:
+            submission_buffer.submit(record, answers)
+        except Exception as e:
+            logger.error(f"Error saving submission: {str(e)}")
+            return Response({'error': 'Error saving submission'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({'submission_id': record.id, 'results': results}, status=status.HTTP_200_OK)
+
+
+def shuffle_questions(questions, user_id, course_id, exam_type):
+    paper = exam_id(course_id, exam_type)
+    for question in questions:
+        question['options'] = shuffle_options(question['options'], user_id, paper, question['id'])
+    return questions
+
+
+def get_student_snapshot(snapshot, user_id, course_id, exam_type):
+    """
+    Return the paper snapshot with the options in the student's order, shuffling it on a cache miss.
+
+    The copy is keyed by the snapshot's content hash, so it goes stale with the
+    snapshot and needs no invalidation of its own.
+    """
+    cache = student_paper_cache()
+    key = f'student-paper:{quote(str(course_id))}:{quote(str(exam_type))}:{snapshot.etag}:{user_id}'
+
+    gzipped_json = cache.get(key)
+    if gzipped_json is None:
+        questions = shuffle_questions(json.loads(snapshot.json), user_id, course_id, exam_type)
+        body = json.dumps(questions, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        gzipped_json = gzip.compress(body, mtime=0)
+        cache.set(key, gzipped_json)
+    return PaperSnapshot(
+        version=snapshot.version,
+        question_count=snapshot.question_count,
+        gzipped_json=gzipped_json,
+        etag=f'{snapshot.etag}-{user_id}',
+        last_modified=snapshot.last_modified,
+    )
+
+
+def _requested_snapshot(request):
+    # Looked up once per request and shared by the validators and the view.
+    if not hasattr(request, '_paper_snapshot'):
+        course_id = request.GET.get('course_id')
+        exam_type = request.GET.get('exam_type')
+        request._paper_snapshot = get_paper_snapshot(course_id, exam_type) if course_id and exam_type else None
+    return request._paper_snapshot
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def snapshot_response(request, snapshot):
+    """
+    Send a paper snapshot's bytes as they are, gzip-encoded when the client accepts it.
+    """
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = HttpResponse(snapshot.gzipped_json, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(snapshot.json, content_type='application/json')
+    patch_vary_headers(response, ['Accept-Encoding', 'Authorization'])
+    return response